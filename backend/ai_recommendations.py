@@ -0,0 +1,339 @@
+"""Content-based suggestions built from the group's own data, with no external service.
+
+Each recommendation and itinerary item in a group becomes a TF-IDF vector over
+its title, type and text. The query vector comes from what the group has
+agreed on: approved recommendations and confirmed itinerary items. For
+/personalized it comes from the caller's votes and stated preferences
+instead. The group's open recommendations are then ranked by cosine
+similarity.
+
+The index is cached per group in each worker and follows the group revision. A
+newer revision replays only the change log entries since the cached one. A cold
+cache, or a log compacted past it, rebuilds the group from scratch.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, ChangeLog, GroupRevision, ItineraryItem, Recommendation, RecommendationVote
+from authz import group_member_required
+
+ai_recommendations_bp = Blueprint('ai_recommendations_bp', __name__)
+
+MAX_CACHED_GROUPS = 256
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+TITLE_WEIGHT = 2
+# A rejection pulls the profile away from similar items, more gently than an approval pulls toward them
+REJECT_WEIGHT = -0.5
+INDEXED_ENTITIES = ('recommendation', 'itinerary_item')
+STOPWORDS = frozenset('a an and are at be by for from in is it of on or our the this to we with'.split())
+# Place types the client asks for, mapped onto our recommendation types
+TYPE_ALIASES = {'lodging': 'hotel', 'tourist_attraction': 'activity', 'food': 'restaurant', 'cafe': 'restaurant'}
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _terms(*weighted_texts):
+    counts = Counter()
+    for text, weight in weighted_texts:
+        for term in tokenize(text):
+            counts[term] += weight
+    return counts
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {t: w / norm for t, w in vector.items()} if norm else {}
+
+
+def _dot(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(t, 0.0) for t, w in a.items())
+
+
+class GroupIndex:
+    """TF-IDF documents for one group, keyed by (entity, id)"""
+
+    def __init__(self):
+        # Held while refreshing and while ranking, so a query never sees a half-applied update
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.revision = None
+        self.docs = {}
+        self.meta = {}
+        self.df = Counter()
+        self._vectors = None
+        self._idf = {}
+
+    def put(self, key, terms, meta):
+        self.remove(key)
+        self.docs[key] = terms
+        self.meta[key] = meta
+        self.df.update(terms.keys())
+        self._vectors = None
+
+    def remove(self, key):
+        terms = self.docs.pop(key, None)
+        self.meta.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+        self._vectors = None
+
+    def vectors(self):
+        """Unit TF-IDF vectors, recomputed only after the documents changed"""
+        if self._vectors is None:
+            count = len(self.docs)
+            self._idf = {t: math.log((1 + count) / (1 + df)) + 1 for t, df in self.df.items()}
+            self._vectors = {
+                key: _normalize({t: (1 + math.log(c)) * self._idf[t] for t, c in terms.items()})
+                for key, terms in self.docs.items()
+            }
+        return self._vectors
+
+    def text_vector(self, text):
+        """Vector for free text; terms no document uses get the highest idf"""
+        self.vectors()
+        unseen = math.log(1 + len(self.docs)) + 1
+        return _normalize({t: (1 + math.log(c)) * self._idf.get(t, unseen) for t, c in _terms((text, 1)).items()})
+
+
+def _put_recommendation(index, rec):
+    index.put(('recommendation', rec.id), _terms((rec.title, TITLE_WEIGHT), (rec.type, 1), (rec.comment, 1)), {
+        'title': rec.title, 'type': rec.type, 'comment': rec.comment, 'user_id': rec.user_id,
+        'approve': rec.approve_count or 0, 'reject': rec.reject_count or 0, 'score': rec.score or 0.0,
+    })
+
+
+def _put_item(index, item):
+    index.put(('itinerary_item', item.id), _terms(
+        (item.title, TITLE_WEIGHT), (item.type, 1), (item.description, 1), (item.location, 1)
+    ), {'confirmed': bool(item.confirmed)})
+
+
+def _load(index, group_id, ids=None):
+    """(Re)index the group's rows, or only those whose ids are given per entity; missing ones are dropped"""
+    ids = ids or {}
+    recs = Recommendation.query.filter_by(group_id=group_id)
+    items = ItineraryItem.query.filter_by(group_id=group_id)
+    for entity, query, model, put in (('recommendation', recs, Recommendation, _put_recommendation),
+                                      ('itinerary_item', items, ItineraryItem, _put_item)):
+        wanted = ids.get(entity)
+        if wanted is not None:
+            if not wanted:
+                continue
+            query = query.filter(model.id.in_(wanted))
+        found = set()
+        for row in query.all():
+            put(index, row)
+            found.add(row.id)
+        for row_id in (wanted or ()):
+            if row_id not in found:
+                index.remove((entity, row_id))
+
+
+def group_index(group_id):
+    """The group's index, brought up to its current revision. Read it under index.lock."""
+    state = db.session.query(GroupRevision.revision, GroupRevision.compacted_through).filter_by(
+        group_id=group_id
+    ).first()
+    revision, compacted_through = (state[0], state[1] or 0) if state else (0, 0)
+
+    with _cache_lock:
+        index = _cache.get(group_id)
+        if index is None:
+            index = _cache[group_id] = GroupIndex()
+            if len(_cache) > MAX_CACHED_GROUPS:
+                _cache.popitem(last=False)
+        else:
+            _cache.move_to_end(group_id)
+
+    with index.lock:
+        if index.revision == revision:
+            return index
+        if index.revision is None or index.revision < compacted_through or index.revision > revision:
+            index.clear()
+            _load(index, group_id)
+        else:
+            changed = db.session.query(ChangeLog.entity, ChangeLog.entity_id).filter(
+                ChangeLog.group_id == group_id, ChangeLog.revision > index.revision, ChangeLog.revision <= revision,
+                ChangeLog.entity.in_(INDEXED_ENTITIES)
+            ).all()
+            ids = {entity: set() for entity in INDEXED_ENTITIES}
+            for entity, entity_id in changed:
+                ids[entity].add(entity_id)
+            _load(index, group_id, ids)
+        # Rows written while loading are replayed next time; re-indexing a row is harmless
+        index.revision = revision
+        return index
+
+
+def _profile(index, weighted_keys, text=None):
+    vectors = index.vectors()
+    profile = Counter()
+    for key, weight in weighted_keys:
+        for term, value in vectors.get(key, {}).items():
+            profile[term] += weight * value
+    if text:
+        for term, value in index.text_vector(text).items():
+            profile[term] += value
+    return _normalize({t: w for t, w in profile.items() if w})
+
+
+def _request_limit(data):
+    try:
+        return max(1, min(int(data.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def _rank(index, profile, candidates, limit):
+    """Best matches first; without a profile (nothing agreed on yet) by group approval"""
+    vectors = index.vectors()
+    scored = sorted(
+        ((_dot(profile, vectors[key]) if profile else 0.0, index.meta[key]['score'], key[1], key) for key in candidates),
+        reverse=True,
+    )
+    results = []
+    for similarity, score, _, key in scored[:limit]:
+        meta = index.meta[key]
+        shared = sorted(profile.keys() & vectors[key].keys(), key=lambda t: -profile[t] * vectors[key][t])
+        results.append({
+            'id': key[1],
+            'name': meta['title'],
+            'title': meta['title'],
+            'type': meta['type'],
+            'comment': meta['comment'],
+            'rating': round(score * 5, 1),
+            'approve_count': meta['approve'],
+            'reject_count': meta['reject'],
+            'similarity': round(similarity, 4),
+            'matched_terms': shared[:5],
+        })
+    return results
+
+
+def _type_filter(types):
+    if isinstance(types, str):
+        types = [types]
+    return {TYPE_ALIASES.get(t.lower(), t.lower()) for t in (types or []) if isinstance(t, str)}
+
+
+@ai_recommendations_bp.route('/api/groups/<int:group_id>/ai-recommendations', methods=['POST'])
+@jwt_required()
+@group_member_required()
+def group_ai_recommendations(group_id):
+    """Open recommendations most like what the group already approved or confirmed"""
+    data = request.get_json(silent=True) or {}
+    index = group_index(group_id)
+    with index.lock:
+        return jsonify(_group_suggestions(index, data))
+
+
+def _group_suggestions(index, data):
+    liked, candidates = [], []
+    for key, meta in index.meta.items():
+        if key[0] == 'itinerary_item':
+            if meta['confirmed']:
+                liked.append((key, 1.0))
+        elif meta['approve'] > meta['reject']:
+            liked.append((key, 1.0))
+        elif meta['approve'] == meta['reject']:
+            candidates.append(key)
+    types = _type_filter(data.get('types'))
+    if types:
+        candidates = [key for key in candidates if (index.meta[key]['type'] or '').lower() in types]
+
+    return {
+        'recommendations': _rank(index, _profile(index, liked), candidates, _request_limit(data)),
+        'based_on': len(liked),
+    }
+
+
+@ai_recommendations_bp.route('/api/groups/<int:group_id>/ai-recommendations/personalized', methods=['POST'])
+@jwt_required()
+@group_member_required()
+def personalized_ai_recommendations(group_id):
+    """Recommendations the caller hasn't voted on, ranked by their votes and stated preferences.
+
+    budget and duration are accepted but unused: recommendations carry no cost or length."""
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    index = group_index(group_id)
+    with index.lock:
+        return jsonify(_personal_suggestions(index, user_id, data))
+
+
+def _personal_suggestions(index, user_id, data):
+    rec_ids = [key[1] for key in index.meta if key[0] == 'recommendation']
+    votes = RecommendationVote.query.filter(
+        RecommendationVote.recommendation_id.in_(rec_ids), RecommendationVote.user_id == user_id
+    ).all() if rec_ids else []
+    weights = {'approve': 1.0, 'reject': REJECT_WEIGHT}
+    liked = [(('recommendation', v.recommendation_id), weights[v.vote]) for v in votes if v.vote in weights]
+
+    preferences = data.get('preferences') or []
+    if isinstance(preferences, str):
+        preferences = [preferences]
+    text = ' '.join([str(p) for p in preferences] + [str(data.get('location') or '')])
+
+    voted = {v.recommendation_id for v in votes}
+    candidates = [key for key, meta in index.meta.items()
+                  if key[0] == 'recommendation' and key[1] not in voted and meta['user_id'] != user_id]
+    types = _type_filter(data.get('types'))
+    if types:
+        candidates = [key for key in candidates if (index.meta[key]['type'] or '').lower() in types]
+
+    return {
+        'recommendations': _rank(index, _profile(index, liked, text), candidates, _request_limit(data)),
+        'based_on': len(liked),
+    }
+
+
+@ai_recommendations_bp.route('/api/groups/<int:group_id>/ai-recommendations/save', methods=['POST'])
+@jwt_required()
+@group_member_required()
+def save_ai_recommendation(group_id):
+    """Add a suggestion to the group's recommendations so it can be voted on"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+    title = (data.get('name') or data.get('title') or '').strip()
+    if not title:
+        return jsonify({'error': 'name or title is required'}), 400
+
+    kind = data.get('type')
+    rec = Recommendation(
+        group_id=group_id,
+        user_id=user_id,
+        title=title[:150],
+        type=TYPE_ALIASES.get(kind, kind) if isinstance(kind, str) else None,
+        comment=(data.get('comment') or data.get('description') or data.get('address') or '')[:300] or None
+    )
+    db.session.add(rec)
+    db.session.commit()
+
+    return jsonify({
+        'message': 'Recommendation saved',
+        'recommendation': {
+            'id': rec.id,
+            'title': rec.title,
+            'type': rec.type,
+            'comment': rec.comment,
+            'timestamp': rec.timestamp.isoformat()
+        }
+    }), 201
@@ -3,6 +3,15 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from models import db, User
 from auth import auth_bp, bcrypt
+from migrate import run_migrations
+from query_stats import init_query_stats
+from metrics import metrics_bp, init_metrics
+from revisions import init_revisions
+from scheduler import init_scheduler
+# @periodic/@job handlers register when their module is imported. Most arrive with
+# their blueprints below; live_location's blueprint is not registered, so its
+# retention job is imported here by name.
+from live_location import prune_live_locations  # noqa: F401
 import os
 from dotenv import load_dotenv
 
@@ -85,6 +94,30 @@ try:
 except ImportError as e:
     print(f"❌ Error importing enhanced_chat_bp: {e}")
 
+try:
+    from batch import batch_bp
+    print("✅ batch_bp imported successfully")
+except ImportError as e:
+    print(f"❌ Error importing batch_bp: {e}")
+
+try:
+    from sync import sync_bp
+    print("✅ sync_bp imported successfully")
+except ImportError as e:
+    print(f"❌ Error importing sync_bp: {e}")
+
+try:
+    from ai_recommendations import ai_recommendations_bp
+    print("✅ ai_recommendations_bp imported successfully")
+except ImportError as e:
+    print(f"❌ Error importing ai_recommendations_bp: {e}")
+
+try:
+    from itinerary_export import itinerary_export_bp
+    print("✅ itinerary_export_bp imported successfully")
+except ImportError as e:
+    print(f"❌ Error importing itinerary_export_bp: {e}")
+
 # Load environment variables
 load_dotenv()
 
@@ -99,7 +132,7 @@ CORS(app, origins=[
     "https://tripbox-intelliorganizer.onrender.com",
     "https://tripbox-prototype.onrender.com",
     "file://"  # Allow file:// protocol for local HTML files
-], supports_credentials=True, allow_headers=["Content-Type", "Authorization"])
+], supports_credentials=True, allow_headers=["Content-Type", "Authorization"], expose_headers=["X-Next-Cursor"])
 
 # Configurations
 database_url = os.environ.get('DATABASE_URL', 'sqlite:///tripbox.db')
@@ -110,16 +143,40 @@ if database_url.startswith('postgres://'):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your_secret_key_here')
+# Hand upload bytes to the front proxy instead of streaming them from Python:
+# UPLOADS_ACCEL_REDIRECT=/internal-uploads/ for nginx, USE_X_SENDFILE=1 for Apache/lighttpd
+app.config['UPLOADS_ACCEL_REDIRECT'] = os.environ.get('UPLOADS_ACCEL_REDIRECT')
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+# Per-request SQL stats: X-Query-* headers (always on in debug mode) and JSON log lines.
+# WARNING logs only requests with repeated statements; INFO logs every request.
+app.config['QUERY_STATS_HEADERS'] = os.environ.get('QUERY_STATS_HEADERS') == '1'
+app.config['QUERY_LOG_LEVEL'] = os.environ.get('QUERY_LOG_LEVEL', 'WARNING')
+# /metrics: with several gunicorn workers, point METRICS_DIR at a directory they
+# share (cleared on deploy) so any worker can report totals for all of them
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+# /sync tokens older than this many days get a reset response; run `python sync.py compact` to prune
+app.config['CHANGELOG_RETENTION_DAYS'] = int(os.environ.get('CHANGELOG_RETENTION_DAYS', 30))
+# Poll expiry, location pruning and change log compaction run on whichever worker holds
+# the scheduler lease; leave unset to run `python scheduler.py run` as its own process instead
+app.config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED') == '1'
+app.config['LOCATION_RETENTION_DAYS'] = int(os.environ.get('LOCATION_RETENTION_DAYS', 30))
 
 # Initialize extensions
 db.init_app(app)
 bcrypt.init_app(app)
 jwt = JWTManager(app)
+init_query_stats(app)
+init_metrics(app)
+init_revisions(app)
+init_scheduler(app)
 
 # Register auth blueprint
 app.register_blueprint(auth_bp)
 print("✅ Auth blueprint registered successfully")
 
+app.register_blueprint(metrics_bp)
+
 # Register all feature blueprints
 try:
     app.register_blueprint(trips_bp)
@@ -199,10 +256,35 @@ try:
 except NameError:
     print("❌ enhanced_chat_bp not available")
 
+try:
+    app.register_blueprint(batch_bp)
+    print("✅ batch_bp registered successfully")
+except NameError:
+    print("❌ batch_bp not available")
+
+try:
+    app.register_blueprint(sync_bp)
+    print("✅ sync_bp registered successfully")
+except NameError:
+    print("❌ sync_bp not available")
+
+try:
+    app.register_blueprint(ai_recommendations_bp)
+    print("✅ ai_recommendations_bp registered successfully")
+except NameError:
+    print("❌ ai_recommendations_bp not available")
+
+try:
+    app.register_blueprint(itinerary_export_bp)
+    print("✅ itinerary_export_bp registered successfully")
+except NameError:
+    print("❌ itinerary_export_bp not available")
+
 # Create tables
 with app.app_context():
     try:
         db.create_all()
+        run_migrations(db.engine)
         print("✅ Database tables created successfully")
         
         # Create test user if it doesn't exist
@@ -0,0 +1,97 @@
+import threading
+import time
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models import db, Group, GroupMember
+
+# Per-worker cache of user_id -> (frozenset of group ids, expires_at).
+# Writes in this worker invalidate immediately; the TTL bounds how long a
+# removal made by another worker can go unnoticed. Misses always fall back to
+# the (group_id, user_id) unique index, so new memberships are seen at once.
+MEMBERSHIP_TTL_SECONDS = 60
+
+_memberships = {}
+_memberships_lock = threading.Lock()
+
+
+def _load_group_ids(user_id):
+    rows = db.session.query(GroupMember.group_id).filter(GroupMember.user_id == user_id).all()
+    group_ids = frozenset(row[0] for row in rows)
+    with _memberships_lock:
+        _memberships[user_id] = (group_ids, time.monotonic() + MEMBERSHIP_TTL_SECONDS)
+    return group_ids
+
+
+def user_group_ids(user_id):
+    """Ids of all groups the user belongs to"""
+    user_id = int(user_id)
+    with _memberships_lock:
+        entry = _memberships.get(user_id)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return _load_group_ids(user_id)
+
+
+def is_group_member(group_id, user_id):
+    """True if the user is a member of the group"""
+    user_id = int(user_id)
+    if group_id in user_group_ids(user_id):
+        return True
+    exists = db.session.query(GroupMember.id).filter_by(group_id=group_id, user_id=user_id).first() is not None
+    if exists:
+        _load_group_ids(user_id)
+    return exists
+
+
+def invalidate_user(user_id):
+    with _memberships_lock:
+        _memberships.pop(int(user_id), None)
+
+
+def invalidate_group(group_id):
+    with _memberships_lock:
+        for user_id in [u for u, (group_ids, _) in _memberships.items() if group_id in group_ids]:
+            del _memberships[user_id]
+
+
+def group_member_required(message='You are not a member of this group'):
+    """Reject with 403 unless the JWT user belongs to the view's group_id. Use below @jwt_required()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not is_group_member(kwargs['group_id'], get_jwt_identity()):
+                return jsonify({'error': message}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _remember(target, key, value):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(key, set()).add(value)
+
+
+@event.listens_for(GroupMember, 'after_insert')
+@event.listens_for(GroupMember, 'after_delete')
+def _membership_changed(mapper, connection, target):
+    invalidate_user(target.user_id)
+    _remember(target, 'authz_users', target.user_id)
+
+
+@event.listens_for(Group, 'after_delete')
+def _group_deleted(mapper, connection, target):
+    invalidate_group(target.id)
+    _remember(target, 'authz_groups', target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    # Drop entries again in case a read re-cached them before the commit landed
+    for user_id in session.info.pop('authz_users', ()):
+        invalidate_user(user_id)
+    for group_id in session.info.pop('authz_groups', ()):
+        invalidate_group(group_id)
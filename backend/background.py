@@ -0,0 +1,29 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+# Small per-worker pool for work that should not hold up the response
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('BACKGROUND_WORKERS', 2)),
+    thread_name_prefix='tripbox-bg'
+)
+
+
+def run_in_background(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) in an app context on the background pool.
+
+    With BACKGROUND_SYNC set in the app config the call runs inline, which
+    keeps tests and benchmarks deterministic.
+    """
+    app = current_app._get_current_object()
+
+    def task():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                print(f"❌ Background task {fn.__name__} failed: {e}")
+
+    if app.config.get('BACKGROUND_SYNC'):
+        return task()
+    return _executor.submit(task)
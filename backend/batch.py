@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from werkzeug.test import EnvironBuilder
+
+batch_bp = Blueprint('batch_bp', __name__)
+
+MAX_BATCH_SIZE = 20
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='tripbox-batch')
+
+
+def _run_subrequest(app, entry, authorization, base_url):
+    """Dispatch one sub-request through the app's URL map and return its result entry"""
+    method = str(entry.get('method', 'GET')).upper()
+    path = entry.get('path') or ''
+    if not path.startswith('/api/') or path.split('?')[0].rstrip('/') == '/api/batch':
+        return {'status': 400, 'body': {'error': 'Only /api/ paths (other than /api/batch) can be batched'}}
+
+    builder = EnvironBuilder(
+        path=path,
+        base_url=base_url,
+        method=method,
+        json=entry.get('body'),
+        # Every sub-request runs as the identity that authenticated the batch
+        headers={'Authorization': authorization}
+    )
+    try:
+        # Its own app context, so the sub-request gets a fresh g and database session instead
+        # of sharing the batch's - otherwise its request hooks would consume the batch's state
+        with app.app_context(), app.request_context(builder.get_environ()):
+            response = app.full_dispatch_request()
+    except Exception as e:
+        return {'status': 500, 'body': {'error': str(e)}}
+
+    if response.direct_passthrough or response.is_streamed:
+        # Files and streams are not inlined - fetch those directly
+        body = None
+    elif response.is_json:
+        body = response.get_json()
+    elif response.mimetype.startswith('text/'):
+        body = response.get_data(as_text=True)
+    else:
+        body = None
+    response.close()
+    return {'status': response.status_code, 'body': body}
+
+
+@batch_bp.route('/api/batch', methods=['POST'])
+@jwt_required()
+def batch():
+    """Execute several API calls in one HTTP request.
+
+    Body: {"requests": [{"method": "GET", "path": "/api/...", "body": {...}}], "parallel": false}
+    Responses come back in request order. With "parallel": true, consecutive GETs
+    run concurrently; any other method waits for everything before it.
+    """
+    data = request.get_json() or {}
+    entries = data.get('requests')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(entries) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} requests per batch'}), 400
+    if not all(isinstance(entry, dict) for entry in entries):
+        return jsonify({'error': 'Each request must be an object'}), 400
+
+    app = current_app._get_current_object()
+    authorization = request.headers.get('Authorization')
+    base_url = request.host_url
+    parallel = bool(data.get('parallel'))
+
+    results = [None] * len(entries)
+    pending = []  # indexes of GETs that may run together
+
+    def flush_pending():
+        futures = [(i, _executor.submit(_run_subrequest, app, entries[i], authorization, base_url)) for i in pending]
+        for i, future in futures:
+            results[i] = future.result()
+        pending.clear()
+
+    for i, entry in enumerate(entries):
+        if parallel and str(entry.get('method', 'GET')).upper() == 'GET':
+            pending.append(i)
+            continue
+        flush_pending()
+        results[i] = _run_subrequest(app, entry, authorization, base_url)
+    flush_pending()
+
+    return jsonify({'responses': results})
@@ -0,0 +1,294 @@
+"""Drive the seeded trip with frontend-shaped traffic and report latency per endpoint.
+
+    cd backend
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --reset
+    DATABASE_URL=sqlite:///bench.db gunicorn -w 4 benchmarks.wsgi:app &
+    python -m benchmarks.run --label sqlite --users 50 --duration 120 --speed 5
+
+Reports count, errors, p50/p95/p99 latency and throughput per endpoint and
+writes them to benchmarks/results/. --save-baseline stores the run as
+benchmarks/baselines/<label>.json; --compare checks a run against that
+baseline and exits non-zero when an endpoint's p95 regressed by more than
+--tolerance. --in-process skips the HTTP server and drives the app through
+Flask's test client against DATABASE_URL.
+
+--speed divides every polling interval, so --speed 5 replays five minutes of
+real traffic per minute.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks.scenarios import FINAL_TASKS, SCENARIOS
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+BASELINES_DIR = os.path.join(BENCH_DIR, 'baselines')
+# Regressions smaller than this are noise, whatever the percentage
+MIN_REGRESSION_MS = 5.0
+
+
+class HttpTransport:
+    """One keep-alive connection per virtual user"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._connect = lambda: connection_class(parts.netloc, timeout=timeout)
+        self._connection = self._connect()
+        self._used = False
+
+    def request(self, method, path, body, headers):
+        payload = json.dumps(body).encode() if body is not None else None
+        if payload is not None:
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        reused = self._used
+        try:
+            return self._send(method, path, payload, headers)
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            if not reused:
+                raise
+            # The server closed the idle keep-alive connection between polls
+            return self._send(method, path, payload, headers)
+
+    def _send(self, method, path, payload, headers):
+        try:
+            self._connection.request(method, path, body=payload, headers=headers)
+            response = self._connection.getresponse()
+            status, data = response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            self._reset()
+            raise
+        self._used = True
+        return status, data, response.headers
+
+    def _reset(self):
+        self._connection.close()
+        self._connection = self._connect()
+        self._used = False
+
+
+class InProcessTransport:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body, headers):
+        response = self._client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_data(), response.headers
+
+
+class VirtualUser:
+    def __init__(self, transport, samples):
+        self.transport = transport
+        self.samples = samples
+        self.token = None
+
+    def login(self, email, password):
+        status, body, _ = self.transport.request('POST', '/api/login', {'email': email, 'password': password}, {})
+        if status != 200:
+            raise RuntimeError(f'Login failed for {email}: {status}')
+        self.token = json.loads(body)['token']
+
+    def call(self, name, method, path, body=None):
+        """Time one request under name; returns (decoded JSON, headers) for a 200, else (None, {})"""
+        headers = {'Authorization': f'Bearer {self.token}'}
+        start = time.perf_counter()
+        try:
+            status, data, response_headers = self.transport.request(method, path, body, headers)
+        except Exception:
+            status = 0
+        self.samples.append((name, status, (time.perf_counter() - start) * 1000))
+        if status != 200:
+            return None, {}
+        try:
+            return json.loads(data), response_headers
+        except ValueError:
+            return None, {}
+
+
+def _run_user(user, tasks, ctx, speed, deadline):
+    # Stagger first runs across each interval so users don't poll in lockstep
+    now = time.monotonic()
+    due = []
+    for task in tasks:
+        if task.interval is None:
+            task.run(user, ctx)
+        else:
+            due.append([now + random.uniform(0, task.interval / speed), task])
+    while due:
+        due.sort(key=lambda entry: entry[0])
+        next_at, task = due[0]
+        # A user that fell behind skips the missed runs rather than replaying them after the deadline
+        if next_at >= deadline or time.monotonic() >= deadline:
+            return
+        time.sleep(max(0.0, next_at - time.monotonic()))
+        task.run(user, ctx)
+        due[0][0] = max(next_at + task.interval / speed, time.monotonic())
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    for name, status, ms in samples:
+        by_endpoint[name].append(ms)
+        if status == 0 or status >= 400:
+            errors[name] += 1
+    endpoints = {}
+    for name, values in sorted(by_endpoint.items()):
+        values.sort()
+        endpoints[name] = {
+            'count': len(values),
+            'errors': errors[name],
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'mean_ms': round(sum(values) / len(values), 2),
+            'rps': round(len(values) / elapsed, 3) if elapsed else None,
+        }
+    return endpoints
+
+
+def compare(endpoints, baseline, tolerance):
+    """[(name, baseline p95, current p95)] for endpoints that got slower than tolerance allows"""
+    regressions = []
+    for name, current in endpoints.items():
+        previous = baseline['endpoints'].get(name)
+        if not previous:
+            continue
+        limit = previous['p95_ms'] * (1 + tolerance)
+        if current['p95_ms'] > limit and current['p95_ms'] - previous['p95_ms'] > MIN_REGRESSION_MS:
+            regressions.append((name, previous['p95_ms'], current['p95_ms']))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    print(f"\n{report['label']}: {report['config']['users']} users, {report['elapsed_s']}s, "
+          f"{report['total_requests']} requests, {report['throughput_rps']} req/s")
+    header = f"{'endpoint':58} {'count':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>7}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for name, row in report['endpoints'].items():
+        line = (f"{name[:58]:58} {row['count']:>6} {row['errors']:>4} {row['p50_ms']:>8.1f} "
+                f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['rps']:>7.2f}")
+        previous = baseline and baseline['endpoints'].get(name)
+        if previous and previous['p95_ms']:
+            line += f" {(row['p95_ms'] / previous['p95_ms'] - 1) * 100:>+11.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds before a request counts as failed')
+    parser.add_argument('--in-process', action='store_true', help='use the Flask test client instead of HTTP')
+    parser.add_argument('--manifest', default=os.path.join(RESULTS_DIR, 'manifest.json'))
+    parser.add_argument('--label', default='sqlite', help='names the baseline, e.g. sqlite or postgresql')
+    parser.add_argument('--users', type=int, default=50, help='virtual users; the first is the trip owner')
+    parser.add_argument('--duration', type=float, default=60, help='seconds of timed traffic')
+    parser.add_argument('--speed', type=float, default=1.0, help='divide polling intervals by this')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true', help='fail if p95 regressed against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth, 0.2 = 20%%')
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    ctx = {key: manifest[key] for key in ('trip_id', 'group_id', 'recommendation_ids')}
+    emails = manifest['members'][:args.users]
+
+    if args.in_process:
+        sys.path.insert(0, BACKEND_DIR)
+        os.chdir(BACKEND_DIR)
+        from benchmarks.wsgi import app
+        # Per-request query logs would drown the report
+        logging.getLogger('tripbox.queries').setLevel(logging.ERROR)
+        make_transport = lambda: InProcessTransport(app)
+    else:
+        make_transport = lambda: HttpTransport(args.base_url, args.timeout)
+
+    samples = []  # list.append is atomic, so users share it
+    users = []
+    for email in emails:
+        user = VirtualUser(make_transport(), samples)
+        user.login(email, manifest['password'])
+        users.append(user)
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = []
+    for i, user in enumerate(users):
+        scenario = 'dashboard' if i == 0 else 'advanced'
+        thread = threading.Thread(target=_run_user, args=(user, SCENARIOS[scenario], ctx, args.speed, deadline),
+                                  name=f'bench-user-{i}', daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    for task in FINAL_TASKS['dashboard']:
+        task.run(users[0], ctx)
+
+    report = {
+        'label': args.label,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'config': {'users': len(users), 'duration_s': args.duration, 'speed': args.speed, 'timeout_s': args.timeout,
+                   'in_process': args.in_process, 'seed_counts': manifest.get('counts')},
+        'elapsed_s': round(elapsed, 1),
+        'total_requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'endpoints': summarize(samples, elapsed),
+    }
+
+    baseline_path = os.path.join(BASELINES_DIR, f'{args.label}.json')
+    baseline = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"{args.label}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.json")
+    with open(result_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {result_path}")
+
+    if args.save_baseline:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved to {baseline_path}")
+
+    if args.compare:
+        if not baseline:
+            print(f"❌ No baseline at {baseline_path}")
+            return 1
+        regressions = compare(report['endpoints'], baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"❌ {name}: p95 {before:.1f}ms -> {after:.1f}ms")
+        if regressions:
+            return 1
+        print(f"✅ No p95 regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
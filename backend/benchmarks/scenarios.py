@@ -0,0 +1,126 @@
+"""Traffic scripts modeled on the frontend.
+
+Each scenario is a list of Tasks a virtual user repeats on a timer, using the
+same endpoints and intervals as the page it imitates:
+
+- dashboard: the trip owner on dashboard.html - page loads (overview, tabs,
+  polls + recommendations through /api/batch), finalization preview, PDF
+  generation, and a single finalize when the run ends.
+- advanced: a member on advanced-features.html - chat polling every 5s,
+  live location every 30s, plus occasional messages, votes and expense views.
+
+PDF reports and live locations are served by benchmarks.wsgi, since app.py
+does not register those blueprints.
+"""
+import random
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+
+@dataclass
+class Task:
+    name: str
+    interval: Optional[float]  # seconds between runs; None runs once when the user starts
+    run: Callable
+
+
+def all_pages(user, name, path, first_page=None):
+    """GET every page of a list like the frontend's apiCallAllPages; each page is one sample.
+    Object pages carry next_cursor in the body, bare lists in the X-Next-Cursor header."""
+    page, headers = (first_page, {}) if first_page is not None else user.call(name, 'GET', path)
+    while page is not None:
+        cursor = page.get('next_cursor') if isinstance(page, dict) else headers.get('X-Next-Cursor')
+        if not cursor:
+            return
+        separator = '&' if '?' in path else '?'
+        page, headers = user.call(name, 'GET', f"{path}{separator}{urlencode({'cursor': cursor})}")
+
+
+def load_dashboard(user, ctx):
+    trip = ctx['trip_id']
+    all_pages(user, 'GET /api/trips/overview', '/api/trips/overview')
+    all_pages(user, 'GET /api/trips/{trip_id}/expenses', f'/api/trips/{trip}/expenses')
+    all_pages(user, 'GET /api/trips/{trip_id}/gallery', f'/api/trips/{trip}/gallery')
+    all_pages(user, 'GET /api/trips/{trip_id}/itinerary', f'/api/trips/{trip}/itinerary')
+    batch, _ = user.call('POST /api/batch (polls + recommendations)', 'POST', '/api/batch', {
+        'parallel': True,
+        'requests': [
+            {'method': 'GET', 'path': f'/api/trips/{trip}/polls'},
+            {'method': 'GET', 'path': f'/api/trips/{trip}/recommendations'},
+        ],
+    })
+    if batch:
+        polls, recommendations = (response.get('body') for response in batch['responses'])
+        all_pages(user, 'GET /api/trips/{trip_id}/polls', f'/api/trips/{trip}/polls', polls)
+        all_pages(user, 'GET /api/trips/{trip_id}/recommendations', f'/api/trips/{trip}/recommendations',
+                  recommendations)
+    user.call('GET /api/trips/{trip_id}/enhanced-chat', 'GET', f'/api/trips/{trip}/enhanced-chat')
+
+
+def preview_finalization(user, ctx):
+    user.call('GET /api/trips/{trip_id}/preview-finalization', 'GET', f"/api/trips/{ctx['trip_id']}/preview-finalization")
+
+
+def generate_pdf(user, ctx):
+    user.call('POST /api/trips/{trip_id}/generate-pdf', 'POST', f"/api/trips/{ctx['trip_id']}/generate-pdf", {
+        'include_sections': {'expenses': True, 'checklist': True, 'recommendations': True, 'chat': True},
+    })
+
+
+def finalize(user, ctx):
+    user.call('POST /api/trips/{trip_id}/finalize', 'POST', f"/api/trips/{ctx['trip_id']}/finalize",
+              {'summary': 'Finalized by the benchmark run'})
+
+
+def poll_chat(user, ctx):
+    user.call('GET /api/groups/{group_id}/enhanced-chat', 'GET', f"/api/groups/{ctx['group_id']}/enhanced-chat")
+
+
+def send_message(user, ctx):
+    user.call('POST /api/groups/{group_id}/enhanced-chat', 'POST', f"/api/groups/{ctx['group_id']}/enhanced-chat",
+              {'message': f'Benchmark message {random.randint(0, 10 ** 6)}', 'message_type': 'text'})
+
+
+def update_location(user, ctx):
+    group = ctx['group_id']
+    user.call('POST /api/groups/{group_id}/live-location/update', 'POST', f'/api/groups/{group}/live-location/update', {
+        'latitude': 38.72 + random.uniform(-0.05, 0.05),
+        'longitude': -9.14 + random.uniform(-0.05, 0.05),
+        'accuracy': random.uniform(3, 30),
+        'battery_level': random.randint(10, 100),
+    })
+    user.call('GET /api/groups/{group_id}/live-location/members', 'GET', f'/api/groups/{group}/live-location/members')
+
+
+def vote_on_recommendation(user, ctx):
+    if ctx['recommendation_ids']:
+        rec = random.choice(ctx['recommendation_ids'])
+        user.call('POST /api/recommendations/{id}/vote', 'POST', f'/api/recommendations/{rec}/vote',
+                  {'vote': random.choice(['approve', 'reject', 'neutral'])})
+
+
+def view_expenses(user, ctx):
+    all_pages(user, 'GET /api/groups/{group_id}/expenses', f"/api/groups/{ctx['group_id']}/expenses")
+
+
+SCENARIOS = {
+    'dashboard': [
+        Task('open dashboard', None, load_dashboard),
+        Task('reload dashboard', 120, load_dashboard),
+        Task('preview finalization', 120, preview_finalization),
+        Task('generate pdf', 300, generate_pdf),
+    ],
+    'advanced': [
+        Task('poll chat', 5, poll_chat),
+        Task('share location', 30, update_location),
+        Task('send message', 60, send_message),
+        Task('view expenses', 60, view_expenses),
+        Task('vote', 90, vote_on_recommendation),
+    ],
+}
+
+# Run once by the owner after the timed part, since a trip can only be finalized once
+FINAL_TASKS = {
+    'dashboard': [Task('finalize', None, finalize)],
+}
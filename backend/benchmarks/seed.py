@@ -0,0 +1,233 @@
+"""Build a realistic benchmark dataset: one trip whose group has heavy history.
+
+    cd backend
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --reset
+
+Defaults: 50 members, 20k chat messages, 5k location fixes, 2k expenses and
+2k photos, plus itinerary items, recommendations with votes and polls.
+--scale multiplies every count except the number of members. Writes a
+manifest (ids and logins) that benchmarks.run reads.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MANIFEST = os.path.join(BACKEND_DIR, 'benchmarks', 'results', 'manifest.json')
+PASSWORD = 'bench-password'
+BATCH_SIZE = 1000
+
+COUNTS = {
+    'members': 50,
+    'chat_messages': 20000,
+    'locations': 5000,
+    'expenses': 2000,
+    'photos': 2000,
+    'itinerary_items': 300,
+    'recommendations': 150,
+    'polls': 30,
+    'checklist_items': 200,
+}
+
+CITIES = [
+    ('Lisbon', 38.7223, -9.1393), ('Porto', 41.1579, -8.6291), ('Madrid', 40.4168, -3.7038),
+    ('Barcelona', 41.3874, 2.1686), ('Seville', 37.3891, -5.9845), ('Valencia', 39.4699, -0.3763),
+]
+CATEGORIES = ['Food', 'Hotel', 'Transport', 'Activities', 'Shopping', 'Other']
+ITEM_TYPES = ['hotel', 'flight', 'activity', 'restaurant']
+WORDS = ('beach dinner museum train ticket tapas sunset hike gallery market castle ferry '
+         'breakfast tour wine river bridge cathedral rooftop garden').split()
+
+
+def _sentence(rng, low=4, high=18):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + '.'
+
+
+def _insert(table, rows):
+    from models import db
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def seed(scale=1.0, seed_value=42):
+    from auth import bcrypt
+    from recommend import wilson_lower_bound
+    from itinerary import schedule_fields
+    from models import (db, User, Trip, Group, GroupMember, EnhancedChatMessage, ChatMessage, LiveLocation,
+                        Expense, GalleryImage, ItineraryItem, Recommendation, RecommendationVote, Poll,
+                        PollVote, PollOptionTally, ChecklistItem, BudgetItem)
+
+    rng = random.Random(seed_value)
+    # The group keeps its 50 members at any scale; only the history shrinks or grows
+    counts = {name: n if name == 'members' else max(1, int(n * scale)) for name, n in COUNTS.items()}
+    now = datetime.utcnow().replace(microsecond=0)
+    trip_start = (now + timedelta(days=14)).date()
+
+    # Hash once; every benchmark user shares the password
+    password_hash = bcrypt.generate_password_hash(PASSWORD).decode('utf-8')
+    users = [User(email=f'bench-{i}@example.com', password=password_hash, name=f'Bench User {i}')
+             for i in range(counts['members'])]
+    db.session.add_all(users)
+    db.session.flush()
+    owner = users[0]
+
+    trip_end = trip_start + timedelta(days=10)
+    trip = Trip(user_id=owner.id, name='Benchmark Trip', start_date=trip_start.isoformat(), start_on=trip_start,
+                end_date=trip_end.isoformat(), end_on=trip_end, description='Seeded by benchmarks.seed')
+    db.session.add(trip)
+    db.session.flush()
+    group = Group(name='Benchmark Trip Group', creator_id=owner.id, trip_id=trip.id)
+    db.session.add(group)
+    db.session.flush()
+    _insert(GroupMember.__table__, [{'group_id': group.id, 'user_id': u.id} for u in users])
+
+    def member():
+        return rng.choice(users).id
+
+    def past(days=60):
+        return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+    _insert(EnhancedChatMessage.__table__, [{
+        'group_id': group.id, 'user_id': member(), 'message': _sentence(rng), 'message_type': 'text',
+        'is_edited': False, 'read_by': json.dumps([]), 'timestamp': past(),
+    } for _ in range(counts['chat_messages'])])
+    _insert(ChatMessage.__table__, [{
+        'group_id': group.id, 'user_id': member(), 'message': _sentence(rng), 'timestamp': past(),
+    } for _ in range(counts['chat_messages'] // 10)])
+
+    locations = []
+    for _ in range(counts['locations']):
+        name, lat, lng = rng.choice(CITIES)
+        locations.append({
+            'group_id': group.id, 'user_id': member(), 'latitude': lat + rng.uniform(-0.05, 0.05),
+            'longitude': lng + rng.uniform(-0.05, 0.05), 'accuracy': rng.uniform(3, 40),
+            'timestamp': now - timedelta(seconds=rng.randint(0, 3 * 86400)), 'is_active': False,
+            'battery_level': rng.randint(5, 100), 'location_name': name,
+        })
+    _insert(LiveLocation.__table__, locations)
+
+    _insert(Expense.__table__, [{
+        'group_id': group.id, 'user_id': member(), 'amount': round(rng.uniform(3, 400), 2),
+        'category': rng.choice(CATEGORIES), 'note': _sentence(rng, 2, 6), 'timestamp': past(),
+    } for _ in range(counts['expenses'])])
+    _insert(BudgetItem.__table__, [{
+        'group_id': group.id, 'user_id': owner.id, 'category': category, 'amount': rng.randint(200, 3000),
+        'timestamp': past(),
+    } for category in CATEGORIES])
+
+    photos = []
+    for i in range(counts['photos']):
+        _, lat, lng = rng.choice(CITIES)
+        taken_at = past(30)
+        photos.append({
+            'group_id': group.id, 'user_id': member(), 'filename': f'bench_{i:05d}.jpg',
+            'timestamp': taken_at + timedelta(hours=rng.randint(0, 48)), 'taken_at': taken_at,
+            'latitude': lat + rng.uniform(-0.02, 0.02), 'longitude': lng + rng.uniform(-0.02, 0.02),
+            'orientation': 1, 'width': 4032, 'height': 3024, 'metadata_status': 'done',
+            'perceptual_hash': f'{rng.getrandbits(64):016x}',
+        })
+    _insert(GalleryImage.__table__, photos)
+
+    items = []
+    for _ in range(counts['itinerary_items']):
+        item_type = rng.choice(ITEM_TYPES)
+        day = trip_start + timedelta(days=rng.randint(0, 10))
+        date = day.isoformat()
+        time = f'{rng.randint(6, 22):02d}:{rng.choice([0, 15, 30, 45]):02d}'
+        start_at, end_at, duration = schedule_fields(item_type, date, time)
+        city, lat, lng = rng.choice(CITIES)
+        items.append({
+            'group_id': group.id, 'user_id': member(), 'type': item_type,
+            'title': _sentence(rng, 2, 5), 'description': _sentence(rng), 'location': city,
+            'latitude': lat, 'longitude': lng,
+            'date': date, 'day': day, 'time': time,
+            'start_at': start_at, 'end_at': end_at, 'duration_minutes': duration,
+            'cost': round(rng.uniform(0, 300), 2), 'confirmed': rng.random() < 0.6, 'timestamp': past(),
+        })
+    _insert(ItineraryItem.__table__, items)
+
+    recommendations = [Recommendation(group_id=group.id, user_id=member(), title=_sentence(rng, 2, 5),
+                                      type=rng.choice(ITEM_TYPES), comment=_sentence(rng))
+                       for _ in range(counts['recommendations'])]
+    db.session.add_all(recommendations)
+    db.session.flush()
+    votes = []
+    for rec in recommendations:
+        rec_votes = [rng.choice(['approve', 'approve', 'reject', 'neutral'])
+                     for _ in range(rng.randint(0, min(15, len(users))))]
+        for voter, vote in zip(rng.sample(users, len(rec_votes)), rec_votes):
+            votes.append({'recommendation_id': rec.id, 'user_id': voter.id, 'vote': vote, 'timestamp': past()})
+        rec.approve_count, rec.reject_count = rec_votes.count('approve'), rec_votes.count('reject')
+        rec.score = wilson_lower_bound(rec.approve_count, rec.reject_count)
+    _insert(RecommendationVote.__table__, votes)
+
+    poll_votes, tallies = [], []
+    for _ in range(counts['polls']):
+        options = [_sentence(rng, 1, 3) for _ in range(rng.randint(2, 5))]
+        poll = Poll(group_id=group.id, user_id=member(), question=_sentence(rng, 3, 8) + '?',
+                    options=json.dumps(options), is_active=True, multiple_choice=False, timestamp=past(),
+                    expires_at=now + timedelta(days=rng.randint(1, 7)))
+        db.session.add(poll)
+        db.session.flush()
+        choices = {u.id: rng.randrange(len(options)) for u in rng.sample(users, rng.randint(0, len(users)))}
+        poll_votes += [{'poll_id': poll.id, 'user_id': user_id, 'option_index': choice, 'timestamp': past()}
+                       for user_id, choice in choices.items()]
+        tallies += [{'poll_id': poll.id, 'option_index': i, 'count': list(choices.values()).count(i)}
+                    for i in range(len(options))]
+    _insert(PollVote.__table__, poll_votes)
+    _insert(PollOptionTally.__table__, tallies)
+
+    _insert(ChecklistItem.__table__, [{
+        'group_id': group.id, 'user_id': member(), 'type': 'checklist', 'text': _sentence(rng, 2, 6),
+        'completed': rng.random() < 0.5, 'timestamp': past(),
+    } for _ in range(counts['checklist_items'])])
+
+    db.session.commit()
+    return {
+        'trip_id': trip.id,
+        'group_id': group.id,
+        'owner': owner.email,
+        'members': [u.email for u in users],
+        'password': PASSWORD,
+        'recommendation_ids': [r.id for r in recommendations[:20]],
+        'counts': counts,
+        'seeded_at': now.isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every history row count')
+    parser.add_argument('--seed', type=int, default=42, help='random seed, for reproducible data')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app import app
+    from migrate import run_migrations
+    from models import db
+
+    with app.app_context():
+        if args.reset:
+            print(f"⚠️  Dropping all tables in {db.engine.url.render_as_string(hide_password=True)}")
+            db.drop_all()
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('DROP TABLE IF EXISTS schema_version')
+            db.create_all()
+            run_migrations(db.engine)
+        manifest = seed(args.scale, args.seed)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.manifest)), exist_ok=True)
+    with open(args.manifest, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ Seeded trip {manifest['trip_id']} (group {manifest['group_id']}): {manifest['counts']}")
+    print(f"✅ Manifest written to {args.manifest}")
+
+
+if __name__ == '__main__':
+    main()
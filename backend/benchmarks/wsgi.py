@@ -0,0 +1,20 @@
+"""The app as benchmarked: app.py plus the blueprints the frontend calls but
+app.py does not register yet (live locations, PDF reports). Serving them here
+keeps them off in production while the scenarios can still measure them.
+
+    gunicorn -w 4 --threads 4 benchmarks.wsgi:app
+"""
+from app import app
+
+try:
+    from live_location import live_location_bp
+    app.register_blueprint(live_location_bp)
+except ImportError as e:
+    print(f"❌ live_location_bp not available: {e}")
+
+try:
+    from pdf_generator import pdf_generator_bp
+    app.register_blueprint(pdf_generator_bp)
+except ImportError as e:
+    # Needs reportlab; without it the PDF scenario records 404s
+    print(f"❌ pdf_generator_bp not available: {e}")
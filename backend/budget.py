@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GroupMember, BudgetItem  # ✅ Import BudgetItem instead of redefining it
+from models import db, BudgetItem  # ✅ Import BudgetItem instead of redefining it
+from authz import is_group_member
 from datetime import datetime
 
 budget_bp = Blueprint('budget_bp', __name__)
@@ -11,7 +12,7 @@ budget_bp = Blueprint('budget_bp', __name__)
 def add_budget(group_id):
     user_id = int(get_jwt_identity())
     data = request.get_json()
-    if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+    if not is_group_member(group_id, user_id):
         return jsonify({'error': 'Unauthorized'}), 403
 
     item = BudgetItem(
@@ -29,7 +30,7 @@ def add_budget(group_id):
 @jwt_required()
 def get_budget(group_id):
     user_id = int(get_jwt_identity())
-    if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+    if not is_group_member(group_id, user_id):
         return jsonify({'error': 'Unauthorized'}), 403
 
     items = BudgetItem.query.filter_by(group_id=group_id).order_by(BudgetItem.timestamp.desc()).all()
@@ -0,0 +1,176 @@
+"""Fail when a model query has no index to support it.
+
+Walks every query chain in the backend (Model.query... and
+db.session.query(Model...)...) and collects the columns it pins with equality
+(filter_by, ==, in_) and the columns it sorts by. A query is supported when
+it pins a primary key or unique column, or when some index starts with
+pinned columns and, if the query sorts, continues with the first sort column.
+
+    python check_indexes.py
+
+Append "# index-ok" to a line to accept a query on purpose (tiny tables,
+one-off admin paths).
+"""
+import ast
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SKIP_FILES = {'check_indexes.py', 'migrate.py'}
+CHAIN_METHODS = {'filter', 'filter_by', 'order_by', 'join', 'outerjoin', 'options', 'group_by', 'with_entities', 'distinct'}
+SUPPRESS_MARKER = '# index-ok'
+
+
+def model_indexes():
+    """{model class name: (set of unique single columns, [index column tuples])}"""
+    from models import db
+
+    result = {}
+    for mapper in db.Model.registry.mappers:
+        table = mapper.local_table
+        unique = {c.name for c in table.primary_key.columns}
+        unique |= {c.name for c in table.columns if c.unique}
+        indexes = [tuple(c.name for c in index.columns) for index in table.indexes]
+        indexes += [tuple(c.name for c in constraint.columns) for constraint in table.constraints
+                    if constraint.__class__.__name__ == 'UniqueConstraint']
+        for index in indexes:
+            if len(index) == 1 and any(i.unique for i in table.indexes if tuple(c.name for c in i.columns) == index):
+                unique.add(index[0])
+        result[mapper.class_.__name__] = (unique, indexes)
+    return result
+
+
+def _column_of(node, models):
+    """(model, column) for Model.column, else None"""
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in models:
+        return node.value.id, node.attr
+    return None
+
+
+def _query_model(node, models):
+    """Model name a query expression selects from, or None"""
+    if isinstance(node, ast.Attribute) and node.attr == 'query' and isinstance(node.value, ast.Name):
+        return node.value.id if node.value.id in models else None
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        if node.func.attr == 'query' and node.args:
+            first = node.args[0]
+            if isinstance(first, ast.Name) and first.id in models:
+                return first.id
+            column = _column_of(first, models)
+            return column[0] if column else None
+        if node.func.attr in CHAIN_METHODS:
+            return _query_model(node.func.value, models)
+    return None
+
+
+def _equality_columns(expr, model, models):
+    columns = set()
+    if isinstance(expr, ast.Compare) and len(expr.ops) == 1 and isinstance(expr.ops[0], ast.Eq):
+        for side in (expr.left, expr.comparators[0]):
+            column = _column_of(side, models)
+            if column and column[0] == model:
+                columns.add(column[1])
+    elif isinstance(expr, ast.Call) and isinstance(expr.func, ast.Attribute):
+        if expr.func.attr == 'in_':
+            column = _column_of(expr.func.value, models)
+            if column and column[0] == model:
+                columns.add(column[1])
+        elif expr.func.attr == 'and_' or (isinstance(expr.func, ast.Name) and expr.func.id == 'and_'):
+            for arg in expr.args:
+                columns |= _equality_columns(arg, model, models)
+    elif isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name) and expr.func.id == 'and_':
+        for arg in expr.args:
+            columns |= _equality_columns(arg, model, models)
+    return columns
+
+
+def _sort_column(expr, model, models):
+    if isinstance(expr, ast.Call) and isinstance(expr.func, ast.Attribute) and expr.func.attr in ('asc', 'desc'):
+        expr = expr.func.value
+    column = _column_of(expr, models)
+    return column[1] if column and column[0] == model else None
+
+
+def _chain_shape(node, model, models):
+    """(pinned columns, sort columns) collected along one query chain"""
+    pinned, sort = set(), []
+    while isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in CHAIN_METHODS:
+        method = node.func.attr
+        if method == 'filter_by':
+            pinned |= {kw.arg for kw in node.keywords if kw.arg}
+        elif method == 'filter':
+            for arg in node.args:
+                pinned |= _equality_columns(arg, model, models)
+        elif method == 'order_by':
+            sort = [c for c in (_sort_column(arg, model, models) for arg in node.args) if c] or sort
+        node = node.func.value
+    return pinned, sort
+
+
+def is_supported(pinned, sort, unique, indexes):
+    if not pinned or pinned & unique:
+        return True
+    for index in indexes:
+        prefix = 0
+        while prefix < len(index) and index[prefix] in pinned:
+            prefix += 1
+        if not prefix:
+            continue
+        remaining = [c for c in sort if c not in pinned]
+        if not remaining or (prefix < len(index) and index[prefix] == remaining[0]):
+            return True
+    return False
+
+
+def check_file(path, models):
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    lines = source.splitlines()
+    tree = ast.parse(source, filename=path)
+
+    # Only judge the outermost call of each chain
+    inner = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in CHAIN_METHODS:
+            inner.add(id(node.func.value))
+
+    problems = []
+    for node in ast.walk(tree):
+        if id(node) in inner or not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        if node.func.attr not in CHAIN_METHODS:
+            continue
+        model = _query_model(node, models)
+        if not model:
+            continue
+        pinned, sort = _chain_shape(node, model, models)
+        unique, indexes = models[model]
+        if is_supported(pinned, sort, unique, indexes):
+            continue
+        if any(SUPPRESS_MARKER in lines[i - 1] for i in range(node.lineno, node.end_lineno + 1)):
+            continue
+        shape = f"{model} where {', '.join(sorted(pinned))}"
+        if sort:
+            shape += f" order by {', '.join(sort)}"
+        problems.append(f"{os.path.relpath(path, BACKEND_DIR)}:{node.lineno}: no index for {shape}")
+    return problems
+
+
+def main():
+    sys.path.insert(0, BACKEND_DIR)
+    models = model_indexes()
+    problems = []
+    for filename in sorted(os.listdir(BACKEND_DIR)):
+        if filename.endswith('.py') and filename not in SKIP_FILES:
+            problems += check_file(os.path.join(BACKEND_DIR, filename), models)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        print(f"{len(problems)} unindexed queries")
+        return 1
+    print("✅ Every model query has a supporting index")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GroupMember, ChecklistItem  # ✅ IMPORT model
+from models import db, ChecklistItem  # ✅ IMPORT model
+from authz import is_group_member
+from revisions import not_modified_response
+from pagination import keyset_page, paged_response
 from datetime import datetime
 
 checklist_bp = Blueprint('checklist_bp', __name__)
@@ -11,7 +14,7 @@ checklist_bp = Blueprint('checklist_bp', __name__)
 def add_item(group_id):
     user_id = int(get_jwt_identity())
     data = request.get_json()
-    if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+    if not is_group_member(group_id, user_id):
         return jsonify({'error': 'Unauthorized'}), 403
 
     item = ChecklistItem(
@@ -29,18 +32,26 @@ def add_item(group_id):
 @jwt_required()
 def get_items(group_id):
     user_id = int(get_jwt_identity())
-    if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+    if not is_group_member(group_id, user_id):
         return jsonify({'error': 'Unauthorized'}), 403
 
-    items = ChecklistItem.query.filter_by(group_id=group_id).all()
-    return jsonify([{
+    not_modified = not_modified_response(group_id, 'checklist')
+    if not_modified:
+        return not_modified
+
+    try:
+        items, next_cursor = keyset_page(ChecklistItem.query.filter_by(group_id=group_id),
+                                         [ChecklistItem.timestamp, ChecklistItem.id], key=lambda i: [i.timestamp, i.id])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return paged_response([{
         'id': item.id,
         'text': item.text,
         'type': item.type,
         'completed': item.completed,
         'timestamp': item.timestamp.isoformat(),
         'user_id': item.user_id
-    } for item in items])
+    } for item in items], next_cursor)
 
 # ✅ Mark item complete/incomplete
 @checklist_bp.route('/api/checklist/<int:item_id>', methods=['PATCH'])
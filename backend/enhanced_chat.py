@@ -1,11 +1,18 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from models import db, EnhancedChatMessage, Group, GroupMember, User, Recommendation, Notification, Trip
+from authz import is_group_member
+from trip_groups import get_or_create_trip_group
 import json
 from datetime import datetime
 
 enhanced_chat_bp = Blueprint('enhanced_chat_bp', __name__)
 
+def _authors(messages):
+    """user id -> User for the senders of messages, in one query"""
+    user_ids = {message.user_id for message in messages}
+    return {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+
 # Trip-based enhanced chat endpoints
 @enhanced_chat_bp.route('/api/trips/<int:trip_id>/enhanced-chat', methods=['GET'])
 @jwt_required()
@@ -19,28 +26,15 @@ def get_trip_enhanced_messages(trip_id):
         if not trip:
             return jsonify({'error': 'Trip not found or access denied'}), 403
         
-        # Get or create a group for this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
-        if not group:
-            # Create default group for trip
-            group = Group(
-                name=f"{trip.name} Group",
-                creator_id=current_user_id,
-                trip_id=trip_id
-            )
-            db.session.add(group)
-            db.session.flush()  # Get the ID
-            
-            # Add user as member
-            member = GroupMember(group_id=group.id, user_id=current_user_id)
-            db.session.add(member)
-            db.session.commit()
+        group_id = get_or_create_trip_group(trip, current_user_id)
+        db.session.commit()
         
-        messages = EnhancedChatMessage.query.filter_by(group_id=group.id).order_by(EnhancedChatMessage.timestamp).all()
+        messages = EnhancedChatMessage.query.filter_by(group_id=group_id).order_by(EnhancedChatMessage.timestamp).all()
         
         enhanced_messages = []
+        users = _authors(messages)
         for message in messages:
-            user = User.query.get(message.user_id)
+            user = users.get(message.user_id)
             
             # Parse read_by JSON
             read_by = json.loads(message.read_by) if message.read_by else []
@@ -80,24 +74,10 @@ def send_trip_enhanced_message(trip_id):
         if not trip:
             return jsonify({'error': 'Trip not found or access denied'}), 403
         
-        # Get or create a group for this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
-        if not group:
-            # Create default group for trip
-            group = Group(
-                name=f"{trip.name} Group",
-                creator_id=current_user_id,
-                trip_id=trip_id
-            )
-            db.session.add(group)
-            db.session.flush()  # Get the ID
-            
-            # Add user as member
-            member = GroupMember(group_id=group.id, user_id=current_user_id)
-            db.session.add(member)
+        group_id = get_or_create_trip_group(trip, current_user_id)
         
         message = EnhancedChatMessage(
-            group_id=group.id,
+            group_id=group_id,
             user_id=current_user_id,
             message=data.get('message'),
             message_type=data.get('message_type', 'text'),
@@ -125,10 +105,7 @@ def get_enhanced_messages(group_id):
         current_user_id = get_jwt_identity()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -136,8 +113,9 @@ def get_enhanced_messages(group_id):
         messages = EnhancedChatMessage.query.filter_by(group_id=group_id).order_by(EnhancedChatMessage.timestamp).all()
         
         enhanced_messages = []
+        users = _authors(messages)
         for message in messages:
-            user = User.query.get(message.user_id)
+            user = users.get(message.user_id)
             
             # Parse read_by JSON
             read_by = json.loads(message.read_by) if message.read_by else []
@@ -173,10 +151,7 @@ def send_enhanced_message(group_id):
         data = request.get_json()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -255,10 +230,7 @@ def mark_message_read(message_id):
         message = EnhancedChatMessage.query.get_or_404(message_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=message.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(message.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -284,10 +256,7 @@ def get_recommendation_comments(recommendation_id):
         recommendation = Recommendation.query.get_or_404(recommendation_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=recommendation.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(recommendation.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -301,8 +270,9 @@ def get_recommendation_comments(recommendation_id):
         ).order_by(EnhancedChatMessage.timestamp).all()
         
         comment_list = []
+        users = _authors(comments)
         for comment in comments:
-            user = User.query.get(comment.user_id)
+            user = users.get(comment.user_id)
             metadata = json.loads(comment.message_metadata) if comment.message_metadata else {}
             
             if metadata.get('recommendation_id') == recommendation_id:
@@ -329,10 +299,7 @@ def add_recommendation_comment(recommendation_id):
         recommendation = Recommendation.query.get_or_404(recommendation_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=recommendation.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(recommendation.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -387,10 +354,7 @@ def update_typing_status(group_id):
         data = request.get_json()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -413,10 +377,7 @@ def search_messages(group_id):
         query = request.args.get('q', '')
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -427,8 +388,9 @@ def search_messages(group_id):
         ).order_by(EnhancedChatMessage.timestamp.desc()).limit(50).all()
         
         search_results = []
+        users = _authors(messages)
         for message in messages:
-            user = User.query.get(message.user_id)
+            user = users.get(message.user_id)
             search_results.append({
                 'id': message.id,
                 'user_name': user.name if user else 'Unknown',
@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GroupMember, Expense, Trip, Group
+from models import db, GroupMember, Expense, Trip
+from authz import is_group_member
+from trip_groups import get_trip_group_id, get_or_create_trip_group
+from revisions import not_modified_response
+from pagination import keyset_page, paged_response
 
 expense_bp = Blueprint('expense_bp', __name__)
 
@@ -17,24 +21,10 @@ def add_trip_expense(trip_id):
     if not trip:
         return jsonify({'error': 'Trip not found or access denied'}), 403
 
-    # Get or create a group for this trip
-    group = Group.query.filter_by(trip_id=trip_id).first()
-    if not group:
-        # Create default group for trip
-        group = Group(
-            name=f"{trip.name} Group",
-            creator_id=user_id,
-            trip_id=trip_id
-        )
-        db.session.add(group)
-        db.session.flush()  # Get the ID
-        
-        # Add user as member
-        member = GroupMember(group_id=group.id, user_id=user_id)
-        db.session.add(member)
+    group_id = get_or_create_trip_group(trip, user_id)
 
     expense = Expense(
-        group_id=group.id,
+        group_id=group_id,
         user_id=user_id,
         amount=float(data.get('amount', 0)),
         category=data.get('category'),
@@ -55,6 +45,11 @@ def add_trip_expense(trip_id):
         }
     }), 201
 
+def _expense_page(group_id):
+    """Newest first"""
+    return keyset_page(Expense.query.filter_by(group_id=group_id), [Expense.timestamp, Expense.id],
+                       key=lambda e: [e.timestamp, e.id], descending=True)
+
 @expense_bp.route('/api/trips/<int:trip_id>/expenses', methods=['GET'])
 @jwt_required()
 def get_trip_expenses(trip_id):
@@ -66,12 +61,18 @@ def get_trip_expenses(trip_id):
     if not trip:
         return jsonify({'error': 'Trip not found or access denied'}), 403
 
-    # Get or create a group for this trip
-    group = Group.query.filter_by(trip_id=trip_id).first()
-    if not group:
+    group_id = get_trip_group_id(trip_id)
+    if group_id is None:
         return jsonify({'success': True, 'expenses': []})  # No expenses yet
 
-    expenses = Expense.query.filter_by(group_id=group.id).order_by(Expense.timestamp.desc()).all()
+    not_modified = not_modified_response(group_id, 'trip-expenses')
+    if not_modified:
+        return not_modified
+
+    try:
+        expenses, next_cursor = _expense_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     result = [{
         'id': e.id,
         'amount': e.amount,
@@ -81,7 +82,7 @@ def get_trip_expenses(trip_id):
         'timestamp': e.timestamp.isoformat()
     } for e in expenses]
 
-    return jsonify({'success': True, 'expenses': result})
+    return paged_response({'success': True, 'expenses': result}, next_cursor)
 
 # Original group-based endpoints
 # ✅ POST: Add a new expense
@@ -92,7 +93,7 @@ def add_expense(group_id):
     data = request.get_json()
 
     # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    member = is_group_member(group_id, user_id)
     if not member:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
@@ -114,11 +115,18 @@ def add_expense(group_id):
 def get_expenses(group_id):
     user_id = int(get_jwt_identity())
 
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    member = is_group_member(group_id, user_id)
     if not member:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
-    expenses = Expense.query.filter_by(group_id=group_id).order_by(Expense.timestamp.desc()).all()
+    not_modified = not_modified_response(group_id, 'expenses')
+    if not_modified:
+        return not_modified
+
+    try:
+        expenses, next_cursor = _expense_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     result = [{
         'amount': e.amount,
         'category': e.category,
@@ -127,7 +135,7 @@ def get_expenses(group_id):
         'timestamp': e.timestamp.isoformat()
     } for e in expenses]
 
-    return jsonify(result)
+    return paged_response(result, next_cursor)
 
 # ✅ GET: Calculate split across group members
 @expense_bp.route('/api/groups/<int:group_id>/expenses/split', methods=['GET'])
@@ -135,7 +143,7 @@ def get_expenses(group_id):
 def split_expenses(group_id):
     user_id = int(get_jwt_identity())
 
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    member = is_group_member(group_id, user_id)
     if not member:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Trip, Group, GroupMember, ChecklistItem, BudgetItem, Recommendation
+from models import db, Trip, GroupMember, ChecklistItem, BudgetItem, Recommendation
+from trip_groups import get_trip_group
 
 finalize_bp = Blueprint('finalize_bp', __name__)
 
@@ -24,7 +25,7 @@ def trip_summary(trip_id):
     if not trip or not trip.finalized:
         return jsonify({"error": "Trip not finalized or not found"}), 400
 
-    group = Group.query.filter_by(trip_id=trip_id).first()
+    group = get_trip_group(trip_id)
     if not group:
         return jsonify({"error": "Group not found"}), 404
 
@@ -1,12 +1,25 @@
+from datetime import datetime, timedelta
 import os
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GroupMember, GalleryImage, Trip, Group
 from werkzeug.utils import secure_filename
+from sqlalchemy import or_, func
+from models import db, GalleryImage, Trip
+from authz import is_group_member
+from trip_groups import get_trip_group_id, get_or_create_trip_group
+from revisions import not_modified_response
+from upload_store import save_upload, serve_upload, upload_path
+from background import run_in_background
+from photo_metadata import process_image_metadata
+from pagination import keyset_page, page_size, paged_response
+from image_hashing import find_duplicate_clusters
+from zip_stream import stream_zip
 
 gallery_bp = Blueprint('gallery_bp', __name__)
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_DUPLICATE_THRESHOLD = 6  # bits out of 64
+MAX_DUPLICATE_THRESHOLD = 16
 
 # Trip-based gallery endpoints
 @gallery_bp.route('/api/trips/<int:trip_id>/gallery', methods=['POST'])
@@ -27,29 +40,14 @@ def upload_trip_image(trip_id):
     if image.filename == '':
         return jsonify({'error': 'No selected image'}), 400
 
-    # Get or create a group for this trip
-    group = Group.query.filter_by(trip_id=trip_id).first()
-    if not group:
-        # Create default group for trip
-        group = Group(
-            name=f"{trip.name} Group",
-            creator_id=user_id,
-            trip_id=trip_id
-        )
-        db.session.add(group)
-        db.session.flush()  # Get the ID
-        
-        # Add user as member
-        member = GroupMember(group_id=group.id, user_id=user_id)
-        db.session.add(member)
-
-    filename = secure_filename(image.filename)
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    image.save(filepath)
-
-    gallery = GalleryImage(group_id=group.id, user_id=user_id, filename=filename)
+    group_id = get_or_create_trip_group(trip, user_id)
+
+    filename = save_upload(image)
+
+    gallery = GalleryImage(group_id=group_id, user_id=user_id, filename=filename, metadata_status='pending')
     db.session.add(gallery)
     db.session.commit()
+    run_in_background(process_image_metadata, gallery.id)
 
     return jsonify({
         'success': True,
@@ -63,6 +61,11 @@ def upload_trip_image(trip_id):
         }
     }), 201
 
+def _upload_page(group_id):
+    """Newest uploads first"""
+    return keyset_page(GalleryImage.query.filter_by(group_id=group_id), [GalleryImage.timestamp, GalleryImage.id],
+                       key=lambda img: [img.timestamp, img.id], descending=True)
+
 @gallery_bp.route('/api/trips/<int:trip_id>/gallery', methods=['GET'])
 @jwt_required()
 def get_trip_images(trip_id):
@@ -74,12 +77,18 @@ def get_trip_images(trip_id):
     if not trip:
         return jsonify({'error': 'Trip not found or access denied'}), 403
 
-    # Get or create a group for this trip
-    group = Group.query.filter_by(trip_id=trip_id).first()
-    if not group:
+    group_id = get_trip_group_id(trip_id)
+    if group_id is None:
         return jsonify({'success': True, 'images': []})  # No images yet
 
-    images = GalleryImage.query.filter_by(group_id=group.id).order_by(GalleryImage.timestamp.desc()).all()
+    not_modified = not_modified_response(group_id, 'trip-gallery')
+    if not_modified:
+        return not_modified
+
+    try:
+        images, next_cursor = _upload_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     result = [{
         'id': img.id,
         'filename': img.filename,
@@ -87,7 +96,7 @@ def get_trip_images(trip_id):
         'timestamp': img.timestamp.isoformat()
     } for img in images]
 
-    return jsonify({'success': True, 'images': result})
+    return paged_response({'success': True, 'images': result}, next_cursor)
 
 # Upload image
 @gallery_bp.route('/api/groups/<int:group_id>/gallery', methods=['POST'])
@@ -101,17 +110,16 @@ def upload_image(group_id):
     if image.filename == '':
         return jsonify({'error': 'No selected image'}), 400
 
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    member = is_group_member(group_id, user_id)
     if not member:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
-    filename = secure_filename(image.filename)
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    image.save(filepath)
+    filename = save_upload(image)
 
-    gallery = GalleryImage(group_id=group_id, user_id=user_id, filename=filename)
+    gallery = GalleryImage(group_id=group_id, user_id=user_id, filename=filename, metadata_status='pending')
     db.session.add(gallery)
     db.session.commit()
+    run_in_background(process_image_metadata, gallery.id)
 
     return jsonify({'message': 'Image uploaded', 'filename': filename}), 201
 
@@ -120,20 +128,228 @@ def upload_image(group_id):
 @jwt_required()
 def get_images(group_id):
     user_id = int(get_jwt_identity())
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    member = is_group_member(group_id, user_id)
     if not member:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
-    images = GalleryImage.query.filter_by(group_id=group_id).order_by(GalleryImage.timestamp.desc()).all()
+    not_modified = not_modified_response(group_id, 'gallery')
+    if not_modified:
+        return not_modified
+
+    try:
+        images, next_cursor = _upload_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     result = [{
         'filename': img.filename,
         'url': request.host_url + f'uploads/{img.filename}',
         'timestamp': img.timestamp.isoformat()
     } for img in images]
 
-    return jsonify(result)
+    return paged_response(result, next_cursor)
+
+def _image_dict(img):
+    return {
+        'id': img.id,
+        'filename': img.filename,
+        'url': request.host_url + f'uploads/{img.filename}',
+        'user_id': img.user_id,
+        'timestamp': img.timestamp.isoformat() if img.timestamp else None,
+        'taken_at': img.taken_at.isoformat() if img.taken_at else None,
+        'latitude': img.latitude,
+        'longitude': img.longitude,
+        'orientation': img.orientation,
+        'width': img.width,
+        'height': img.height
+    }
+
+def _parse_time_param(name, end_of_range=False):
+    """Parse an ISO date or datetime query parameter; a bare end date covers the whole day"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_range and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def _timeline_page(group_id):
+    """Images with a capture time in [from, to), ordered by (taken_at, id)"""
+    start = _parse_time_param('from')
+    end = _parse_time_param('to', end_of_range=True)
+
+    query = GalleryImage.query.filter(
+        GalleryImage.group_id == group_id,
+        GalleryImage.taken_at.isnot(None)
+    )
+    if start:
+        query = query.filter(GalleryImage.taken_at >= start)
+    if end:
+        query = query.filter(GalleryImage.taken_at < end)
+    images, next_cursor = keyset_page(query, [GalleryImage.taken_at, GalleryImage.id],
+                                      key=lambda img: [img.taken_at, img.id],
+                                      limit=page_size(DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    return paged_response({'success': True, 'images': [_image_dict(img) for img in images]}, next_cursor)
+
+def _map_page(group_id):
+    """Images whose GPS position lies in the requested bounding box, ordered by id"""
+    try:
+        min_lat = float(request.args['min_lat'])
+        max_lat = float(request.args['max_lat'])
+        min_lng = float(request.args['min_lng'])
+        max_lng = float(request.args['max_lng'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'min_lat, max_lat, min_lng and max_lng are required'}), 400
+
+    query = GalleryImage.query.filter(
+        GalleryImage.group_id == group_id,
+        GalleryImage.latitude.between(min_lat, max_lat)
+    )
+    if min_lng <= max_lng:
+        query = query.filter(GalleryImage.longitude.between(min_lng, max_lng))
+    else:
+        # Box crosses the antimeridian
+        query = query.filter(or_(GalleryImage.longitude >= min_lng, GalleryImage.longitude <= max_lng))
+    images, next_cursor = keyset_page(query, [GalleryImage.id], key=lambda img: [img.id],
+                                      limit=page_size(DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    return paged_response({'success': True, 'images': [_image_dict(img) for img in images]}, next_cursor)
+
+def _trip_group_id(trip_id, user_id):
+    trip = Trip.query.filter_by(id=trip_id, user_id=user_id).first()
+    if not trip:
+        return None, (jsonify({'error': 'Trip not found or access denied'}), 403)
+    return get_trip_group_id(trip_id), None
+
+# Photo timeline and map index
+@gallery_bp.route('/api/trips/<int:trip_id>/gallery/timeline', methods=['GET'])
+@jwt_required()
+def get_trip_timeline(trip_id):
+    """Trip photos by capture time, e.g. ?from=2024-07-03&to=2024-07-03"""
+    group_id, error = _trip_group_id(trip_id, int(get_jwt_identity()))
+    if error:
+        return error
+    if group_id is None:
+        return jsonify({'success': True, 'images': [], 'next_cursor': None})
+    try:
+        return _timeline_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@gallery_bp.route('/api/trips/<int:trip_id>/gallery/map', methods=['GET'])
+@jwt_required()
+def get_trip_map(trip_id):
+    """Trip photos inside a bounding box"""
+    group_id, error = _trip_group_id(trip_id, int(get_jwt_identity()))
+    if error:
+        return error
+    if group_id is None:
+        return jsonify({'success': True, 'images': [], 'next_cursor': None})
+    try:
+        return _map_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@gallery_bp.route('/api/groups/<int:group_id>/gallery/timeline', methods=['GET'])
+@jwt_required()
+def get_timeline(group_id):
+    user_id = int(get_jwt_identity())
+    member = is_group_member(group_id, user_id)
+    if not member:
+        return jsonify({'error': 'You are not a member of this group'}), 403
+    try:
+        return _timeline_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@gallery_bp.route('/api/groups/<int:group_id>/gallery/map', methods=['GET'])
+@jwt_required()
+def get_map(group_id):
+    user_id = int(get_jwt_identity())
+    member = is_group_member(group_id, user_id)
+    if not member:
+        return jsonify({'error': 'You are not a member of this group'}), 403
+    try:
+        return _map_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def _duplicates_response(group_id):
+    """Clusters of near-identical images within ?threshold= Hamming bits"""
+    threshold = request.args.get('threshold', DEFAULT_DUPLICATE_THRESHOLD, type=int)
+    threshold = max(0, min(threshold, MAX_DUPLICATE_THRESHOLD))
+    clusters = find_duplicate_clusters(group_id, threshold)
+
+    image_ids = [image_id for cluster in clusters for image_id in cluster]
+    images = {img.id: img for img in GalleryImage.query.filter(GalleryImage.id.in_(image_ids)).all()} if image_ids else {}
+    return jsonify({
+        'success': True,
+        'threshold': threshold,
+        'clusters': [[_image_dict(images[image_id]) for image_id in cluster] for cluster in clusters]
+    })
+
+# Near-duplicate detection
+@gallery_bp.route('/api/trips/<int:trip_id>/gallery/duplicates', methods=['GET'])
+@jwt_required()
+def get_trip_duplicates(trip_id):
+    """Near-duplicate photo clusters for a trip"""
+    group_id, error = _trip_group_id(trip_id, int(get_jwt_identity()))
+    if error:
+        return error
+    if group_id is None:
+        return jsonify({'success': True, 'threshold': None, 'clusters': []})
+    return _duplicates_response(group_id)
+
+@gallery_bp.route('/api/groups/<int:group_id>/gallery/duplicates', methods=['GET'])
+@jwt_required()
+def get_duplicates(group_id):
+    user_id = int(get_jwt_identity())
+    member = is_group_member(group_id, user_id)
+    if not member:
+        return jsonify({'error': 'You are not a member of this group'}), 403
+    return _duplicates_response(group_id)
+
+# Download all photos of a trip as one ZIP
+@gallery_bp.route('/api/trips/<int:trip_id>/gallery/archive', methods=['GET'])
+@jwt_required()
+def download_trip_archive(trip_id):
+    """Stream a ZIP of the trip's photos, optionally filtered by ?from=&to= dates and ?user_id="""
+    user_id = int(get_jwt_identity())
+    trip = Trip.query.filter_by(id=trip_id, user_id=user_id).first()
+    if not trip:
+        return jsonify({'error': 'Trip not found or access denied'}), 403
+
+    try:
+        start = _parse_time_param('from')
+        end = _parse_time_param('to', end_of_range=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = GalleryImage.query.filter(GalleryImage.group_id == get_trip_group_id(trip_id))
+    # Photos without EXIF fall back to their upload time
+    photo_time = func.coalesce(GalleryImage.taken_at, GalleryImage.timestamp)
+    if start:
+        query = query.filter(photo_time >= start)
+    if end:
+        query = query.filter(photo_time < end)
+    if request.args.get('user_id', type=int):
+        query = query.filter(GalleryImage.user_id == request.args.get('user_id', type=int))
+    query = query.order_by(photo_time, GalleryImage.id)
+
+    def entries():
+        for img in query.yield_per(200):
+            when = img.taken_at or img.timestamp
+            ext = os.path.splitext(img.filename)[1]
+            prefix = when.strftime('%Y%m%d_%H%M%S') if when else 'photo'
+            yield f'{prefix}_{img.id}{ext}', upload_path(img.filename), when
+
+    archive_name = secure_filename(f'{trip.name}_photos.zip') or 'photos.zip'
+    return Response(
+        stream_with_context(stream_zip(entries())),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{archive_name}"'}
+    )
 
 # Serve uploaded image file
 @gallery_bp.route('/uploads/<path:filename>', methods=['GET'])
 def serve_file(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    return serve_upload(filename)
@@ -0,0 +1,84 @@
+"""Offline geocoding of free-text locations against a bundled gazetteer.
+
+data/gazetteer.csv lists cities, landmarks and airports with their aliases
+(name,aliases,kind,country,latitude,longitude, aliases separated by |). Set
+GAZETTEER_PATH to a larger file in the same format, e.g. a GeoNames extract,
+to cover more places.
+
+geocode() picks the longest run of words in the text that names a place, so
+"Dinner near the Eiffel Tower, Paris" resolves to the tower, not the city.
+Lookups are memoized per process.
+"""
+import csv
+import os
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.csv')
+# Between equally long matches the more specific place wins
+KIND_RANK = {'landmark': 2, 'airport': 2, 'city': 1}
+CACHE_SIZE = 4096
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+Place = namedtuple('Place', 'name kind country latitude longitude')
+
+_gazetteer = {'index': None, 'longest': 0}
+_load_lock = threading.Lock()
+
+
+def normalize(text):
+    """Lowercase words without accents or punctuation: "Musée d'Orsay" -> "musee dorsay" """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower().replace("'", '').replace('’', '')
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def _load(path):
+    """({normalized name or alias: Place}, most words in any key)"""
+    index = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            place = Place(row['name'], row['kind'], row['country'], float(row['latitude']), float(row['longitude']))
+            for name in [row['name']] + (row.get('aliases') or '').split('|'):
+                key = normalize(name)
+                current = index.get(key)
+                if key and (current is None or KIND_RANK.get(place.kind, 0) > KIND_RANK.get(current.kind, 0)):
+                    index[key] = place
+    return index, max((len(key.split()) for key in index), default=0)
+
+
+def _index():
+    if _gazetteer['index'] is None:
+        with _load_lock:
+            if _gazetteer['index'] is None:
+                index, longest = _load(os.environ.get('GAZETTEER_PATH') or DEFAULT_PATH)
+                _gazetteer['longest'] = longest
+                _gazetteer['index'] = index
+    return _gazetteer['index'], _gazetteer['longest']
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _lookup(normalized):
+    index, longest = _index()
+    place = index.get(normalized)
+    if place is not None:
+        return place
+    words = normalized.split()
+    for size in range(min(longest, len(words)), 0, -1):
+        best = None
+        for start in range(len(words) - size + 1):
+            place = index.get(' '.join(words[start:start + size]))
+            if place is not None and (best is None or KIND_RANK.get(place.kind, 0) > KIND_RANK.get(best.kind, 0)):
+                best = place
+        if best is not None:
+            return best
+    return None
+
+
+def geocode(text):
+    """The Place named in free text, or None"""
+    normalized = normalize(text)
+    return _lookup(normalized) if normalized else None
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Group, GroupMember, Trip
+from authz import is_group_member
 
 groups_bp = Blueprint('groups_bp', __name__)
 
@@ -52,6 +53,10 @@ def add_group_member(group_id):
     if not group:
         return jsonify({'error': 'Group not found or unauthorized'}), 404
 
+    if is_group_member(group_id, friend_user_id):
+        return jsonify({'message': 'User is already a member of this group'}), 200
+
+    # Membership cache entries are invalidated by the GroupMember insert event
     member = GroupMember(group_id=group_id, user_id=friend_user_id)
     db.session.add(member)
     db.session.commit()
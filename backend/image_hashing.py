@@ -0,0 +1,171 @@
+import threading
+from sqlalchemy import func
+from models import db, GalleryImage
+
+HASH_SIZE = 8  # 8x8 gradient bits -> 64-bit hash
+
+
+def dhash(image):
+    """Difference hash of a PIL image as a 16 character hex string"""
+    from PIL import Image
+    small = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return f'{value:016x}'
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance.
+
+    Each node keeps children keyed by their distance to it, so a radius query
+    only descends into children whose key lies within [d - r, d + r].
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, [ids], {distance: node}]
+        self.size = 0
+
+    def add(self, value, item_id):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item_id], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item_id], {}]
+                return
+            node = child
+
+    def copy(self):
+        """An independent copy, to extend while other threads keep searching this one"""
+        clone = BKTree()
+        clone.size = self.size
+        if self.root is None:
+            return clone
+        clone.root = [self.root[0], list(self.root[1]), {}]
+        stack = [(self.root, clone.root)]
+        while stack:
+            node, copied = stack.pop()
+            for key, child in node[2].items():
+                copied[2][key] = [child[0], list(child[1]), {}]
+                stack.append((child, copied[2][key]))
+        return clone
+
+    def search(self, value, radius):
+        """Yield (item_id, distance) for every stored hash within radius of value"""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                for item_id in node[1]:
+                    yield item_id, distance
+            for key, child in node[2].items():
+                if distance - radius <= key <= distance + radius:
+                    stack.append(child)
+
+
+class _GroupIndex:
+    """A group's hashed images. Never changed once cached - refreshes build a new one and swap it in."""
+
+    def __init__(self):
+        self.tree = BKTree()
+        self.hashes = {}  # image id -> int hash
+        self.max_id = 0
+
+    def extended(self, rows):
+        """A copy of this index with the (image id, hex hash) rows added"""
+        index = _GroupIndex()
+        index.tree = self.tree.copy()
+        index.hashes = dict(self.hashes)
+        index.max_id = self.max_id
+        for image_id, hex_hash in rows:
+            value = int(hex_hash, 16)
+            index.tree.add(value, image_id)
+            index.hashes[image_id] = value
+            index.max_id = max(index.max_id, image_id)
+        return index
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_group_index(group_id):
+    """BK-tree of a group's hashed images, extended incrementally as new hashes land.
+
+    Callers may iterate the returned index while another request refreshes the
+    group, so a refresh extends a copy and swaps it in under the lock.
+    """
+    count, max_id = db.session.query(
+        func.count(GalleryImage.id), func.max(GalleryImage.id)
+    ).filter(
+        GalleryImage.group_id == group_id,
+        GalleryImage.perceptual_hash.isnot(None)
+    ).one()
+
+    with _indexes_lock:
+        index = _indexes.get(group_id)
+    if index is not None and len(index.hashes) == count and index.max_id == (max_id or 0):
+        return index
+
+    rows_query = db.session.query(GalleryImage.id, GalleryImage.perceptual_hash).filter(
+        GalleryImage.group_id == group_id,
+        GalleryImage.perceptual_hash.isnot(None)
+    )
+    rows = None
+    if index is not None and len(index.hashes) < count:
+        # Only newer images were hashed since the last build - append them
+        rows = rows_query.filter(GalleryImage.id > index.max_id).order_by(GalleryImage.id).all()
+        if len(index.hashes) + len(rows) != count:
+            rows = None
+    if rows is None:
+        # Images deleted, or older ones hashed since (e.g. by the backfill) - rebuild
+        index, rows = _GroupIndex(), rows_query.order_by(GalleryImage.id).all()
+    index = index.extended(rows)
+
+    with _indexes_lock:
+        _indexes[group_id] = index
+    return index
+
+
+def find_duplicate_clusters(group_id, threshold):
+    """Group images whose hashes are within threshold bits of each other (single linkage)"""
+    index = get_group_index(group_id)
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for image_id, value in index.hashes.items():
+        for other_id, _ in index.tree.search(value, threshold):
+            if other_id != image_id:
+                a, b = find(image_id), find(other_id)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+
+    clusters = {}
+    for image_id in index.hashes:
+        clusters.setdefault(find(image_id), []).append(image_id)
+    return [sorted(ids) for ids in clusters.values() if len(ids) > 1]
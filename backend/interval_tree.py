@@ -0,0 +1,65 @@
+"""Overlap queries over half-open [start, end) intervals, e.g. itinerary bookings"""
+import heapq
+
+
+class IntervalTree:
+    """Static augmented interval tree.
+
+    Built in O(n) from (start, end, value) tuples sorted by start: the sorted
+    list itself is the tree (each range's middle element is its root) and every
+    node remembers the latest end in its subtree. overlapping() answers in
+    O(log n + k) for k matches.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = list(intervals)
+        self._max_end = [None] * len(self.intervals)
+        if self.intervals:
+            self._build(0, len(self.intervals) - 1)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def _build(self, lo, hi):
+        mid = (lo + hi) // 2
+        latest = self.intervals[mid][1]
+        if lo < mid:
+            latest = max(latest, self._build(lo, mid - 1))
+        if mid < hi:
+            latest = max(latest, self._build(mid + 1, hi))
+        self._max_end[mid] = latest
+        return latest
+
+    def overlapping(self, start, end):
+        """Values of the intervals that overlap [start, end), in start order"""
+        found = []
+        stack = [(0, len(self.intervals) - 1)]
+        while stack:
+            lo, hi = stack.pop()
+            if lo > hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] <= start:
+                continue  # everything below ends before the query starts
+            item_start, item_end, value = self.intervals[mid]
+            if item_start < end:
+                if item_end > start:
+                    found.append((item_start, value))
+                stack.append((mid + 1, hi))
+            stack.append((lo, mid - 1))
+        return [value for _, value in sorted(found, key=lambda pair: pair[0])]
+
+
+def overlapping_pairs(intervals):
+    """Every overlapping pair among (start, end, value) tuples sorted by start, as
+    (first value, second value, overlap start, overlap end). One sweep with a heap
+    of the open intervals' ends: O(n log n + k)."""
+    pairs = []
+    open_ends = []  # (end, position, value)
+    for position, (start, end, value) in enumerate(intervals):
+        while open_ends and open_ends[0][0] <= start:
+            heapq.heappop(open_ends)
+        for other_end, _, other in open_ends:
+            pairs.append((other, value, start, min(end, other_end)))
+        heapq.heappush(open_ends, (end, position, value))
+    return pairs
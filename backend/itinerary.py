@@ -1,10 +1,372 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from models import db, ItineraryItem, Group, GroupMember, Trip
+from models import db, ItineraryItem, Trip
+from authz import is_group_member
+from trip_groups import get_or_create_trip_group
+from revisions import current_revision, not_modified_response
+from pagination import date_range, keyset_page, paged_response, parse_day
+from interval_tree import IntervalTree, overlapping_pairs
+from gazetteer import geocode
+from routing import NUMPY_AVAILABLE, distance_matrix, path_length, plan_route
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
 import json
 
 itinerary_bp = Blueprint('itinerary_bp', __name__)
 
+# Assumed length of an item that has a start time but no duration or end
+DEFAULT_DURATION_MINUTES = {'flight': 180, 'hotel': 60, 'activity': 120, 'restaurant': 90}
+FALLBACK_DURATION_MINUTES = 60
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p')
+SCHEDULE_FIELDS = ('type', 'date', 'time', 'start_at', 'end_at', 'duration_minutes')
+CONFLICT_MODES = ('warn', 'reject')
+PATCH_FIELDS = ('title', 'description', 'location', 'date', 'time', 'cost', 'booking_reference', 'confirmed',
+                'position')
+MAX_BULK_ITEMS = 500
+# Flights and hotels anchor a day rather than being stops on its route
+UNROUTED_TYPES = ('flight', 'hotel')
+MAX_CACHED_SCHEDULES = 256
+_schedules = OrderedDict()  # group id -> (revision, schedule)
+_schedules_lock = threading.Lock()
+
+def parse_start(date, time):
+    """datetime for a date like 2026-05-01 and a time like 14:00 or 2:00 PM; None unless both parse"""
+    day = parse_day(date)
+    if day is None or not time:
+        return None
+    for time_format in TIME_FORMATS:
+        try:
+            clock = datetime.strptime(str(time).strip().upper(), time_format)
+        except ValueError:
+            continue
+        return datetime.combine(day, clock.time())
+    return None
+
+def schedule_fields(item_type, date, time, duration_minutes=None):
+    """(start_at, end_at, duration_minutes) from an item's date, time and optional duration"""
+    start = parse_start(date, time)
+    if start is None:
+        return None, None, duration_minutes
+    minutes = duration_minutes or DEFAULT_DURATION_MINUTES.get((item_type or '').lower(), FALLBACK_DURATION_MINUTES)
+    return start, start + timedelta(minutes=minutes), minutes
+
+def _parse_local(name, value):
+    """Naive datetime from an ISO 8601 string. Itinerary times are local to the trip, so
+    a UTC offset is refused rather than guessed at."""
+    try:
+        moment = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date and time, e.g. 2026-07-02T10:00')
+    if moment.tzinfo is not None:
+        raise ValueError(f'{name} must be a local time without a UTC offset, e.g. 2026-07-02T10:00')
+    return moment
+
+def _apply_schedule(item, data):
+    """Set the item's typed schedule from the request. start_at/end_at (ISO 8601, local
+    time) win over date/time and also rewrite them. Raises ValueError for bad input."""
+    duration = data.get('duration_minutes', item.duration_minutes)
+    if duration is not None:
+        duration = int(duration)
+        if duration <= 0:
+            raise ValueError('duration_minutes must be positive')
+    if data.get('start_at'):
+        start = _parse_local('start_at', data['start_at'])
+        item.date = start.date().isoformat()
+        item.time = start.strftime('%H:%M')
+    if data.get('end_at'):
+        start = parse_start(item.date, item.time)
+        end = _parse_local('end_at', data['end_at'])
+        if start is None or end <= start:
+            raise ValueError('end_at must be after the start')
+        duration = max(1, round((end - start).total_seconds() / 60))
+    item.day = parse_day(item.date)
+    item.start_at, item.end_at, item.duration_minutes = schedule_fields(item.type, item.date, item.time, duration)
+
+def _load_schedule(group_id):
+    """The group's timed items as an interval tree, built from one ordered query"""
+    rows = db.session.query(
+        ItineraryItem.start_at, ItineraryItem.end_at, ItineraryItem.id, ItineraryItem.title
+    ).filter(
+        ItineraryItem.group_id == group_id, ItineraryItem.start_at.isnot(None)
+    ).order_by(ItineraryItem.start_at, ItineraryItem.id).all()
+    return {
+        'tree': IntervalTree((start, end, item_id) for start, end, item_id, _ in rows),
+        'items': {item_id: {
+            'id': item_id,
+            'title': title,
+            'start_at': start.isoformat(),
+            'end_at': end.isoformat()
+        } for start, end, item_id, title in rows},
+    }
+
+def _group_schedule(group_id):
+    """_load_schedule(), cached until the group's next write"""
+    revision = current_revision(group_id)
+    with _schedules_lock:
+        cached = _schedules.get(group_id)
+        if cached and cached[0] == revision:
+            _schedules.move_to_end(group_id)
+            return cached[1]
+    schedule = _load_schedule(group_id)
+    with _schedules_lock:
+        _schedules[group_id] = (revision, schedule)
+        _schedules.move_to_end(group_id)
+        if len(_schedules) > MAX_CACHED_SCHEDULES:
+            _schedules.popitem(last=False)
+    return schedule
+
+def _overlaps(group_id, item):
+    """Other items whose time overlaps this one, from the group's interval tree"""
+    if item.start_at is None:
+        return []
+    schedule = _group_schedule(group_id)
+    return [schedule['items'][item_id] for item_id in schedule['tree'].overlapping(item.start_at, item.end_at)
+            if item_id != item.id]
+
+def _apply_location(item, data):
+    """Coordinates sent with the item win; otherwise a changed location is looked up in
+    the gazetteer (and cleared when it names no known place). Raises ValueError."""
+    if 'latitude' in data or 'longitude' in data:
+        if data.get('latitude') is None and data.get('longitude') is None:
+            item.latitude = item.longitude = None
+            return
+        try:
+            latitude, longitude = float(data['latitude']), float(data['longitude'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('latitude and longitude must both be numbers')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('latitude or longitude out of range')
+        item.latitude, item.longitude = latitude, longitude
+    elif 'location' in data:
+        place = geocode(item.location)
+        item.latitude, item.longitude = (place.latitude, place.longitude) if place else (None, None)
+
+def _patch_item(item, data):
+    """Copy the plain fields present in data onto the item and update its coordinates.
+    Raises ValueError for a bad position or coordinates."""
+    for field in PATCH_FIELDS:
+        if field in data:
+            setattr(item, field, data[field])
+    try:
+        item.position = int(item.position)
+    except (TypeError, ValueError):
+        raise ValueError('position must be an integer')
+    _apply_location(item, data)
+
+def _check_schedule(item, group_id, data):
+    """Apply the request's schedule to the item and look up overlaps. Returns (conflicts, error
+    response or None); with on_conflict=reject any overlap is a 409, otherwise it is reported."""
+    mode = data.get('on_conflict', 'warn')
+    if mode not in CONFLICT_MODES:
+        return [], (jsonify({'error': f"on_conflict must be one of {', '.join(CONFLICT_MODES)}"}), 400)
+    try:
+        _apply_schedule(item, data)
+    except (TypeError, ValueError) as e:
+        return [], (jsonify({'error': f'Invalid schedule: {e}'}), 400)
+    # Without autoflush the pending change doesn't bump the revision, so the cached tree still applies
+    with db.session.no_autoflush:
+        conflicts = _overlaps(group_id, item)
+    if conflicts and mode == 'reject':
+        return conflicts, (jsonify({'error': 'Overlaps other itinerary items', 'conflicts': conflicts}), 409)
+    return conflicts, None
+
+def _conflicts_response(group_id):
+    schedule = _group_schedule(group_id)
+    pairs = overlapping_pairs(schedule['tree'].intervals)
+    return jsonify({
+        'conflicts': [{
+            'items': [schedule['items'][first], schedule['items'][second]],
+            'overlap_start': start.isoformat(),
+            'overlap_end': end.isoformat()
+        } for first, second, start, end in pairs],
+        'count': len(pairs)
+    })
+
+def _item_dict(item, timestamp=False):
+    """The item as the API returns it; list responses also carry its creation timestamp"""
+    result = {
+        'id': item.id,
+        'type': item.type,
+        'title': item.title,
+        'description': item.description,
+        'location': item.location,
+        'date': item.date,
+        'time': item.time,
+        'cost': item.cost,
+        'booking_reference': item.booking_reference,
+        'confirmed': item.confirmed,
+        'start_at': item.start_at.isoformat() if item.start_at else None,
+        'end_at': item.end_at.isoformat() if item.end_at else None,
+        'duration_minutes': item.duration_minutes,
+        'day': item.day.isoformat() if item.day else None,
+        'position': item.position,
+        'latitude': item.latitude,
+        'longitude': item.longitude
+    }
+    if timestamp:
+        result['timestamp'] = item.timestamp.isoformat() if item.timestamp else None
+    return result
+
+def _bulk_response(group_id, data):
+    """Apply {"items": [{"id": ..., field: value}], "delete": [id, ...]} in one transaction.
+
+    Targets are loaded with one IN query and written in a single flush, so the
+    group's revision moves once for the whole batch. Send the "revision" the
+    client last saw (from the itinerary list or a bulk response) to have the
+    batch refused with a 409 if anyone else changed the group since."""
+    patches = data.get('items') or []
+    delete_ids = data.get('delete') or []
+    mode = data.get('on_conflict', 'warn')
+    if not isinstance(patches, list) or not isinstance(delete_ids, list):
+        return jsonify({'error': 'items and delete must be lists'}), 400
+    if mode not in CONFLICT_MODES:
+        return jsonify({'error': f"on_conflict must be one of {', '.join(CONFLICT_MODES)}"}), 400
+    if len(patches) + len(delete_ids) > MAX_BULK_ITEMS:
+        return jsonify({'error': f'At most {MAX_BULK_ITEMS} items per request'}), 400
+    try:
+        patch_ids = [int(patch['id']) for patch in patches]
+        delete_ids = [int(item_id) for item_id in delete_ids]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Every item needs an integer id'}), 400
+    if len(set(patch_ids + delete_ids)) != len(patch_ids) + len(delete_ids):
+        return jsonify({'error': 'Each item may appear only once'}), 400
+
+    expected_revision = data.get('revision')
+    revision = current_revision(group_id)
+    if expected_revision is not None and str(expected_revision) != str(revision):
+        return jsonify({'error': 'The itinerary changed since it was loaded', 'revision': revision}), 409
+
+    targets = {}
+    if patch_ids or delete_ids:
+        targets = {item.id: item for item in ItineraryItem.query.filter(
+            ItineraryItem.group_id == group_id, ItineraryItem.id.in_(patch_ids + delete_ids)
+        ).all()}
+    missing = [item_id for item_id in patch_ids + delete_ids if item_id not in targets]
+    if missing:
+        return jsonify({'error': 'Itinerary items not found in this group', 'missing': missing}), 404
+
+    updated = []
+    for item_id, patch in zip(patch_ids, patches):
+        item = targets[item_id]
+        try:
+            _patch_item(item, patch)
+            if any(field in patch for field in SCHEDULE_FIELDS):
+                _apply_schedule(item, patch)
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': f'Item {item_id}: {e}'}), 400
+        updated.append(item)
+    for item_id in delete_ids:
+        db.session.delete(targets[item_id])
+    db.session.flush()
+
+    # A changed batch bumped the revision once and holds the group's write lock until
+    # commit; anything past revision + 1 means another write got in after the check above
+    new_revision = current_revision(group_id)
+    if expected_revision is not None and new_revision > revision + 1:
+        db.session.rollback()
+        return jsonify({'error': 'The itinerary changed since it was loaded', 'revision': new_revision - 1}), 409
+
+    conflicts = []
+    timed = [item for item in updated if item.start_at is not None]
+    if timed:
+        # Built from the flushed rows and not cached: this revision isn't committed yet
+        schedule = _load_schedule(group_id)
+        for item in timed:
+            overlaps = [schedule['items'][other] for other in schedule['tree'].overlapping(item.start_at, item.end_at)
+                        if other != item.id]
+            if overlaps:
+                conflicts.append({'id': item.id, 'conflicts': overlaps})
+    if conflicts and mode == 'reject':
+        db.session.rollback()
+        return jsonify({'error': 'Overlaps other itinerary items', 'conflicts': conflicts}), 409
+
+    # Serialized before the commit expires them, which would reload each item with its own query
+    items = [_item_dict(item) for item in updated]
+    db.session.commit()
+    return jsonify({
+        'message': 'Itinerary updated successfully',
+        'revision': new_revision,
+        'items': items,
+        'deleted': delete_ids,
+        'conflicts': conflicts
+    })
+
+def _route_response(group_id):
+    """Proposed order for the day's (?date=) untimed stops, shortest path first.
+
+    Stops without coordinates are listed under unlocated. ?start=<item id> (say
+    the hotel) fixes where the route begins. Save the order by sending the
+    positions to /itinerary/bulk."""
+    day = parse_day(request.args.get('date'))
+    if day is None:
+        return jsonify({'error': 'date must be a date (YYYY-MM-DD)'}), 400
+    start = None
+    if request.args.get('start'):
+        start = ItineraryItem.query.filter_by(id=request.args.get('start', type=int), group_id=group_id).first()
+        if start is None or start.latitude is None:
+            return jsonify({'error': 'start must be an itinerary item of this group with coordinates'}), 400
+
+    # In the order the itinerary lists them
+    items = ItineraryItem.query.filter(
+        ItineraryItem.group_id == group_id, ItineraryItem.day == day, ItineraryItem.start_at.is_(None)
+    ).order_by(ItineraryItem.position, ItineraryItem.time, ItineraryItem.id).all()
+    stops = [item for item in items if (item.type or '').lower() not in UNROUTED_TYPES
+             and (start is None or item.id != start.id)]
+    located = [item for item in stops if item.latitude is not None and item.longitude is not None]
+
+    # The start, if any, is stop 0; the listed order is the baseline the proposal is measured against
+    points = [start] if start else []
+    points += located
+    matrix = distance_matrix([(item.latitude, item.longitude) for item in points])
+    order = plan_route(matrix, start=0 if start else None)
+
+    route = []
+    for step, index in enumerate(order):
+        item = points[index]
+        if start and index == 0:
+            continue
+        route.append({
+            'id': item.id,
+            'title': item.title,
+            'type': item.type,
+            'location': item.location,
+            'latitude': item.latitude,
+            'longitude': item.longitude,
+            'position': len(route),
+            'leg_km': round(float(matrix[order[step - 1]][index]), 3) if step else 0.0
+        })
+    return jsonify({
+        'date': day.isoformat(),
+        'start': _item_dict(start) if start else None,
+        'route': route,
+        'total_km': round(path_length(order, matrix), 3),
+        'current_km': round(path_length(list(range(len(points))), matrix), 3),
+        'unlocated': [{'id': item.id, 'title': item.title, 'location': item.location}
+                      for item in stops if item.latitude is None or item.longitude is None],
+        'solver': 'numpy' if NUMPY_AVAILABLE else 'python'
+    })
+
+def _itinerary_page(group_id):
+    """By day, then position within the day (as set by /itinerary/bulk), then time, straight
+    off the (group_id, day, position, time, id) index. Undated items and items without a time
+    come first on SQLite and last on PostgreSQL. With ?from=/?to= only the items dated within
+    those days."""
+    first_day, last_day = date_range()
+    query = ItineraryItem.query.filter(ItineraryItem.group_id == group_id)
+    if first_day or last_day:
+        query = query.filter(ItineraryItem.day.isnot(None))
+        if first_day:
+            query = query.filter(ItineraryItem.day >= first_day)
+        if last_day:
+            query = query.filter(ItineraryItem.day <= last_day)
+    return keyset_page(
+        query,
+        [ItineraryItem.day, ItineraryItem.position, ItineraryItem.time, ItineraryItem.id],
+        key=lambda item: [item.day, item.position, item.time, item.id]
+    )
+
 # Trip-based itinerary endpoints
 @itinerary_bp.route('/api/trips/<int:trip_id>/itinerary', methods=['GET'])
 @jwt_required()
@@ -18,40 +380,24 @@ def get_trip_itinerary(trip_id):
         if not trip:
             return jsonify({'error': 'Trip not found or access denied'}), 403
         
-        # Get or create a group for this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
-        if not group:
-            # Create default group for trip
-            group = Group(
-                name=f"{trip.name} Group",
-                creator_id=current_user_id,
-                trip_id=trip_id
-            )
-            db.session.add(group)
-            db.session.flush()  # Get the ID
-            
-            # Add user as member
-            member = GroupMember(group_id=group.id, user_id=current_user_id)
-            db.session.add(member)
-            db.session.commit()
-        
-        items = ItineraryItem.query.filter_by(group_id=group.id).order_by(ItineraryItem.date, ItineraryItem.time).all()
+        group_id = get_or_create_trip_group(trip, current_user_id)
+        db.session.commit()
         
-        return jsonify({
-            'itinerary': [{
-                'id': item.id,
-                'type': item.type,
-                'title': item.title,
-                'description': item.description,
-                'location': item.location,
-                'date': item.date,
-                'time': item.time,
-                'cost': item.cost,
-                'booking_reference': item.booking_reference,
-                'confirmed': item.confirmed,
-                'timestamp': item.timestamp.isoformat() if item.timestamp else None
-            } for item in items]
-        })
+        not_modified = not_modified_response(group_id, 'trip-itinerary')
+        if not_modified:
+            return not_modified
+        
+        # Read before the rows, so a write in between can only make the client's revision too old
+        revision = current_revision(group_id)
+        try:
+            items, next_cursor = _itinerary_page(group_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return paged_response({
+            'revision': revision,
+            'itinerary': [_item_dict(item, timestamp=True) for item in items]
+        }, next_cursor)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -68,24 +414,10 @@ def add_trip_itinerary_item(trip_id):
         if not trip:
             return jsonify({'error': 'Trip not found or access denied'}), 403
         
-        # Get or create a group for this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
-        if not group:
-            # Create default group for trip
-            group = Group(
-                name=f"{trip.name} Group",
-                creator_id=current_user_id,
-                trip_id=trip_id
-            )
-            db.session.add(group)
-            db.session.flush()  # Get the ID
-            
-            # Add user as member
-            member = GroupMember(group_id=group.id, user_id=current_user_id)
-            db.session.add(member)
+        group_id = get_or_create_trip_group(trip, current_user_id)
         
         item = ItineraryItem(
-            group_id=group.id,
+            group_id=group_id,
             user_id=current_user_id,
             type=data.get('type'),
             title=data.get('title'),
@@ -98,27 +430,92 @@ def add_trip_itinerary_item(trip_id):
             confirmed=data.get('confirmed', False)
         )
         
+        try:
+            _apply_location(item, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        conflicts, error = _check_schedule(item, group_id, data)
+        if error:
+            return error
+        
         db.session.add(item)
         db.session.commit()
         
         return jsonify({
             'message': 'Itinerary item added successfully',
-            'item': {
-                'id': item.id,
-                'type': item.type,
-                'title': item.title,
-                'description': item.description,
-                'location': item.location,
-                'date': item.date,
-                'time': item.time,
-                'cost': item.cost,
-                'booking_reference': item.booking_reference,
-                'confirmed': item.confirmed
-            }
+            'item': _item_dict(item),
+            'conflicts': conflicts
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@itinerary_bp.route('/api/trips/<int:trip_id>/itinerary/conflicts', methods=['GET'])
+@jwt_required()
+def get_trip_itinerary_conflicts(trip_id):
+    """Every pair of timed itinerary items in a trip that overlap"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Check if user owns the trip
+        trip = Trip.query.filter_by(id=trip_id, user_id=current_user_id).first()
+        if not trip:
+            return jsonify({'error': 'Trip not found or access denied'}), 403
+        
+        group_id = get_or_create_trip_group(trip, current_user_id)
+        db.session.commit()
+        
+        not_modified = not_modified_response(group_id, 'trip-itinerary-conflicts')
+        if not_modified:
+            return not_modified
+        
+        return _conflicts_response(group_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@itinerary_bp.route('/api/trips/<int:trip_id>/itinerary/route', methods=['GET'])
+@jwt_required()
+def get_trip_itinerary_route(trip_id):
+    """Suggested visiting order for a day of a trip"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Check if user owns the trip
+        trip = Trip.query.filter_by(id=trip_id, user_id=current_user_id).first()
+        if not trip:
+            return jsonify({'error': 'Trip not found or access denied'}), 403
+        
+        group_id = get_or_create_trip_group(trip, current_user_id)
+        db.session.commit()
+        
+        not_modified = not_modified_response(group_id, 'trip-itinerary-route')
+        if not_modified:
+            return not_modified
+        
+        return _route_response(group_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@itinerary_bp.route('/api/trips/<int:trip_id>/itinerary/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_trip_itinerary(trip_id):
+    """Reorder, update and delete many itinerary items of a trip at once"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Check if user owns the trip
+        trip = Trip.query.filter_by(id=trip_id, user_id=current_user_id).first()
+        if not trip:
+            return jsonify({'error': 'Trip not found or access denied'}), 403
+        
+        group_id = get_or_create_trip_group(trip, current_user_id)
+        db.session.commit()
+        
+        return _bulk_response(group_id, request.get_json(silent=True) or {})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Original group-based endpoints
 @itinerary_bp.route('/api/groups/<int:group_id>/itinerary', methods=['GET'])
 @jwt_required()
@@ -128,31 +525,26 @@ def get_itinerary(group_id):
         current_user_id = get_jwt_identity()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
         
-        items = ItineraryItem.query.filter_by(group_id=group_id).order_by(ItineraryItem.date, ItineraryItem.time).all()
+        not_modified = not_modified_response(group_id, 'itinerary')
+        if not_modified:
+            return not_modified
         
-        return jsonify({
-            'itinerary': [{
-                'id': item.id,
-                'type': item.type,
-                'title': item.title,
-                'description': item.description,
-                'location': item.location,
-                'date': item.date,
-                'time': item.time,
-                'cost': item.cost,
-                'booking_reference': item.booking_reference,
-                'confirmed': item.confirmed,
-                'timestamp': item.timestamp.isoformat() if item.timestamp else None
-            } for item in items]
-        })
+        # Read before the rows, so a write in between can only make the client's revision too old
+        revision = current_revision(group_id)
+        try:
+            items, next_cursor = _itinerary_page(group_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return paged_response({
+            'revision': revision,
+            'itinerary': [_item_dict(item, timestamp=True) for item in items]
+        }, next_cursor)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -165,10 +557,7 @@ def add_itinerary_item(group_id):
         data = request.get_json()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -187,27 +576,86 @@ def add_itinerary_item(group_id):
             confirmed=data.get('confirmed', False)
         )
         
+        try:
+            _apply_location(item, data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        conflicts, error = _check_schedule(item, group_id, data)
+        if error:
+            return error
+        
         db.session.add(item)
         db.session.commit()
         
         return jsonify({
             'message': 'Itinerary item added successfully',
-            'item': {
-                'id': item.id,
-                'type': item.type,
-                'title': item.title,
-                'description': item.description,
-                'location': item.location,
-                'date': item.date,
-                'time': item.time,
-                'cost': item.cost,
-                'booking_reference': item.booking_reference,
-                'confirmed': item.confirmed
-            }
+            'item': _item_dict(item),
+            'conflicts': conflicts
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@itinerary_bp.route('/api/groups/<int:group_id>/itinerary/conflicts', methods=['GET'])
+@jwt_required()
+def get_itinerary_conflicts(group_id):
+    """Every pair of timed itinerary items that overlap"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Check if user is member of group
+        membership = is_group_member(group_id, current_user_id)
+        
+        if not membership:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        not_modified = not_modified_response(group_id, 'itinerary-conflicts')
+        if not_modified:
+            return not_modified
+        
+        return _conflicts_response(group_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@itinerary_bp.route('/api/groups/<int:group_id>/itinerary/route', methods=['GET'])
+@jwt_required()
+def get_itinerary_route(group_id):
+    """Suggested visiting order for a day of a group's itinerary"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Check if user is member of group
+        membership = is_group_member(group_id, current_user_id)
+        
+        if not membership:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        not_modified = not_modified_response(group_id, 'itinerary-route')
+        if not_modified:
+            return not_modified
+        
+        return _route_response(group_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@itinerary_bp.route('/api/groups/<int:group_id>/itinerary/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_itinerary(group_id):
+    """Reorder, update and delete many itinerary items of a group at once"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        # Check if user is member of group
+        membership = is_group_member(group_id, current_user_id)
+        
+        if not membership:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        return _bulk_response(group_id, request.get_json(silent=True) or {})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @itinerary_bp.route('/api/itinerary/<int:item_id>', methods=['PUT'])
 @jwt_required()
 def update_itinerary_item(item_id):
@@ -219,48 +667,31 @@ def update_itinerary_item(item_id):
         item = ItineraryItem.query.get_or_404(item_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=item.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(item.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
         
         # Update fields
-        if 'title' in data:
-            item.title = data['title']
-        if 'description' in data:
-            item.description = data['description']
-        if 'location' in data:
-            item.location = data['location']
-        if 'date' in data:
-            item.date = data['date']
-        if 'time' in data:
-            item.time = data['time']
-        if 'cost' in data:
-            item.cost = data['cost']
-        if 'booking_reference' in data:
-            item.booking_reference = data['booking_reference']
-        if 'confirmed' in data:
-            item.confirmed = data['confirmed']
+        try:
+            _patch_item(item, data)
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        
+        conflicts = []
+        if any(field in data for field in SCHEDULE_FIELDS) or 'on_conflict' in data:
+            conflicts, error = _check_schedule(item, item.group_id, data)
+            if error:
+                db.session.rollback()
+                return error
         
         db.session.commit()
         
         return jsonify({
             'message': 'Itinerary item updated successfully',
-            'item': {
-                'id': item.id,
-                'type': item.type,
-                'title': item.title,
-                'description': item.description,
-                'location': item.location,
-                'date': item.date,
-                'time': item.time,
-                'cost': item.cost,
-                'booking_reference': item.booking_reference,
-                'confirmed': item.confirmed
-            }
+            'item': _item_dict(item),
+            'conflicts': conflicts
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -275,10 +706,7 @@ def delete_itinerary_item(item_id):
         item = ItineraryItem.query.get_or_404(item_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=item.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(item.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
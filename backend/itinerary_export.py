@@ -0,0 +1,178 @@
+"""Itinerary exports: an iCalendar (.ics) feed for calendar apps and NDJSON for scripts.
+
+    GET /api/trips/<id>/itinerary/export.ics       download, with the usual JWT
+    GET /api/trips/<id>/itinerary/export.ndjson    one item per line, with the usual JWT
+    GET /api/trips/<id>/itinerary/calendar-feed    a subscribable URL for the .ics
+    GET /api/calendar/<token>.ics                  that URL; the signed token is the credential
+
+Rows are read with yield_per and written as they arrive, so a long itinerary
+never sits in memory. Responses carry an ETag (the group revision) and
+Last-Modified (its last write), so polling calendar apps mostly get 304s.
+Timed items become events in floating local time; items with only a date
+become all-day events, and undated ones are left out of the .ics.
+"""
+import json
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, current_app, jsonify, stream_with_context, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.utils import secure_filename
+from models import db, ItineraryItem, Trip
+from itinerary import _item_dict
+from revisions import not_modified_response
+from trip_groups import get_or_create_trip_group
+
+itinerary_export_bp = Blueprint('itinerary_export_bp', __name__)
+
+EXPORT_BATCH_SIZE = 500
+FEED_SALT = 'itinerary-calendar-feed'
+# RFC 5545 lines are at most 75 octets; longer ones continue on lines starting with a space
+MAX_LINE_OCTETS = 75
+
+
+def _feed_serializer():
+    return URLSafeSerializer(current_app.config['JWT_SECRET_KEY'], salt=FEED_SALT)
+
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n'))
+
+
+def _fold(line):
+    """line with CRLF, split so no physical line exceeds 75 octets and no UTF-8 character is cut"""
+    parts, current, size = [], [], 0
+    for char in line:
+        octets = len(char.encode('utf-8'))
+        # Continuation lines lose one octet to their leading space
+        if size + octets > MAX_LINE_OCTETS - (1 if parts else 0):
+            parts.append(''.join(current))
+            current, size = [], 0
+        current.append(char)
+        size += octets
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _event(item):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:itinerary-item-{item.id}@tripbox',
+        f"DTSTAMP:{(item.timestamp or datetime.utcnow()).strftime('%Y%m%dT%H%M%SZ')}",
+    ]
+    if item.start_at is not None:
+        lines.append(f"DTSTART:{item.start_at.strftime('%Y%m%dT%H%M%S')}")
+        lines.append(f"DTEND:{item.end_at.strftime('%Y%m%dT%H%M%S')}")
+    else:
+        lines.append(f"DTSTART;VALUE=DATE:{item.day.strftime('%Y%m%d')}")
+        lines.append(f"DTEND;VALUE=DATE:{(item.day + timedelta(days=1)).strftime('%Y%m%d')}")
+    lines.append(f'SUMMARY:{_escape(item.title)}')
+    if item.location:
+        lines.append(f'LOCATION:{_escape(item.location)}')
+    if item.latitude is not None and item.longitude is not None:
+        lines.append(f'GEO:{item.latitude:.6f};{item.longitude:.6f}')
+    details = [item.description or '']
+    if item.booking_reference:
+        details.append(f'Booking reference: {item.booking_reference}')
+    if any(details):
+        lines.append(f"DESCRIPTION:{_escape(chr(10).join(d for d in details if d))}")
+    if item.type:
+        lines.append(f'CATEGORIES:{_escape(item.type)}')
+    lines.append(f"STATUS:{'CONFIRMED' if item.confirmed else 'TENTATIVE'}")
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def _calendar(trip, group_id):
+    query = ItineraryItem.query.filter(
+        ItineraryItem.group_id == group_id, ItineraryItem.day.isnot(None)
+    ).order_by(ItineraryItem.day, ItineraryItem.position, ItineraryItem.time, ItineraryItem.id)
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//TripBox//Itinerary//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(trip.name)}',
+    ))
+    for item in query.yield_per(EXPORT_BATCH_SIZE):
+        yield _event(item)
+    yield _fold('END:VCALENDAR')
+
+
+def _ndjson(group_id):
+    # By day, position and time off the (group_id, day, position, time, id) index;
+    # where undated items land depends on the database
+    query = ItineraryItem.query.filter_by(group_id=group_id).order_by(
+        ItineraryItem.day, ItineraryItem.position, ItineraryItem.time, ItineraryItem.id
+    )
+    for item in query.yield_per(EXPORT_BATCH_SIZE):
+        yield json.dumps(_item_dict(item), separators=(',', ':')) + '\n'
+
+
+def _trip_group_id(trip):
+    group_id = get_or_create_trip_group(trip, trip.user_id)
+    db.session.commit()
+    return group_id
+
+
+def _calendar_response(trip, download):
+    group_id = _trip_group_id(trip)
+    not_modified = not_modified_response(group_id, 'itinerary-ics', last_modified=True, user_id=trip.user_id)
+    if not_modified:
+        return not_modified
+    headers = {}
+    if download:
+        filename = secure_filename(f'{trip.name}.ics') or 'itinerary.ics'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return Response(stream_with_context(_calendar(trip, group_id)), mimetype='text/calendar', headers=headers)
+
+
+def _owned_trip(trip_id):
+    return Trip.query.filter_by(id=trip_id, user_id=int(get_jwt_identity())).first()
+
+
+@itinerary_export_bp.route('/api/trips/<int:trip_id>/itinerary/export.ics', methods=['GET'])
+@jwt_required()
+def export_trip_calendar(trip_id):
+    trip = _owned_trip(trip_id)
+    if not trip:
+        return jsonify({'error': 'Trip not found or access denied'}), 403
+    return _calendar_response(trip, download=True)
+
+
+@itinerary_export_bp.route('/api/trips/<int:trip_id>/itinerary/export.ndjson', methods=['GET'])
+@jwt_required()
+def export_trip_ndjson(trip_id):
+    trip = _owned_trip(trip_id)
+    if not trip:
+        return jsonify({'error': 'Trip not found or access denied'}), 403
+    group_id = _trip_group_id(trip)
+    not_modified = not_modified_response(group_id, 'itinerary-ndjson', last_modified=True)
+    if not_modified:
+        return not_modified
+    return Response(stream_with_context(_ndjson(group_id)), mimetype='application/x-ndjson')
+
+
+@itinerary_export_bp.route('/api/trips/<int:trip_id>/itinerary/calendar-feed', methods=['GET'])
+@jwt_required()
+def trip_calendar_feed(trip_id):
+    """URL a calendar app can subscribe to without logging in. Anyone holding it can read
+    the itinerary; it stops working if the trip changes owner or JWT_SECRET_KEY is rotated."""
+    trip = _owned_trip(trip_id)
+    if not trip:
+        return jsonify({'error': 'Trip not found or access denied'}), 403
+    token = _feed_serializer().dumps({'trip': trip.id, 'user': trip.user_id})
+    return jsonify({'url': url_for('itinerary_export_bp.calendar_feed', token=token, _external=True)})
+
+
+@itinerary_export_bp.route('/api/calendar/<token>.ics', methods=['GET'])
+def calendar_feed(token):
+    try:
+        claims = _feed_serializer().loads(token)
+    except BadSignature:
+        return jsonify({'error': 'Invalid calendar feed'}), 404
+    trip = Trip.query.filter_by(id=claims.get('trip'), user_id=claims.get('user')).first()
+    if not trip:
+        return jsonify({'error': 'Invalid calendar feed'}), 404
+    return _calendar_response(trip, download=False)
@@ -1,22 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GroupMember, LiveLocation
+from models import db, LiveLocation
+from authz import group_member_required
+from scheduler import periodic
 from datetime import datetime, timedelta
 import json
 
 live_location_bp = Blueprint('live_location_bp', __name__)
 
+@periodic('prune_live_locations', timedelta(hours=6))
+def prune_live_locations():
+    """Delete location fixes older than LOCATION_RETENTION_DAYS"""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config.get('LOCATION_RETENTION_DAYS', 30))
+    deleted = LiveLocation.query.filter(LiveLocation.timestamp < cutoff).delete(synchronize_session=False)
+    if deleted:
+        print(f"✅ Pruned {deleted} live location fixes older than {cutoff.date()}")
+
 @live_location_bp.route('/api/groups/<int:group_id>/live-location/update', methods=['POST'])
 @jwt_required()
+@group_member_required()
 def update_live_location(group_id):
     user_id = int(get_jwt_identity())
     data = request.get_json()
     
-    # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-    if not member:
-        return jsonify({'error': 'You are not a member of this group'}), 403
-    
     # Deactivate previous locations for this user in this group
     db.session.query(LiveLocation).filter_by(
         group_id=group_id, 
@@ -49,14 +55,10 @@ def update_live_location(group_id):
 
 @live_location_bp.route('/api/groups/<int:group_id>/live-location/members', methods=['GET'])
 @jwt_required()
+@group_member_required()
 def get_group_live_locations(group_id):
     user_id = int(get_jwt_identity())
     
-    # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-    if not member:
-        return jsonify({'error': 'You are not a member of this group'}), 403
-    
     # Get all active locations for group members (last 30 minutes)
     time_threshold = datetime.utcnow() - timedelta(minutes=30)
     
@@ -96,14 +98,10 @@ def get_group_live_locations(group_id):
 
 @live_location_bp.route('/api/groups/<int:group_id>/live-location/history', methods=['GET'])
 @jwt_required()
+@group_member_required()
 def get_location_history(group_id):
     user_id = int(get_jwt_identity())
     
-    # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-    if not member:
-        return jsonify({'error': 'You are not a member of this group'}), 403
-    
     # Get query parameters
     target_user_id = request.args.get('user_id', user_id, type=int)
     hours = request.args.get('hours', 24, type=int)
@@ -137,15 +135,11 @@ def get_location_history(group_id):
 
 @live_location_bp.route('/api/groups/<int:group_id>/live-location/emergency', methods=['POST'])
 @jwt_required()
+@group_member_required()
 def send_emergency_alert(group_id):
     user_id = int(get_jwt_identity())
     data = request.get_json()
     
-    # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-    if not member:
-        return jsonify({'error': 'You are not a member of this group'}), 403
-    
     # Get user's current location
     current_location = db.session.query(LiveLocation).filter_by(
         group_id=group_id,
@@ -180,15 +174,11 @@ def send_emergency_alert(group_id):
 
 @live_location_bp.route('/api/groups/<int:group_id>/live-location/geofence', methods=['POST'])
 @jwt_required()
+@group_member_required()
 def create_geofence(group_id):
     user_id = int(get_jwt_identity())
     data = request.get_json()
     
-    # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-    if not member:
-        return jsonify({'error': 'You are not a member of this group'}), 403
-    
     # Create geofence (virtual boundary)
     geofence = {
         'name': data.get('name'),
@@ -210,14 +200,8 @@ def create_geofence(group_id):
 
 @live_location_bp.route('/api/groups/<int:group_id>/live-location/distance', methods=['GET'])
 @jwt_required()
+@group_member_required()
 def calculate_distances(group_id):
-    user_id = int(get_jwt_identity())
-    
-    # Verify user is part of the group
-    member = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-    if not member:
-        return jsonify({'error': 'You are not a member of this group'}), 403
-    
     # Get all current locations
     locations = db.session.query(LiveLocation).filter(
         LiveLocation.group_id == group_id,
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, GroupMember, LocationCheckin
+from models import db, LocationCheckin
+from authz import is_group_member
 from datetime import datetime
+from pagination import keyset_page, paged_response
 
 location_bp = Blueprint('location_bp', __name__)
 
@@ -12,7 +14,7 @@ def checkin(group_id):
     user_id = int(get_jwt_identity())
     data = request.get_json()
 
-    if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+    if not is_group_member(group_id, user_id):
         return jsonify({"error": "Unauthorized"}), 403
 
     checkin = LocationCheckin(
@@ -30,12 +32,18 @@ def checkin(group_id):
 def view_checkins(group_id):
     user_id = int(get_jwt_identity())
 
-    if not GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first():
+    if not is_group_member(group_id, user_id):
         return jsonify({"error": "Unauthorized"}), 403
 
-    checkins = LocationCheckin.query.filter_by(group_id=group_id).order_by(LocationCheckin.timestamp.desc()).all()
-    return jsonify([{
+    try:
+        checkins, next_cursor = keyset_page(
+            LocationCheckin.query.filter_by(group_id=group_id), [LocationCheckin.timestamp, LocationCheckin.id],
+            key=lambda c: [c.timestamp, c.id], descending=True
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return paged_response([{
         "user_id": c.user_id,
         "message": c.message,
         "timestamp": c.timestamp.isoformat()
-    } for c in checkins])
+    } for c in checkins], next_cursor)
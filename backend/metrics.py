@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from flask import Blueprint, Response, current_app, g, request
+from models import db
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+# Upper bounds in seconds, Prometheus' default buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SNAPSHOT_INTERVAL_SECONDS = 5
+
+
+class _Shard:
+    """Counters written by exactly one thread, so updates need no lock"""
+
+    def __init__(self):
+        self.requests = defaultdict(int)  # (blueprint, endpoint, method, status) -> count
+        self.latency = {}  # (blueprint, endpoint, method) -> [bucket counts..., +Inf count, sum]
+        self.in_flight = 0
+
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()  # only taken when a thread creates its shard
+_snapshot_thread = {'pid': None}
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+def _observe(key, seconds):
+    shard = _shard()
+    series = shard.latency.get(key)
+    if series is None:
+        series = shard.latency[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            series[i] += 1
+            break
+    else:
+        series[len(LATENCY_BUCKETS)] += 1
+    series[-1] += seconds
+
+
+def _pool_stats():
+    pool = db.engine.pool
+    stats = {}
+    for name in ('size', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if 'overflow' in stats:
+        # QueuePool counts up from -size; only connections beyond the pool matter
+        stats['overflow'] = max(stats['overflow'], 0)
+    return stats
+
+
+def local_snapshot():
+    """This worker's totals across all of its threads"""
+    requests, latency, in_flight = defaultdict(int), {}, 0
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        # dict() and list() copies are atomic under the GIL
+        for key, count in dict(shard.requests).items():
+            requests[key] += count
+        for key, series in dict(shard.latency).items():
+            series = list(series)
+            total = latency.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+        in_flight += shard.in_flight
+    return {
+        'pid': os.getpid(),
+        'requests': [list(key) + [count] for key, count in requests.items()],
+        'latency': [list(key) + [series] for key, series in latency.items()],
+        'in_flight': in_flight,
+        'pool': _pool_stats(),
+    }
+
+
+def _write_snapshot(app):
+    directory = app.config['METRICS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'worker-{os.getpid()}.json')
+    with app.app_context():
+        snapshot = local_snapshot()
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+
+
+def _snapshot_loop(app):
+    while True:
+        time.sleep(SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            _write_snapshot(app)
+        except Exception as e:
+            print(f"❌ Could not write metrics snapshot: {e}")
+
+
+def _ensure_snapshot_thread(app):
+    # Started lazily, so each gunicorn worker (including after a preload fork) gets its own
+    if _snapshot_thread['pid'] == os.getpid():
+        return
+    with _shards_lock:
+        if _snapshot_thread['pid'] == os.getpid():
+            return
+        _snapshot_thread['pid'] = os.getpid()
+    threading.Thread(target=_snapshot_loop, args=(app,), daemon=True, name='tripbox-metrics').start()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _all_snapshots():
+    """This worker's live snapshot plus the last snapshot written by every other worker"""
+    snapshots = [local_snapshot()]
+    directory = current_app.config.get('METRICS_DIR')
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    for filename in os.listdir(directory):
+        if not (filename.startswith('worker-') and filename.endswith('.json')):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if snapshot['pid'] == os.getpid():
+            continue
+        # Counters from exited workers still count; their gauges do not
+        snapshot['alive'] = _pid_alive(snapshot['pid'])
+        if not snapshot['alive']:
+            snapshot['in_flight'], snapshot['pool'] = 0, {}
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_metrics(snapshots):
+    """Prometheus text exposition format (version 0.0.4)"""
+    requests, latency = defaultdict(int), {}
+    in_flight, pool = 0, defaultdict(int)
+    live_workers = 0
+    for snapshot in snapshots:
+        for *key, count in snapshot['requests']:
+            requests[tuple(key)] += count
+        for *key, series in snapshot['latency']:
+            total = latency.setdefault(tuple(key), [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+        in_flight += snapshot['in_flight']
+        for name, value in snapshot['pool'].items():
+            pool[name] += value
+        live_workers += 1 if snapshot.get('alive', True) else 0
+
+    lines = [
+        '# HELP tripbox_http_requests_total Requests handled, by endpoint and status code.',
+        '# TYPE tripbox_http_requests_total counter',
+    ]
+    for (blueprint, endpoint, method, status), count in sorted(requests.items()):
+        labels = _labels(blueprint=blueprint, endpoint=endpoint, method=method, status=status)
+        lines.append(f'tripbox_http_requests_total{labels} {count}')
+
+    lines += [
+        '# HELP tripbox_http_request_duration_seconds Time to build the response.',
+        '# TYPE tripbox_http_request_duration_seconds histogram',
+    ]
+    for (blueprint, endpoint, method), series in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], series[:-1]):
+            cumulative += count
+            labels = _labels(blueprint=blueprint, endpoint=endpoint, method=method, le=bound)
+            lines.append(f'tripbox_http_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = _labels(blueprint=blueprint, endpoint=endpoint, method=method)
+        lines.append(f'tripbox_http_request_duration_seconds_sum{labels} {series[-1]}')
+        lines.append(f'tripbox_http_request_duration_seconds_count{labels} {cumulative}')
+
+    lines += [
+        '# HELP tripbox_http_requests_in_flight Requests currently being handled.',
+        '# TYPE tripbox_http_requests_in_flight gauge',
+        f'tripbox_http_requests_in_flight {in_flight}',
+        '# HELP tripbox_workers Worker processes reporting metrics.',
+        '# TYPE tripbox_workers gauge',
+        f'tripbox_workers {live_workers}',
+    ]
+    for name, help_text in (('size', 'Connections kept open in the pool.'),
+                            ('checkedout', 'Connections currently in use.'),
+                            ('overflow', 'Connections opened beyond the pool size.')):
+        if name in pool:
+            lines += [
+                f'# HELP tripbox_db_pool_{name} {help_text}',
+                f'# TYPE tripbox_db_pool_{name} gauge',
+                f'tripbox_db_pool_{name} {pool[name]}',
+            ]
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Record request counts, latency and in-flight requests for every request"""
+
+    @app.before_request
+    def _start_request_metrics():
+        if app.config.get('METRICS_DIR'):
+            _ensure_snapshot_thread(app)
+        _shard().in_flight += 1
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            endpoint = request.endpoint or 'unmatched'
+            blueprint = request.blueprint or 'app'
+            _shard().requests[(blueprint, endpoint, request.method, response.status_code)] += 1
+            _observe((blueprint, endpoint, request.method), time.perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        if g.pop('metrics_start', None) is not None:
+            _shard().in_flight -= 1
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint. With METRICS_TOKEN set, requires 'Authorization: Bearer <token>'."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_metrics(_all_snapshots()), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,111 @@
+"""Versioned schema migrations.
+
+Migrations live in migrations/NNNN_name.py and define upgrade(conn). Applied
+versions are recorded in the schema_version table. Fresh databases get the
+full schema from db.create_all(), so migrations must be idempotent - use the
+helpers below, which skip columns and indexes that already exist.
+
+    python migrate.py            apply pending migrations
+    python migrate.py status     list applied and pending migrations
+"""
+import importlib.util
+import os
+import re
+import sys
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+# Arbitrary key for pg_advisory_xact_lock so only one worker migrates at a time
+ADVISORY_LOCK_KEY = 727113
+
+
+def discover_migrations():
+    """[(version, name, module)] for every migration file, oldest first"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        spec = importlib.util.spec_from_file_location(f'migration_{match.group(1)}', os.path.join(MIGRATIONS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations.append((int(match.group(1)), match.group(2), module))
+    return migrations
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_version ('
+        'version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text('SELECT version FROM schema_version'))}
+
+
+def run_migrations(engine):
+    """Apply pending migrations, each in its own transaction.
+
+    Every worker calls this at startup. On PostgreSQL an advisory lock makes
+    the others wait; elsewhere a worker that loses the race hits the
+    schema_version primary key and moves on, which is safe because migrations
+    are idempotent.
+    """
+    for version, name, module in discover_migrations():
+        with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            if version in applied_versions(conn):
+                continue
+            module.upgrade(conn)
+            try:
+                with conn.begin_nested():
+                    conn.execute(
+                        text('INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)'),
+                        {'v': version, 'n': name, 't': datetime.utcnow()}
+                    )
+            except IntegrityError:
+                continue
+        print(f"✅ Applied migration {version:04d}_{name}")
+
+
+# Helpers for migration modules
+
+def add_column(conn, table, column, ddl_type):
+    """ALTER TABLE ... ADD COLUMN unless the column exists. New columns must be nullable."""
+    if column in {c['name'] for c in inspect(conn).get_columns(table)}:
+        return
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(text(f'ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(column)} {ddl_type}'))
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """CREATE INDEX unless an index with this name exists on the table"""
+    if name in {i['name'] for i in inspect(conn).get_indexes(table)}:
+        return
+    preparer = conn.dialect.identifier_preparer
+    column_list = ', '.join(preparer.quote(c) for c in columns)
+    conn.execute(text(
+        f'CREATE {"UNIQUE " if unique else ""}INDEX {preparer.quote(name)} '
+        f'ON {preparer.quote(table)} ({column_list})'
+    ))
+
+
+if __name__ == '__main__':
+    from app import app
+    from models import db
+
+    with app.app_context():
+        if len(sys.argv) > 1 and sys.argv[1] == 'status':
+            with db.engine.connect() as conn:
+                done = applied_versions(conn)
+                conn.commit()
+            for version, name, _ in discover_migrations():
+                print(f"{'applied' if version in done else 'pending'}  {version:04d}_{name}")
+        else:
+            run_migrations(db.engine)
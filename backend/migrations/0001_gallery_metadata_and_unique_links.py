@@ -0,0 +1,46 @@
+"""Photo metadata columns, gallery indexes and one-group-per-trip / one-membership-per-user uniqueness"""
+from sqlalchemy import inspect, text
+from migrate import add_column, create_index
+
+GALLERY_COLUMNS = [
+    ('taken_at', 'TIMESTAMP'),
+    ('latitude', 'FLOAT'),
+    ('longitude', 'FLOAT'),
+    ('orientation', 'INTEGER'),
+    ('width', 'INTEGER'),
+    ('height', 'INTEGER'),
+    ('metadata_status', 'VARCHAR(20)'),
+    ('perceptual_hash', 'VARCHAR(16)'),
+]
+
+
+def upgrade(conn):
+    for column, ddl_type in GALLERY_COLUMNS:
+        add_column(conn, 'gallery_image', column, ddl_type)
+    create_index(conn, 'ix_gallery_image_group_taken', 'gallery_image', ['group_id', 'taken_at', 'id'])
+    create_index(conn, 'ix_gallery_image_group_geo', 'gallery_image', ['group_id', 'latitude', 'longitude'])
+
+    # Duplicate memberships carry no data of their own - keep the oldest row
+    conn.execute(text(
+        'DELETE FROM group_member WHERE id NOT IN '
+        '(SELECT MIN(id) FROM group_member GROUP BY group_id, user_id)'
+    ))
+    create_index(conn, 'uq_group_member_group_user', 'group_member', ['group_id', 'user_id'], unique=True)
+
+    # Later groups for the same trip keep their content but are detached from it.
+    # Databases created before trip_id became nullable cannot detach them, so
+    # they keep running without the unique index until cleaned up by hand.
+    duplicates = conn.execute(text(
+        'SELECT COUNT(*) FROM "group" WHERE trip_id IS NOT NULL AND id NOT IN '
+        '(SELECT MIN(id) FROM "group" WHERE trip_id IS NOT NULL GROUP BY trip_id)'
+    )).scalar()
+    if duplicates:
+        trip_id_column = next(c for c in inspect(conn).get_columns('group') if c['name'] == 'trip_id')
+        if not trip_id_column['nullable']:
+            print(f"❌ {duplicates} groups share a trip; skipping unique index ix_group_trip_id")
+            return
+        conn.execute(text(
+            'UPDATE "group" SET trip_id = NULL WHERE trip_id IS NOT NULL AND id NOT IN '
+            '(SELECT MIN(id) FROM "group" WHERE trip_id IS NOT NULL GROUP BY trip_id)'
+        ))
+    create_index(conn, 'ix_group_trip_id', 'group', ['trip_id'], unique=True)
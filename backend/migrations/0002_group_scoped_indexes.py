@@ -0,0 +1,31 @@
+"""Composite indexes for the group-scoped list queries (filter by group, order by time)"""
+from migrate import create_index
+
+INDEXES = [
+    ('ix_trip_user_id', 'trip', ['user_id', 'id']),
+    ('ix_group_creator', 'group', ['creator_id']),
+    ('ix_group_member_user', 'group_member', ['user_id', 'group_id']),
+    ('ix_chat_message_group_time', 'chat_message', ['group_id', 'timestamp']),
+    ('ix_recommendation_group_time', 'recommendation', ['group_id', 'timestamp']),
+    ('ix_expense_group_time', 'expense', ['group_id', 'timestamp']),
+    ('ix_gallery_image_group_time', 'gallery_image', ['group_id', 'timestamp']),
+    ('ix_checklist_item_group_time', 'checklist_item', ['group_id', 'timestamp']),
+    ('ix_budget_item_group_time', 'budget_item', ['group_id', 'timestamp']),
+    ('ix_location_checkin_group_time', 'location_checkin', ['group_id', 'timestamp']),
+    ('ix_live_location_group_user_time', 'live_location', ['group_id', 'user_id', 'timestamp']),
+    ('ix_live_location_group_active_time', 'live_location', ['group_id', 'is_active', 'timestamp']),
+    ('ix_enhanced_chat_message_group_time', 'enhanced_chat_message', ['group_id', 'timestamp']),
+    ('ix_enhanced_chat_message_group_type_time', 'enhanced_chat_message', ['group_id', 'message_type', 'timestamp']),
+    ('ix_itinerary_item_group_date', 'itinerary_item', ['group_id', 'date', 'time']),
+    ('ix_itinerary_item_group_confirmed_date', 'itinerary_item', ['group_id', 'confirmed', 'date', 'time']),
+    ('ix_poll_group_time', 'poll', ['group_id', 'timestamp']),
+    ('ix_recommendation_vote_rec_user', 'recommendation_vote', ['recommendation_id', 'user_id']),
+    ('ix_trip_finalization_trip_time', 'trip_finalization', ['trip_id', 'timestamp']),
+    ('ix_notification_user_time', 'notification', ['user_id', 'timestamp']),
+    ('ix_notification_group_time', 'notification', ['group_id', 'timestamp']),
+]
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
@@ -0,0 +1,8 @@
+"""Change log compaction marker on group_revision (the change_log table itself comes from create_all)"""
+from migrate import add_column, create_index
+
+
+def upgrade(conn):
+    add_column(conn, 'group_revision', 'compacted_through', 'INTEGER DEFAULT 0')
+    create_index(conn, 'ix_change_log_group_revision', 'change_log', ['group_id', 'revision', 'id'])
+    create_index(conn, 'ix_change_log_timestamp', 'change_log', ['timestamp'])
@@ -0,0 +1,48 @@
+"""Move the Poll.votes JSON blobs into poll_vote rows and build poll_option_tally counts"""
+import json
+from datetime import datetime
+from sqlalchemy import text
+
+
+def _choices(value, option_count):
+    values = value if isinstance(value, list) else [value]
+    return {v for v in values if isinstance(v, int) and not isinstance(v, bool) and 0 <= v < option_count}
+
+
+def upgrade(conn):
+    user_table = conn.dialect.identifier_preparer.quote('user')
+    user_ids = {row[0] for row in conn.execute(text(f'SELECT id FROM {user_table}'))}
+    now = datetime.utcnow()
+
+    for poll_id, options, votes in conn.execute(text('SELECT id, options, votes FROM poll')).fetchall():
+        try:
+            option_count = len(json.loads(options or '[]'))
+        except ValueError:
+            option_count = 0
+
+        # Skip polls whose votes were already moved, so a rerun can't double count
+        if not conn.execute(text('SELECT COUNT(*) FROM poll_vote WHERE poll_id = :p'), {'p': poll_id}).scalar():
+            try:
+                by_user = json.loads(votes) if votes else {}
+            except ValueError:
+                by_user = {}
+            rows = []
+            for user_key, value in (by_user.items() if isinstance(by_user, dict) else []):
+                if not str(user_key).isdigit() or int(user_key) not in user_ids:
+                    continue
+                for option_index in _choices(value, option_count):
+                    rows.append({'p': poll_id, 'u': int(user_key), 'o': option_index, 't': now})
+            if rows:
+                conn.execute(text(
+                    'INSERT INTO poll_vote (poll_id, user_id, option_index, timestamp) VALUES (:p, :u, :o, :t)'
+                ), rows)
+
+        counts = dict(conn.execute(text(
+            'SELECT option_index, COUNT(*) FROM poll_vote WHERE poll_id = :p GROUP BY option_index'
+        ), {'p': poll_id}).fetchall())
+        existing = {row[0] for row in conn.execute(
+            text('SELECT option_index FROM poll_option_tally WHERE poll_id = :p'), {'p': poll_id}
+        )}
+        missing = [{'p': poll_id, 'o': i, 'c': counts.get(i, 0)} for i in range(option_count) if i not in existing]
+        if missing:
+            conn.execute(text('INSERT INTO poll_option_tally (poll_id, option_index, count) VALUES (:p, :o, :c)'), missing)
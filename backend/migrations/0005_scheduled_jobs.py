@@ -0,0 +1,20 @@
+"""Index for live location pruning, and close jobs for polls that already have an expiry
+(the scheduled_job table itself comes from create_all)"""
+import json
+from sqlalchemy import text
+from migrate import create_index
+
+
+def upgrade(conn):
+    create_index(conn, 'ix_live_location_timestamp', 'live_location', ['timestamp'])
+    rows = conn.execute(text(
+        'SELECT id, expires_at FROM poll WHERE is_active = :active AND expires_at IS NOT NULL'
+    ), {'active': True}).fetchall()
+    scheduled = {row[0] for row in conn.execute(text('SELECT key FROM scheduled_job'))}
+    jobs = [{'kind': 'close_poll', 'key': f'poll:{poll_id}', 'run_at': expires_at,
+             'payload': json.dumps({'poll_id': poll_id})}
+            for poll_id, expires_at in rows if f'poll:{poll_id}' not in scheduled]
+    if jobs:
+        conn.execute(text(
+            'INSERT INTO scheduled_job (kind, key, run_at, payload, attempts) VALUES (:kind, :key, :run_at, :payload, 0)'
+        ), jobs)
@@ -0,0 +1,39 @@
+"""Vote counters and Wilson score on recommendation, backfilled from recommendation_vote"""
+import math
+from sqlalchemy import text
+from migrate import add_column, create_index
+
+# A copy of recommend.wilson_lower_bound as of this migration, so later changes there don't alter it
+WILSON_Z = 1.96
+
+
+def wilson_lower_bound(approve, reject):
+    total = approve + reject
+    if total == 0:
+        return 0.0
+    p = approve / total
+    z2 = WILSON_Z * WILSON_Z
+    margin = WILSON_Z * math.sqrt((p * (1 - p) + z2 / (4 * total)) / total)
+    return (p + z2 / (2 * total) - margin) / (1 + z2 / total)
+
+
+def upgrade(conn):
+    add_column(conn, 'recommendation', 'approve_count', 'INTEGER DEFAULT 0')
+    add_column(conn, 'recommendation', 'reject_count', 'INTEGER DEFAULT 0')
+    add_column(conn, 'recommendation', 'score', 'FLOAT DEFAULT 0')
+    create_index(conn, 'ix_recommendation_group_score', 'recommendation', ['group_id', 'score', 'id'])
+
+    counts = {}
+    for rec_id, vote, count in conn.execute(text(
+        'SELECT recommendation_id, vote, COUNT(*) FROM recommendation_vote GROUP BY recommendation_id, vote'
+    )):
+        counts.setdefault(rec_id, {})[vote] = count
+    rows = []
+    for (rec_id,) in conn.execute(text('SELECT id FROM recommendation')).fetchall():
+        approve = counts.get(rec_id, {}).get('approve', 0)
+        reject = counts.get(rec_id, {}).get('reject', 0)
+        rows.append({'id': rec_id, 'a': approve, 'r': reject, 's': wilson_lower_bound(approve, reject)})
+    if rows:
+        conn.execute(text(
+            'UPDATE recommendation SET approve_count = :a, reject_count = :r, score = :s WHERE id = :id'
+        ), rows)
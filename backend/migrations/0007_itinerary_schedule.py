@@ -0,0 +1,50 @@
+"""Typed start/end/duration on itinerary_item, backfilled from the date and time strings"""
+from datetime import date as Date, datetime, timedelta
+from sqlalchemy import DateTime, Integer, column, table, text
+from migrate import add_column, create_index
+
+# The parsing rules itinerary.py used when this migration was written, copied so the
+# backfill stays the same whatever that module does later
+DEFAULT_DURATION_MINUTES = {'flight': 180, 'hotel': 60, 'activity': 120, 'restaurant': 90}
+FALLBACK_DURATION_MINUTES = 60
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p')
+
+itinerary_item = table(
+    'itinerary_item',
+    column('id', Integer), column('start_at', DateTime), column('end_at', DateTime),
+    column('duration_minutes', Integer),
+)
+
+
+def schedule_fields(item_type, date, time):
+    """(start_at, end_at, duration_minutes), or Nones if the date or time doesn't parse"""
+    try:
+        day = Date.fromisoformat(str(date).strip()[:10])
+    except ValueError:
+        return None, None, None
+    for time_format in TIME_FORMATS:
+        try:
+            clock = datetime.strptime(str(time).strip().upper(), time_format)
+        except ValueError:
+            continue
+        start = datetime.combine(day, clock.time())
+        minutes = DEFAULT_DURATION_MINUTES.get((item_type or '').lower(), FALLBACK_DURATION_MINUTES)
+        return start, start + timedelta(minutes=minutes), minutes
+    return None, None, None
+
+
+def upgrade(conn):
+    add_column(conn, 'itinerary_item', 'start_at', 'TIMESTAMP')
+    add_column(conn, 'itinerary_item', 'end_at', 'TIMESTAMP')
+    add_column(conn, 'itinerary_item', 'duration_minutes', 'INTEGER')
+    create_index(conn, 'ix_itinerary_item_group_start', 'itinerary_item', ['group_id', 'start_at'])
+
+    rows = conn.execute(text(
+        'SELECT id, type, date, time FROM itinerary_item WHERE start_at IS NULL AND date IS NOT NULL AND time IS NOT NULL'
+    )).fetchall()
+    for item_id, item_type, date, time in rows:
+        start_at, end_at, duration = schedule_fields(item_type, date, time)
+        if start_at is not None:
+            conn.execute(itinerary_item.update().where(itinerary_item.c.id == item_id).values(
+                start_at=start_at, end_at=end_at, duration_minutes=duration
+            ))
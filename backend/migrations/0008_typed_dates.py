@@ -0,0 +1,38 @@
+"""Typed dates on trip (start_on/end_on) and itinerary_item (day), backfilled from the date strings"""
+from datetime import date
+from sqlalchemy import Date, Integer, column, table, text
+from migrate import add_column, create_index
+
+trip = table('trip', column('id', Integer), column('start_on', Date), column('end_on', Date))
+itinerary_item = table('itinerary_item', column('id', Integer), column('day', Date))
+
+
+def parse_day(value):
+    """date for a YYYY-MM-DD string (a trailing time is ignored); None if it doesn't parse.
+    A copy of pagination.parse_day as of this migration."""
+    try:
+        return date.fromisoformat(str(value).strip()[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def upgrade(conn):
+    add_column(conn, 'trip', 'start_on', 'DATE')
+    add_column(conn, 'trip', 'end_on', 'DATE')
+    add_column(conn, 'itinerary_item', 'day', 'DATE')
+    create_index(conn, 'ix_trip_user_start', 'trip', ['user_id', 'start_on', 'id'])
+    create_index(conn, 'ix_itinerary_item_group_day', 'itinerary_item', ['group_id', 'day', 'time', 'id'])
+
+    # Strings that aren't YYYY-MM-DD stay NULL and are left out of date range filters
+    for trip_id, start_date, end_date in conn.execute(text(
+        'SELECT id, start_date, end_date FROM trip WHERE start_on IS NULL'
+    )).fetchall():
+        start_on, end_on = parse_day(start_date), parse_day(end_date)
+        if start_on or end_on:
+            conn.execute(trip.update().where(trip.c.id == trip_id).values(start_on=start_on, end_on=end_on))
+    for item_id, day_text in conn.execute(text(
+        'SELECT id, date FROM itinerary_item WHERE day IS NULL AND date IS NOT NULL'
+    )).fetchall():
+        day = parse_day(day_text)
+        if day:
+            conn.execute(itinerary_item.update().where(itinerary_item.c.id == item_id).values(day=day))
@@ -0,0 +1,6 @@
+"""Explicit order of itinerary items within a day"""
+from migrate import add_column
+
+
+def upgrade(conn):
+    add_column(conn, 'itinerary_item', 'position', 'INTEGER')
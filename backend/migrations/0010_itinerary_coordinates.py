@@ -0,0 +1,339 @@
+"""Coordinates on itinerary_item, geocoded from the location text against the bundled gazetteer.
+
+The gazetteer (data/gazetteer.csv as of this migration) and the lookup from
+gazetteer.py are frozen here, so replaying it later gives the same coordinates.
+"""
+import re
+import unicodedata
+from sqlalchemy import Float, Integer, column, table, text
+from migrate import add_column
+
+itinerary_item = table('itinerary_item', column('id', Integer), column('latitude', Float), column('longitude', Float))
+
+# Between equally long matches the more specific place wins
+KIND_RANK = {'landmark': 2, 'airport': 2, 'city': 1}
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+# (name, aliases separated by |, kind, latitude, longitude)
+PLACES = [
+    ('Lisbon', 'Lisboa', 'city', 38.7223, -9.1393),
+    ('Porto', 'Oporto', 'city', 41.1579, -8.6291),
+    ('Sintra', '', 'city', 38.8029, -9.3817),
+    ('Cascais', '', 'city', 38.6979, -9.4215),
+    ('Faro', '', 'city', 37.0194, -7.9322),
+    ('Funchal', 'Madeira', 'city', 32.6669, -16.9241),
+    ('Madrid', '', 'city', 40.4168, -3.7038),
+    ('Barcelona', '', 'city', 41.3874, 2.1686),
+    ('Seville', 'Sevilla', 'city', 37.3891, -5.9845),
+    ('Valencia', '', 'city', 39.4699, -0.3763),
+    ('Granada', '', 'city', 37.1773, -3.5986),
+    ('Malaga', '', 'city', 36.7213, -4.4214),
+    ('Cordoba', '', 'city', 37.8882, -4.7794),
+    ('Toledo', '', 'city', 39.8628, -4.0273),
+    ('Bilbao', '', 'city', 43.263, -2.935),
+    ('San Sebastian', 'Donostia', 'city', 43.3183, -1.9812),
+    ('Palma', 'Palma de Mallorca|Mallorca|Majorca', 'city', 39.5696, 2.6502),
+    ('Ibiza', '', 'city', 38.9067, 1.4206),
+    ('Paris', '', 'city', 48.8566, 2.3522),
+    ('Nice', '', 'city', 43.7102, 7.262),
+    ('Lyon', '', 'city', 45.764, 4.8357),
+    ('Marseille', '', 'city', 43.2965, 5.3698),
+    ('London', '', 'city', 51.5074, -0.1278),
+    ('Edinburgh', '', 'city', 55.9533, -3.1883),
+    ('Dublin', '', 'city', 53.3498, -6.2603),
+    ('Amsterdam', '', 'city', 52.3676, 4.9041),
+    ('Brussels', 'Bruxelles', 'city', 50.8503, 4.3517),
+    ('Berlin', '', 'city', 52.52, 13.405),
+    ('Munich', 'München|Muenchen', 'city', 48.1351, 11.582),
+    ('Hamburg', '', 'city', 53.5511, 9.9937),
+    ('Frankfurt', '', 'city', 50.1109, 8.6821),
+    ('Vienna', 'Wien', 'city', 48.2082, 16.3738),
+    ('Prague', 'Praha', 'city', 50.0755, 14.4378),
+    ('Budapest', '', 'city', 47.4979, 19.0402),
+    ('Zurich', 'Zürich', 'city', 47.3769, 8.5417),
+    ('Geneva', 'Genève', 'city', 46.2044, 6.1432),
+    ('Rome', 'Roma', 'city', 41.9028, 12.4964),
+    ('Florence', 'Firenze', 'city', 43.7696, 11.2558),
+    ('Venice', 'Venezia', 'city', 45.4408, 12.3155),
+    ('Milan', 'Milano', 'city', 45.4642, 9.19),
+    ('Naples', 'Napoli', 'city', 40.8518, 14.2681),
+    ('Pisa', '', 'city', 43.7228, 10.4017),
+    ('Athens', '', 'city', 37.9838, 23.7275),
+    ('Istanbul', '', 'city', 41.0082, 28.9784),
+    ('Copenhagen', 'København', 'city', 55.6761, 12.5683),
+    ('Stockholm', '', 'city', 59.3293, 18.0686),
+    ('Oslo', '', 'city', 59.9139, 10.7522),
+    ('Helsinki', '', 'city', 60.1699, 24.9384),
+    ('Reykjavik', 'Reykjavík', 'city', 64.1466, -21.9426),
+    ('Warsaw', 'Warszawa', 'city', 52.2297, 21.0122),
+    ('Krakow', 'Kraków', 'city', 50.0647, 19.945),
+    ('New York', 'New York City|NYC|Manhattan', 'city', 40.7128, -74.006),
+    ('Los Angeles', '', 'city', 34.0522, -118.2437),
+    ('San Francisco', '', 'city', 37.7749, -122.4194),
+    ('Chicago', '', 'city', 41.8781, -87.6298),
+    ('Washington', 'Washington DC|Washington D.C.', 'city', 38.9072, -77.0369),
+    ('Boston', '', 'city', 42.3601, -71.0589),
+    ('Miami', '', 'city', 25.7617, -80.1918),
+    ('Las Vegas', '', 'city', 36.1699, -115.1398),
+    ('Toronto', '', 'city', 43.6532, -79.3832),
+    ('Vancouver', '', 'city', 49.2827, -123.1207),
+    ('Montreal', 'Montréal', 'city', 45.5017, -73.5673),
+    ('Mexico City', 'Ciudad de Mexico|CDMX', 'city', 19.4326, -99.1332),
+    ('Cancun', 'Cancún', 'city', 21.1619, -86.8515),
+    ('Rio de Janeiro', '', 'city', -22.9068, -43.1729),
+    ('Buenos Aires', '', 'city', -34.6037, -58.3816),
+    ('Lima', '', 'city', -12.0464, -77.0428),
+    ('Cusco', 'Cuzco', 'city', -13.532, -71.9675),
+    ('Tokyo', '', 'city', 35.6762, 139.6503),
+    ('Kyoto', '', 'city', 35.0116, 135.7681),
+    ('Osaka', '', 'city', 34.6937, 135.5023),
+    ('Seoul', '', 'city', 37.5665, 126.978),
+    ('Beijing', 'Peking', 'city', 39.9042, 116.4074),
+    ('Shanghai', '', 'city', 31.2304, 121.4737),
+    ('Hong Kong', '', 'city', 22.3193, 114.1694),
+    ('Singapore', '', 'city', 1.3521, 103.8198),
+    ('Bangkok', '', 'city', 13.7563, 100.5018),
+    ('Bali', 'Denpasar', 'city', -8.3405, 115.092),
+    ('Hanoi', '', 'city', 21.0278, 105.8342),
+    ('Ho Chi Minh City', 'Saigon', 'city', 10.8231, 106.6297),
+    ('Mumbai', 'Bombay', 'city', 19.076, 72.8777),
+    ('Delhi', 'New Delhi', 'city', 28.6139, 77.209),
+    ('Jaipur', '', 'city', 26.9124, 75.7873),
+    ('Agra', '', 'city', 27.1767, 78.0081),
+    ('Bengaluru', 'Bangalore', 'city', 12.9716, 77.5946),
+    ('Goa', '', 'city', 15.2993, 74.124),
+    ('Dubai', '', 'city', 25.2048, 55.2708),
+    ('Abu Dhabi', '', 'city', 24.4539, 54.3773),
+    ('Cairo', '', 'city', 30.0444, 31.2357),
+    ('Marrakech', 'Marrakesh', 'city', 31.6295, -7.9811),
+    ('Cape Town', '', 'city', -33.9249, 18.4241),
+    ('Nairobi', '', 'city', -1.2921, 36.8219),
+    ('Sydney', '', 'city', -33.8688, 151.2093),
+    ('Melbourne', '', 'city', -37.8136, 144.9631),
+    ('Auckland', '', 'city', -36.8485, 174.7633),
+    ('Belem Tower', 'Torre de Belem', 'landmark', 38.6916, -9.216),
+    ('Jeronimos Monastery', 'Mosteiro dos Jeronimos', 'landmark', 38.6979, -9.2068),
+    ('Padrao dos Descobrimentos', 'Monument to the Discoveries', 'landmark', 38.6936, -9.2057),
+    ('Sao Jorge Castle', "Castelo de Sao Jorge|St George's Castle", 'landmark', 38.7139, -9.1335),
+    ('Alfama', '', 'landmark', 38.7118, -9.13),
+    ('Bairro Alto', '', 'landmark', 38.7134, -9.1448),
+    ('Praca do Comercio', 'Commerce Square', 'landmark', 38.7075, -9.1364),
+    ('Santa Justa Lift', 'Elevador de Santa Justa', 'landmark', 38.7122, -9.1394),
+    ('Time Out Market', 'Mercado da Ribeira', 'landmark', 38.7068, -9.1459),
+    ('LX Factory', '', 'landmark', 38.7033, -9.1784),
+    ('Lisbon Oceanarium', 'Oceanario de Lisboa|Oceanario', 'landmark', 38.7635, -9.0937),
+    ('Miradouro da Senhora do Monte', '', 'landmark', 38.719, -9.133),
+    ('Pena Palace', 'Palacio da Pena', 'landmark', 38.7876, -9.3906),
+    ('Ribeira', 'Cais da Ribeira', 'landmark', 41.1406, -8.6131),
+    ('Dom Luis I Bridge', 'Ponte Dom Luis I|Ponte Luis I', 'landmark', 41.14, -8.6094),
+    ('Livraria Lello', 'Lello Bookshop', 'landmark', 41.1469, -8.6148),
+    ('Clerigos Tower', 'Torre dos Clerigos', 'landmark', 41.1457, -8.6146),
+    ('Sao Bento Station', 'Estacao de Sao Bento', 'landmark', 41.1456, -8.6106),
+    ('Serralves', 'Serralves Museum', 'landmark', 41.1596, -8.6598),
+    ('Prado Museum', 'Museo del Prado|The Prado', 'landmark', 40.4138, -3.6921),
+    ('Reina Sofia Museum', 'Museo Reina Sofia|Reina Sofia', 'landmark', 40.4086, -3.6943),
+    ('Thyssen-Bornemisza Museum', 'Museo Thyssen|Thyssen', 'landmark', 40.416, -3.6949),
+    ('Royal Palace of Madrid', 'Palacio Real', 'landmark', 40.418, -3.7143),
+    ('Retiro Park', 'Parque del Retiro|El Retiro', 'landmark', 40.4153, -3.6845),
+    ('Plaza Mayor', '', 'landmark', 40.4155, -3.7074),
+    ('Puerta del Sol', '', 'landmark', 40.4169, -3.7035),
+    ('Mercado de San Miguel', 'San Miguel Market', 'landmark', 40.4154, -3.709),
+    ('Temple of Debod', 'Templo de Debod', 'landmark', 40.424, -3.7178),
+    ('Santiago Bernabeu', 'Bernabeu', 'landmark', 40.4531, -3.6883),
+    ('Sagrada Familia', 'La Sagrada Familia', 'landmark', 41.4036, 2.1744),
+    ('Park Guell', 'Parc Guell', 'landmark', 41.4145, 2.1527),
+    ('Casa Batllo', '', 'landmark', 41.3917, 2.1649),
+    ('Casa Mila', 'La Pedrera', 'landmark', 41.3954, 2.1619),
+    ('La Rambla', 'Las Ramblas', 'landmark', 41.3809, 2.1734),
+    ('La Boqueria', 'Mercat de la Boqueria|Boqueria Market', 'landmark', 41.3817, 2.1716),
+    ('Gothic Quarter', 'Barri Gotic', 'landmark', 41.3833, 2.1763),
+    ('Barcelona Cathedral', '', 'landmark', 41.3839, 2.1762),
+    ('Picasso Museum', 'Museu Picasso', 'landmark', 41.3852, 2.181),
+    ('Camp Nou', '', 'landmark', 41.3809, 2.1228),
+    ('Barceloneta Beach', 'Barceloneta', 'landmark', 41.3784, 2.1925),
+    ('Montjuic', 'Montjuïc', 'landmark', 41.3636, 2.1586),
+    ('Real Alcazar', 'Alcazar of Seville|Alcazar', 'landmark', 37.3831, -5.9902),
+    ('Seville Cathedral', 'Giralda|Catedral de Sevilla', 'landmark', 37.3861, -5.9926),
+    ('Plaza de Espana', '', 'landmark', 37.3772, -5.9869),
+    ('Metropol Parasol', 'Las Setas', 'landmark', 37.3933, -5.9917),
+    ('Triana', '', 'landmark', 37.3826, -6.0027),
+    ('City of Arts and Sciences', 'Ciudad de las Artes y las Ciencias', 'landmark', 39.4546, -0.3505),
+    ('Oceanografic', "L'Oceanografic", 'landmark', 39.453, -0.347),
+    ('Central Market Valencia', 'Mercado Central', 'landmark', 39.4736, -0.379),
+    ('Alhambra', '', 'landmark', 37.1761, -3.5881),
+    ('Albaicin', 'Albayzin', 'landmark', 37.181, -3.592),
+    ('Mezquita', 'Mosque-Cathedral of Cordoba', 'landmark', 37.8789, -4.7794),
+    ('Guggenheim Museum Bilbao', 'Guggenheim Bilbao', 'landmark', 43.2687, -2.934),
+    ('Eiffel Tower', 'Tour Eiffel', 'landmark', 48.8584, 2.2945),
+    ('Louvre Museum', 'Louvre|Musee du Louvre', 'landmark', 48.8606, 2.3376),
+    ('Notre-Dame de Paris', 'Notre Dame|Notre-Dame', 'landmark', 48.853, 2.3499),
+    ('Arc de Triomphe', '', 'landmark', 48.8738, 2.295),
+    ('Sacre-Coeur', 'Sacre Coeur|Montmartre', 'landmark', 48.8867, 2.3431),
+    ("Musee d'Orsay", 'Orsay Museum|Musee dOrsay', 'landmark', 48.86, 2.3266),
+    ('Champs-Elysees', 'Champs Elysees', 'landmark', 48.8698, 2.3078),
+    ('Centre Pompidou', 'Pompidou Centre|Pompidou', 'landmark', 48.8607, 2.3522),
+    ('Luxembourg Gardens', 'Jardin du Luxembourg', 'landmark', 48.8462, 2.3372),
+    ('Sainte-Chapelle', 'Sainte Chapelle', 'landmark', 48.8554, 2.345),
+    ('Palace of Versailles', 'Versailles|Chateau de Versailles', 'landmark', 48.8049, 2.1204),
+    ('Big Ben', 'Palace of Westminster|Houses of Parliament', 'landmark', 51.5007, -0.1246),
+    ('Westminster Abbey', '', 'landmark', 51.4993, -0.1273),
+    ('London Eye', '', 'landmark', 51.5033, -0.1196),
+    ('Buckingham Palace', '', 'landmark', 51.5014, -0.1419),
+    ('Tower of London', '', 'landmark', 51.5081, -0.0759),
+    ('Tower Bridge', '', 'landmark', 51.5055, -0.0754),
+    ('British Museum', '', 'landmark', 51.5194, -0.127),
+    ('Tate Modern', '', 'landmark', 51.5076, -0.0994),
+    ("St Paul's Cathedral", "St Pauls Cathedral|Saint Paul's Cathedral", 'landmark', 51.5138, -0.0984),
+    ('Trafalgar Square', '', 'landmark', 51.508, -0.1281),
+    ('National Gallery', '', 'landmark', 51.5089, -0.1283),
+    ('Hyde Park', '', 'landmark', 51.5073, -0.1657),
+    ('Covent Garden', '', 'landmark', 51.5117, -0.124),
+    ('Camden Market', '', 'landmark', 51.5413, -0.1466),
+    ('Natural History Museum', '', 'landmark', 51.4967, -0.1764),
+    ('Borough Market', '', 'landmark', 51.5055, -0.091),
+    ('Colosseum', 'Colosseo|Coliseum', 'landmark', 41.8902, 12.4922),
+    ('Roman Forum', 'Foro Romano', 'landmark', 41.8925, 12.4853),
+    ('Pantheon', '', 'landmark', 41.8986, 12.4769),
+    ('Trevi Fountain', 'Fontana di Trevi', 'landmark', 41.9009, 12.4833),
+    ('Spanish Steps', 'Piazza di Spagna', 'landmark', 41.906, 12.4828),
+    ('Piazza Navona', '', 'landmark', 41.8992, 12.4731),
+    ('Vatican Museums', 'Musei Vaticani', 'landmark', 41.9065, 12.4536),
+    ('Sistine Chapel', 'Cappella Sistina', 'landmark', 41.9029, 12.4545),
+    ("St Peter's Basilica", "St Peters Basilica|Saint Peter's Basilica|St Peter's Square", 'landmark', 41.9022, 12.4539),
+    ("Castel Sant'Angelo", 'Castel Santangelo', 'landmark', 41.9031, 12.4663),
+    ('Trastevere', '', 'landmark', 41.8897, 12.47),
+    ('Borghese Gallery', 'Galleria Borghese|Villa Borghese', 'landmark', 41.9142, 12.4922),
+    ('Uffizi Gallery', 'Uffizi|Galleria degli Uffizi', 'landmark', 43.7678, 11.2553),
+    ('Florence Cathedral', 'Duomo di Firenze|Santa Maria del Fiore', 'landmark', 43.7731, 11.256),
+    ('Ponte Vecchio', '', 'landmark', 43.768, 11.2531),
+    ("St Mark's Square", 'Piazza San Marco|St Marks Square', 'landmark', 45.4341, 12.3388),
+    ('Rialto Bridge', 'Ponte di Rialto', 'landmark', 45.438, 12.3359),
+    ('Milan Cathedral', 'Duomo di Milano', 'landmark', 45.4642, 9.1916),
+    ('Leaning Tower of Pisa', 'Tower of Pisa', 'landmark', 43.723, 10.3966),
+    ('Acropolis', 'Parthenon', 'landmark', 37.9715, 23.7257),
+    ('Hagia Sophia', 'Aya Sofya', 'landmark', 41.0086, 28.9802),
+    ('Blue Mosque', 'Sultan Ahmed Mosque', 'landmark', 41.0054, 28.9768),
+    ('Grand Bazaar', 'Kapalicarsi', 'landmark', 41.0107, 28.9681),
+    ('Rijksmuseum', '', 'landmark', 52.36, 4.8852),
+    ('Van Gogh Museum', '', 'landmark', 52.3584, 4.8811),
+    ('Anne Frank House', 'Anne Frank Huis', 'landmark', 52.3752, 4.884),
+    ('Vondelpark', '', 'landmark', 52.358, 4.8686),
+    ('Dam Square', '', 'landmark', 52.3731, 4.8926),
+    ('Brandenburg Gate', 'Brandenburger Tor', 'landmark', 52.5163, 13.3777),
+    ('Reichstag', 'Reichstag Building', 'landmark', 52.5186, 13.3762),
+    ('Museum Island', 'Museumsinsel', 'landmark', 52.5169, 13.4019),
+    ('East Side Gallery', '', 'landmark', 52.505, 13.4397),
+    ('Checkpoint Charlie', '', 'landmark', 52.5076, 13.3904),
+    ('Neuschwanstein Castle', 'Schloss Neuschwanstein|Neuschwanstein', 'landmark', 47.5576, 10.7498),
+    ('Schonbrunn Palace', 'Schloss Schonbrunn|Schönbrunn Palace', 'landmark', 48.1845, 16.3122),
+    ('Charles Bridge', 'Karluv most', 'landmark', 50.0865, 14.4114),
+    ('Prague Castle', 'Prazsky hrad', 'landmark', 50.0911, 14.4016),
+    ('Statue of Liberty', '', 'landmark', 40.6892, -74.0445),
+    ('Central Park', '', 'landmark', 40.7829, -73.9654),
+    ('Times Square', '', 'landmark', 40.758, -73.9855),
+    ('Empire State Building', '', 'landmark', 40.7484, -73.9857),
+    ('Metropolitan Museum of Art', 'The Met|Met Museum', 'landmark', 40.7794, -73.9632),
+    ('Museum of Modern Art', 'MoMA', 'landmark', 40.7614, -73.9776),
+    ('Brooklyn Bridge', '', 'landmark', 40.7061, -73.9969),
+    ('One World Trade Center', '9/11 Memorial|World Trade Center', 'landmark', 40.7127, -74.0134),
+    ('Rockefeller Center', 'Top of the Rock', 'landmark', 40.7587, -73.9787),
+    ('High Line', 'The High Line', 'landmark', 40.748, -74.0048),
+    ('Grand Central Terminal', 'Grand Central', 'landmark', 40.7527, -73.9772),
+    ('Golden Gate Bridge', '', 'landmark', 37.8199, -122.4783),
+    ('Alcatraz', 'Alcatraz Island', 'landmark', 37.827, -122.423),
+    ('Senso-ji', 'Sensoji|Asakusa', 'landmark', 35.7148, 139.7967),
+    ('Shibuya Crossing', 'Shibuya', 'landmark', 35.6595, 139.7005),
+    ('Meiji Shrine', 'Meiji Jingu', 'landmark', 35.6764, 139.6993),
+    ('Tokyo Skytree', 'Skytree', 'landmark', 35.7101, 139.8107),
+    ('Tokyo Tower', '', 'landmark', 35.6586, 139.7454),
+    ('Tsukiji Outer Market', 'Tsukiji', 'landmark', 35.6655, 139.7707),
+    ('Shinjuku Gyoen', '', 'landmark', 35.6852, 139.7101),
+    ('Tokyo Imperial Palace', 'Imperial Palace', 'landmark', 35.6852, 139.7528),
+    ('Fushimi Inari', 'Fushimi Inari Taisha', 'landmark', 34.9671, 135.7727),
+    ('Kinkaku-ji', 'Kinkakuji|Golden Pavilion', 'landmark', 35.0394, 135.7292),
+    ('Kiyomizu-dera', 'Kiyomizudera', 'landmark', 34.9949, 135.785),
+    ('Arashiyama Bamboo Grove', 'Arashiyama', 'landmark', 35.017, 135.6713),
+    ('Gion', '', 'landmark', 35.0037, 135.7788),
+    ('Grand Palace', 'Grand Palace Bangkok', 'landmark', 13.75, 100.4913),
+    ('Marina Bay Sands', '', 'landmark', 1.2834, 103.8607),
+    ('Gardens by the Bay', '', 'landmark', 1.2816, 103.8636),
+    ('Burj Khalifa', '', 'landmark', 25.1972, 55.2744),
+    ('Taj Mahal', '', 'landmark', 27.1751, 78.0421),
+    ('Pyramids of Giza', 'Giza Pyramids|Great Pyramid', 'landmark', 29.9792, 31.1342),
+    ('Table Mountain', '', 'landmark', -33.9628, 18.4098),
+    ('Sydney Opera House', '', 'landmark', -33.8568, 151.2153),
+    ('Machu Picchu', '', 'landmark', -13.1631, -72.545),
+    ('Christ the Redeemer', 'Cristo Redentor', 'landmark', -22.9519, -43.2105),
+    ('Lisbon Airport', 'Humberto Delgado Airport|LIS Airport', 'airport', 38.7742, -9.1342),
+    ('Porto Airport', 'Francisco Sa Carneiro Airport|OPO Airport', 'airport', 41.2481, -8.6814),
+    ('Madrid Barajas Airport', 'Barajas|Madrid Airport|MAD Airport', 'airport', 40.4983, -3.5676),
+    ('Barcelona El Prat Airport', 'El Prat|Barcelona Airport|BCN Airport', 'airport', 41.2974, 2.0833),
+    ('Seville Airport', 'SVQ Airport', 'airport', 37.418, -5.8931),
+    ('Valencia Airport', 'VLC Airport', 'airport', 39.4893, -0.4816),
+    ('Charles de Gaulle Airport', 'CDG|Roissy', 'airport', 49.0097, 2.5479),
+    ('Orly Airport', 'Orly', 'airport', 48.7262, 2.3652),
+    ('Heathrow Airport', 'Heathrow|LHR', 'airport', 51.47, -0.4543),
+    ('Gatwick Airport', 'Gatwick', 'airport', 51.1537, -0.1821),
+    ('Fiumicino Airport', 'Fiumicino|Leonardo da Vinci Airport', 'airport', 41.8003, 12.2389),
+    ('Schiphol Airport', 'Schiphol', 'airport', 52.3105, 4.7683),
+    ('Frankfurt Airport', '', 'airport', 50.0379, 8.5622),
+    ('JFK Airport', 'JFK|John F. Kennedy Airport', 'airport', 40.6413, -73.7781),
+    ('LAX Airport', 'LAX', 'airport', 33.9416, -118.4085),
+    ('Narita Airport', 'Narita', 'airport', 35.772, 140.3929),
+    ('Haneda Airport', 'Haneda', 'airport', 35.5494, 139.7798),
+    ('Dubai International Airport', 'DXB', 'airport', 25.2532, 55.3657),
+    ('Changi Airport', 'Changi', 'airport', 1.3644, 103.9915),
+]
+
+
+def normalize(value):
+    """Lowercase words without accents or punctuation, as gazetteer.normalize did"""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(c for c in value if not unicodedata.combining(c)).lower().replace("'", '').replace('’', '')
+    return ' '.join(NON_WORD_RE.sub(' ', value).split())
+
+
+def build_index():
+    """({normalized name or alias: (kind, latitude, longitude)}, most words in any key)"""
+    index = {}
+    for name, aliases, kind, latitude, longitude in PLACES:
+        for alias in [name] + aliases.split('|'):
+            key = normalize(alias)
+            current = index.get(key)
+            if key and (current is None or KIND_RANK.get(kind, 0) > KIND_RANK.get(current[0], 0)):
+                index[key] = (kind, latitude, longitude)
+    return index, max((len(key.split()) for key in index), default=0)
+
+
+def geocode(index, longest, location):
+    """(latitude, longitude) of the longest run of words naming a place, or None"""
+    words = normalize(location).split()
+    if not words:
+        return None
+    place = index.get(' '.join(words))
+    if place is not None:
+        return place[1:]
+    for size in range(min(longest, len(words)), 0, -1):
+        best = None
+        for start in range(len(words) - size + 1):
+            place = index.get(' '.join(words[start:start + size]))
+            if place is not None and (best is None or KIND_RANK.get(place[0], 0) > KIND_RANK.get(best[0], 0)):
+                best = place
+        if best is not None:
+            return best[1:]
+    return None
+
+
+def upgrade(conn):
+    add_column(conn, 'itinerary_item', 'latitude', 'FLOAT')
+    add_column(conn, 'itinerary_item', 'longitude', 'FLOAT')
+
+    index, longest = build_index()
+    for item_id, location in conn.execute(text(
+        'SELECT id, location FROM itinerary_item WHERE latitude IS NULL AND location IS NOT NULL'
+    )).fetchall():
+        coordinates = geocode(index, longest, location)
+        if coordinates is not None:
+            conn.execute(itinerary_item.update().where(itinerary_item.c.id == item_id).values(
+                latitude=coordinates[0], longitude=coordinates[1]
+            ))
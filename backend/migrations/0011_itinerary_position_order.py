@@ -0,0 +1,15 @@
+"""position NOT NULL DEFAULT 0, and the itinerary order (day, position, time, id) served by one index"""
+from sqlalchemy import text
+from migrate import create_index
+
+
+def upgrade(conn):
+    conn.execute(text('UPDATE itinerary_item SET position = 0 WHERE position IS NULL'))
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(
+            'ALTER TABLE itinerary_item ALTER COLUMN position SET DEFAULT 0, ALTER COLUMN position SET NOT NULL'
+        ))
+    # SQLite can't alter the column; the model's default keeps new rows non-NULL there
+    conn.execute(text('DROP INDEX IF EXISTS ix_itinerary_item_group_day'))
+    create_index(conn, 'ix_itinerary_item_group_day_position', 'itinerary_item',
+                 ['group_id', 'day', 'position', 'time', 'id'])
@@ -0,0 +1,33 @@
+"""One text format for DateTime values on SQLite, so ORDER BY and cursor comparisons can use the plain columns.
+
+SQLAlchemy writes 'YYYY-MM-DD HH:MM:SS.ffffff', but rows from the old
+CURRENT_TIMESTAMP server defaults (and any written by hand) lack the
+microseconds and sort before every value of the same second.
+"""
+from datetime import datetime
+from sqlalchemy import DateTime, inspect, text
+
+STORAGE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+CANONICAL = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+
+
+def upgrade(conn):
+    if conn.dialect.name != 'sqlite':
+        return
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in inspector.get_table_names():
+        for col in inspector.get_columns(table):
+            if not isinstance(col['type'], DateTime):
+                continue
+            rows = conn.execute(text(
+                f'SELECT rowid, {quote(col["name"])} FROM {quote(table)} '
+                f'WHERE {quote(col["name"])} IS NOT NULL AND {quote(col["name"])} NOT GLOB :canonical'
+            ), {'canonical': CANONICAL}).fetchall()
+            for rowid, value in rows:
+                try:
+                    parsed = datetime.fromisoformat(str(value))
+                except ValueError:
+                    continue
+                conn.execute(text(f'UPDATE {quote(table)} SET {quote(col["name"])} = :value WHERE rowid = :rowid'),
+                             {'value': parsed.replace(tzinfo=None).strftime(STORAGE_FORMAT), 'rowid': rowid})
@@ -18,6 +18,14 @@ class Trip(db.Model):
     end_date = db.Column(db.String(20), nullable=False)
     description = db.Column(db.String(300), nullable=True)
     finalized = db.Column(db.Boolean, default=False)
+    # Typed copies of start_date/end_date for range filters; NULL if the string isn't YYYY-MM-DD
+    start_on = db.Column(db.Date)
+    end_on = db.Column(db.Date)
+
+    __table_args__ = (
+        db.Index('ix_trip_user_id', 'user_id', 'id'),
+        db.Index('ix_trip_user_start', 'user_id', 'start_on', 'id'),
+    )
 
 
 # ---- CLEARLY ADD THESE TWO NEW MODELS BELOW ----
@@ -26,19 +34,75 @@ class Group(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    trip_id = db.Column(db.Integer, db.ForeignKey('trip.id'), nullable=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trip.id'), nullable=True, unique=True, index=True)
+
+    __table_args__ = (
+        db.Index('ix_group_creator', 'creator_id'),
+    )
+
+class GroupRevision(db.Model):
+    """Bumped on every write to the group's data; drives ETags on group-scoped GETs"""
+    group_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Change log entries up to this revision have been compacted away
+    compacted_through = db.Column(db.Integer, default=0)
+
+class ChangeLog(db.Model):
+    """One row per insert, update or delete of a group-scoped row, tagged with the group revision it produced"""
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    entity = db.Column(db.String(50), nullable=False)  # table name, e.g. itinerary_item
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_change_log_group_revision', 'group_id', 'revision', 'id'),
+        db.Index('ix_change_log_timestamp', 'timestamp'),
+    )
+
+class ScheduledJob(db.Model):
+    """A pending time-based job; see scheduler.py"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # handler name, e.g. close_poll
+    key = db.Column(db.String(100), nullable=False, unique=True)  # one pending job per key, e.g. poll:12
+    run_at = db.Column(db.DateTime, nullable=False)
+    payload = db.Column(db.Text)  # JSON keyword arguments for the handler
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_scheduled_job_run_at', 'run_at'),
+    )
+
+class SchedulerLease(db.Model):
+    """Held by the one worker allowed to run scheduled jobs, renewed while it is alive"""
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
 
 class GroupMember(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('uq_group_member_group_user', 'group_id', 'user_id', unique=True),
+        db.Index('ix_group_member_user', 'user_id', 'group_id'),
+    )
+
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_chat_message_group_time', 'group_id', 'timestamp'),
+    )
 
 class Recommendation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -47,7 +111,16 @@ class Recommendation(db.Model):
     title = db.Column(db.String(150), nullable=False)
     type = db.Column(db.String(50))  # e.g. hotel, restaurant, activity
     comment = db.Column(db.String(300))
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Kept current by vote_on_recommendation; score is the Wilson lower bound of the approval share
+    approve_count = db.Column(db.Integer, default=0)
+    reject_count = db.Column(db.Integer, default=0)
+    score = db.Column(db.Float, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_recommendation_group_time', 'group_id', 'timestamp'),
+        db.Index('ix_recommendation_group_score', 'group_id', 'score', 'id'),
+    )
 
 class Expense(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -56,13 +129,33 @@ class Expense(db.Model):
     amount = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(100))  # e.g., Food, Hotel, Transport
     note = db.Column(db.String(300))
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_expense_group_time', 'group_id', 'timestamp'),
+    )
+
 class GalleryImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     filename = db.Column(db.String(200), nullable=False)
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Filled in from EXIF by a background step after upload
+    taken_at = db.Column(db.DateTime)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    orientation = db.Column(db.Integer)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    metadata_status = db.Column(db.String(20))  # pending, done, failed, unavailable
+    perceptual_hash = db.Column(db.String(16))  # 64-bit dHash as hex, for near-duplicate detection
+
+    __table_args__ = (
+        db.Index('ix_gallery_image_group_time', 'group_id', 'timestamp'),
+        db.Index('ix_gallery_image_group_taken', 'group_id', 'taken_at', 'id'),
+        db.Index('ix_gallery_image_group_geo', 'group_id', 'latitude', 'longitude'),
+    )
 
 class ChecklistItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -73,6 +166,10 @@ class ChecklistItem(db.Model):
     completed = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_checklist_item_group_time', 'group_id', 'timestamp'),
+    )
+
 class BudgetItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, nullable=False)
@@ -81,6 +178,10 @@ class BudgetItem(db.Model):
     amount = db.Column(db.Float, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_budget_item_group_time', 'group_id', 'timestamp'),
+    )
+
 class LocationCheckin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, nullable=False)
@@ -88,6 +189,10 @@ class LocationCheckin(db.Model):
     message = db.Column(db.String(255))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_location_checkin_group_time', 'group_id', 'timestamp'),
+    )
+
 # Advanced models for enhanced features
 
 class LiveLocation(db.Model):
@@ -105,6 +210,12 @@ class LiveLocation(db.Model):
     battery_level = db.Column(db.Integer)
     location_name = db.Column(db.String(255))
 
+    __table_args__ = (
+        db.Index('ix_live_location_group_user_time', 'group_id', 'user_id', 'timestamp'),
+        db.Index('ix_live_location_group_active_time', 'group_id', 'is_active', 'timestamp'),
+        db.Index('ix_live_location_timestamp', 'timestamp'),
+    )
+
 class EnhancedChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False)
@@ -115,9 +226,14 @@ class EnhancedChatMessage(db.Model):
     is_edited = db.Column(db.Boolean, default=False)
     edited_at = db.Column(db.DateTime)
     read_by = db.Column(db.Text)  # JSON array of user IDs who read the message
-    timestamp = db.Column(db.DateTime, server_default=db.func.now())
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     message_metadata = db.Column(db.Text)  # JSON for additional data
 
+    __table_args__ = (
+        db.Index('ix_enhanced_chat_message_group_time', 'group_id', 'timestamp'),
+        db.Index('ix_enhanced_chat_message_group_type_time', 'group_id', 'message_type', 'timestamp'),
+    )
+
 # NEW MODELS FOR MISSING FEATURES
 
 class ItineraryItem(db.Model):
@@ -134,6 +250,23 @@ class ItineraryItem(db.Model):
     booking_reference = db.Column(db.String(100))
     confirmed = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Typed day and schedule derived from date/time (or sent directly); NULL when missing or unparseable
+    day = db.Column(db.Date)
+    start_at = db.Column(db.DateTime)
+    end_at = db.Column(db.DateTime)
+    duration_minutes = db.Column(db.Integer)
+    # Order within the day, set when the client rearranges items; equal positions go by time
+    position = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Sent by the client or geocoded from location against the offline gazetteer
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index('ix_itinerary_item_group_date', 'group_id', 'date', 'time'),
+        db.Index('ix_itinerary_item_group_confirmed_date', 'group_id', 'confirmed', 'date', 'time'),
+        db.Index('ix_itinerary_item_group_start', 'group_id', 'start_at'),
+        db.Index('ix_itinerary_item_group_day_position', 'group_id', 'day', 'position', 'time', 'id'),
+    )
 
 class Poll(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -141,12 +274,33 @@ class Poll(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     question = db.Column(db.String(300), nullable=False)
     options = db.Column(db.Text, nullable=False)  # JSON array of options
-    votes = db.Column(db.Text)  # JSON object with user_id: option_index
+    votes = db.Column(db.Text)  # Legacy JSON {user_id: option_index}; votes now live in PollVote
     is_active = db.Column(db.Boolean, default=True)
     multiple_choice = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('ix_poll_group_time', 'group_id', 'timestamp'),
+    )
+
+class PollVote(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    option_index = db.Column(db.Integer, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('uq_poll_vote_poll_user_option', 'poll_id', 'user_id', 'option_index', unique=True),
+    )
+
+class PollOptionTally(db.Model):
+    """Vote count per option, kept in step with PollVote by atomic increments"""
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), primary_key=True, autoincrement=False)
+    option_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
 class RecommendationVote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     recommendation_id = db.Column(db.Integer, db.ForeignKey('recommendation.id'), nullable=False)
@@ -155,6 +309,10 @@ class RecommendationVote(db.Model):
     comment = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_recommendation_vote_rec_user', 'recommendation_id', 'user_id'),
+    )
+
 class TripFinalization(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     trip_id = db.Column(db.Integer, db.ForeignKey('trip.id'), nullable=False)
@@ -166,6 +324,10 @@ class TripFinalization(db.Model):
     summary = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_trip_finalization_trip_time', 'trip_id', 'timestamp'),
+    )
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -176,3 +338,8 @@ class Notification(db.Model):
     read = db.Column(db.Boolean, default=False)
     action_url = db.Column(db.String(300))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_notification_user_time', 'user_id', 'timestamp'),
+        db.Index('ix_notification_group_time', 'group_id', 'timestamp'),
+    )
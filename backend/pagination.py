@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import jsonify, request
+from sqlalchemy import and_, or_
+from models import db
+
+# Every list is paged; clients follow next_cursor / X-Next-Cursor for the rest
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else {'d': v.isoformat()} if isinstance(v, date) else v
+               for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor made by encode_cursor(); raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list):
+        raise ValueError('Invalid cursor')
+    try:
+        return [datetime.fromisoformat(v['dt']) if isinstance(v, dict) and 'dt' in v
+                else date.fromisoformat(v['d']) if isinstance(v, dict) and 'd' in v else v for v in payload]
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def page_size(default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """?limit= clamped to [1, maximum]"""
+    return max(1, min(request.args.get('limit', default, type=int), maximum))
+
+
+def parse_day(value):
+    """date for a YYYY-MM-DD string (a trailing time is ignored); None if it doesn't parse"""
+    try:
+        return date.fromisoformat(str(value).strip()[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def date_range():
+    """?from= and ?to= as dates, both inclusive and either optional. Raises ValueError if one doesn't parse."""
+    bounds = []
+    for name in ('from', 'to'):
+        value = request.args.get(name)
+        day = parse_day(value)
+        if value and day is None:
+            raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+        bounds.append(day)
+    if bounds[0] and bounds[1] and bounds[0] > bounds[1]:
+        raise ValueError('from must not be after to')
+    return tuple(bounds)
+
+
+def _nulls_sort_low():
+    # SQLite (and MySQL) put NULL before every value in ascending order, PostgreSQL after
+    return db.session.get_bind().dialect.name not in ('postgresql', 'oracle')
+
+
+def _beyond(column, value, descending, nulls_low):
+    """Condition for a nullable column's values that sort strictly after value, or None if none do"""
+    ascending = not descending
+    if value is None:
+        # Past a NULL at the start come all the values; past a NULL at the end, nothing
+        return column.isnot(None) if ascending == nulls_low else None
+    step = column < value if descending else column > value
+    # NULLs at the end come after every value
+    return or_(step, column.is_(None)) if ascending != nulls_low else step
+
+
+def _after(columns, values, descending, nullable):
+    # (a, b, id) > (x, y, z) spelled out, since row-value comparisons aren't portable
+    nulls_low = _nulls_sort_low() if any(nullable) else None
+    clauses = []
+    for i, column in enumerate(columns):
+        if nullable[i]:
+            step = _beyond(column, values[i], descending, nulls_low)
+        else:
+            step = column < values[i] if descending else column > values[i]
+        if step is not None:
+            # == None renders as IS NULL
+            clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    return or_(*clauses)
+
+
+def _is_nullable(column):
+    # Model attributes expose their Column as .expression; computed expressions count as NOT NULL
+    return bool(getattr(getattr(column, 'expression', column), 'nullable', False))
+
+
+def keyset_page(query, columns, key, descending=False, limit=None):
+    """One page of query ordered by columns, continuing from ?cursor=. Returns (rows, next_cursor).
+
+    The last column must be unique (normally the id). Nullable model columns
+    sort where the database puts NULLs (first on SQLite, last on PostgreSQL),
+    so an index on the plain columns can serve the ORDER BY. key(row) returns
+    the row's values for columns. Raises ValueError for a malformed cursor.
+    """
+    limit = limit or page_size()
+    nullable = [_is_nullable(c) for c in columns]
+    if request.args.get('cursor'):
+        values = decode_cursor(request.args['cursor'])
+        if len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+        query = query.filter(_after(columns, values, descending, nullable))
+    rows = query.order_by(*[c.desc() if descending else c for c in columns]).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return rows, next_cursor
+
+
+def paged_response(payload, next_cursor):
+    """jsonify one page. Object payloads get next_cursor in the body; bare lists, kept
+    as-is for older clients, carry it in the X-Next-Cursor header (set for both)."""
+    if isinstance(payload, dict):
+        payload = dict(payload, next_cursor=next_cursor)
+    response = jsonify(payload)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Trip, Group, GroupMember, Expense, ChecklistItem, BudgetItem, Recommendation, GalleryImage, ChatMessage
+from models import db, Trip, GroupMember, Expense, ChecklistItem, BudgetItem, Recommendation, GalleryImage, ChatMessage
+from trip_groups import get_trip_group
 from datetime import datetime
 import os
 from io import BytesIO
@@ -34,7 +35,7 @@ def generate_trip_pdf(trip_id):
         return jsonify({'error': 'Trip not found or unauthorized'}), 404
     
     # Get group details
-    group = Group.query.filter_by(trip_id=trip_id).first()
+    group = get_trip_group(trip_id)
     if not group:
         return jsonify({'error': 'No group found for this trip'}), 404
     
@@ -329,7 +330,7 @@ def preview_pdf_content(trip_id):
         return jsonify({'error': 'Trip not found or unauthorized'}), 404
     
     # Get group details
-    group = Group.query.filter_by(trip_id=trip_id).first()
+    group = get_trip_group(trip_id)
     if not group:
         return jsonify({'error': 'No group found for this trip'}), 404
     
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from models import db, GalleryImage
+from upload_store import upload_path
+from image_hashing import dhash
+from scheduler import periodic
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Images read per backfill run; uploads still 'pending' after STALE_PENDING are retried too
+BACKFILL_BATCH_SIZE = 200
+STALE_PENDING = timedelta(hours=1)
+
+# EXIF tag ids
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+
+
+def _parse_exif_datetime(value, offset=None):
+    """Parse 'YYYY:MM:DD HH:MM:SS', converting to UTC when an offset is known"""
+    if not value:
+        return None
+    try:
+        taken_at = datetime.strptime(str(value).strip('\x00 ')[:19], '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+    if offset:
+        try:
+            sign = -1 if offset.startswith('-') else 1
+            hours, minutes = offset.lstrip('+-').split(':')
+            taken_at -= sign * timedelta(hours=int(hours), minutes=int(minutes))
+        except ValueError:
+            pass
+    return taken_at
+
+
+def _gps_to_degrees(value, ref):
+    """Convert an EXIF (degrees, minutes, seconds) triple to signed decimal degrees"""
+    try:
+        degrees, minutes, seconds = (float(v) for v in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    if ref in ('S', 'W'):
+        result = -result
+    return round(result, 7)
+
+
+def extract_metadata(path):
+    """Read capture time, GPS position, orientation, dimensions and perceptual hash from an image file"""
+    with Image.open(path) as image:
+        width, height = image.size
+        exif = image.getexif()
+        exif_ifd = exif.get_ifd(TAG_EXIF_IFD)
+        gps_ifd = exif.get_ifd(TAG_GPS_IFD)
+        # Hash the upright image so rotated copies of a shot still match
+        perceptual_hash = dhash(ImageOps.exif_transpose(image))
+
+    taken_at = _parse_exif_datetime(
+        exif_ifd.get(TAG_DATETIME_ORIGINAL) or exif_ifd.get(TAG_DATETIME_DIGITIZED) or exif.get(TAG_DATETIME),
+        exif_ifd.get(TAG_OFFSET_TIME_ORIGINAL)
+    )
+
+    latitude = longitude = None
+    if GPS_LATITUDE in gps_ifd and GPS_LONGITUDE in gps_ifd:
+        latitude = _gps_to_degrees(gps_ifd[GPS_LATITUDE], gps_ifd.get(GPS_LATITUDE_REF))
+        longitude = _gps_to_degrees(gps_ifd[GPS_LONGITUDE], gps_ifd.get(GPS_LONGITUDE_REF))
+        if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            latitude = longitude = None
+
+    return {
+        'taken_at': taken_at,
+        'latitude': latitude,
+        'longitude': longitude,
+        'orientation': exif.get(TAG_ORIENTATION),
+        'width': width,
+        'height': height,
+        'perceptual_hash': perceptual_hash
+    }
+
+
+def process_image_metadata(image_id):
+    """Background step: store EXIF metadata and the perceptual hash of an uploaded gallery image"""
+    image = db.session.get(GalleryImage, image_id)
+    if not image:
+        return
+
+    path = upload_path(image.filename)
+    if not PIL_AVAILABLE or path is None:
+        image.metadata_status = 'unavailable'
+        db.session.commit()
+        return
+
+    try:
+        metadata = extract_metadata(path)
+    except Exception as e:
+        print(f"❌ Could not read metadata for image {image_id}: {e}")
+        image.metadata_status = 'failed'
+        db.session.commit()
+        return
+
+    for key, value in metadata.items():
+        setattr(image, key, value)
+    image.metadata_status = 'done'
+    db.session.commit()
+
+
+@periodic('backfill_image_metadata', timedelta(minutes=15))
+def backfill_image_metadata():
+    """Read metadata and perceptual hashes for images uploaded before extraction existed,
+    or whose background step was lost (e.g. the worker restarted)"""
+    stale = datetime.utcnow() - STALE_PENDING
+    image_ids = [image_id for image_id, in db.session.query(GalleryImage.id).filter(
+        or_(GalleryImage.metadata_status.is_(None),
+            and_(GalleryImage.metadata_status == 'pending', GalleryImage.timestamp < stale))
+    ).order_by(GalleryImage.id).limit(BACKFILL_BATCH_SIZE)]
+    for image_id in image_ids:
+        process_image_metadata(image_id)
+    if image_ids:
+        print(f"✅ Read metadata for {len(image_ids)} gallery images")
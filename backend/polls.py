@@ -1,11 +1,154 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from models import db, Poll, Group, GroupMember, RecommendationVote, Recommendation, Trip
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models import (db, Poll, PollVote, PollOptionTally, GroupMember, RecommendationVote, Recommendation, Trip,
+                    Notification)
+from authz import is_group_member
+from trip_groups import get_or_create_trip_group
+from revisions import log_group_changes, not_modified_response
+from pagination import keyset_page, paged_response
+from scheduler import job, schedule, cancel
+from recommend import VOTES, apply_vote_change
 import json
 from datetime import datetime, timedelta
 
 polls_bp = Blueprint('polls_bp', __name__)
 
+def _poll_page(group_id):
+    """Newest first"""
+    return keyset_page(Poll.query.filter_by(group_id=group_id), [Poll.timestamp, Poll.id],
+                       key=lambda p: [p.timestamp, p.id], descending=True)
+
+def _poll_tallies(polls):
+    """{poll id: [vote count per option]} in one query"""
+    counts = {}
+    if polls:
+        tallies = PollOptionTally.query.filter(PollOptionTally.poll_id.in_([p.id for p in polls])).all()
+        counts = {(t.poll_id, t.option_index): t.count for t in tallies}
+    result = {}
+    for poll in polls:
+        option_count = len(json.loads(poll.options)) if poll.options else 0
+        result[poll.id] = [counts.get((poll.id, i), 0) for i in range(option_count)]
+    return result
+
+def _poll_dicts(polls):
+    tallies = _poll_tallies(polls)
+    return [{
+        'id': poll.id,
+        'question': poll.question,
+        'options': json.loads(poll.options) if poll.options else [],
+        'tallies': tallies[poll.id],
+        'is_active': poll.is_active,
+        'multiple_choice': poll.multiple_choice,
+        'timestamp': poll.timestamp.isoformat() if poll.timestamp else None,
+        'expires_at': poll.expires_at.isoformat() if poll.expires_at else None
+    } for poll in polls]
+
+def _add_poll(poll):
+    """Add a new poll with a zero tally for each option"""
+    db.session.add(poll)
+    db.session.flush()
+    option_count = len(json.loads(poll.options)) if poll.options else 0
+    db.session.add_all([PollOptionTally(poll_id=poll.id, option_index=i, count=0) for i in range(option_count)])
+
+def _adjust_tally(poll_id, option_index, delta):
+    # count = count + delta in SQL, so concurrent voters never overwrite each other
+    db.session.execute(
+        update(PollOptionTally)
+        .where(PollOptionTally.poll_id == poll_id, PollOptionTally.option_index == option_index)
+        .values(count=PollOptionTally.count + delta)
+    )
+
+def _replace_vote(poll, user_id, selected):
+    """Make the user's votes on the poll exactly the selected option indexes.
+
+    The tally moves only for a vote row this request actually deleted or
+    inserted, so a duplicate request racing this one can't count twice.
+    """
+    poll_id = poll.id
+    current = PollVote.query.filter_by(poll_id=poll_id, user_id=user_id).all()
+    removed = []
+    for vote in current:
+        if vote.option_index in selected:
+            continue
+        # A Core DELETE reports its rowcount; an ORM delete of a row that is already gone only warns.
+        # Matched on the unique (poll, user, option) rather than the id, which SQLite can hand to a new row.
+        votes = PollVote.__table__
+        deleted = db.session.execute(votes.delete().where(
+            votes.c.poll_id == poll_id, votes.c.user_id == user_id, votes.c.option_index == vote.option_index
+        )).rowcount
+        db.session.expunge(vote)
+        if deleted == 1:
+            _adjust_tally(poll_id, vote.option_index, -1)
+            removed.append(vote.id)
+    if removed:
+        # Core statements skip the flush hook, so record the deletes for ETags and /sync here
+        log_group_changes(poll.group_id, [(PollVote.__tablename__, vote_id, 'delete') for vote_id in removed])
+    for option_index in selected - {vote.option_index for vote in current}:
+        try:
+            with db.session.begin_nested():
+                db.session.add(PollVote(poll_id=poll_id, user_id=user_id, option_index=option_index))
+        except IntegrityError:
+            continue
+        _adjust_tally(poll_id, option_index, 1)
+
+def _schedule_close(poll):
+    if poll.expires_at:
+        schedule('close_poll', poll.expires_at, key=f'poll:{poll.id}', poll_id=poll.id)
+
+def finish_poll(poll):
+    """Close the poll and send every member the final tally.
+
+    Returns False if it was already closed. Claimed with a guarded UPDATE, so
+    the scheduler and a lazy close racing each other notify only once.
+    """
+    claimed = db.session.execute(
+        update(Poll).where(Poll.id == poll.id, Poll.is_active == True).values(is_active=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        return False
+    # Also through the session, so the close bumps the group revision and reaches /sync
+    poll.is_active = False
+
+    options = json.loads(poll.options) if poll.options else []
+    tallies = _poll_tallies([poll])[poll.id]
+    top = max(tallies, default=0)
+    if top:
+        winners = ' / '.join(option for option, count in zip(options, tallies) if count == top)
+        results = ', '.join(f'{option}: {count}' for option, count in zip(options, tallies))
+        message = f'Winner: {winners} ({results})'
+    else:
+        message = 'No votes were cast'
+    members = GroupMember.query.filter_by(group_id=poll.group_id).all()
+    db.session.add_all([Notification(
+        user_id=member.user_id,
+        group_id=poll.group_id,
+        type='poll',
+        title=f'Poll closed: {poll.question}'[:200],
+        message=message,
+        action_url=f'/groups/{poll.group_id}/polls'
+    ) for member in members])
+    return True
+
+def _close_expired_polls(group_id):
+    """Close polls that expired before the scheduler got to them, so a list never shows one as open"""
+    expired = Poll.query.filter(
+        Poll.group_id == group_id, Poll.is_active == True, Poll.expires_at <= datetime.utcnow()
+    ).all()
+    for poll in expired:
+        finish_poll(poll)
+        cancel(f'poll:{poll.id}')
+    if expired:
+        db.session.commit()
+
+@job('close_poll')
+def close_expired_poll(poll_id):
+    poll = db.session.get(Poll, poll_id)
+    if poll is not None:
+        finish_poll(poll)
+
 # Add trip-based poll endpoints
 @polls_bp.route('/api/trips/<int:trip_id>/polls', methods=['GET'])
 @jwt_required()
@@ -19,36 +162,22 @@ def get_trip_polls(trip_id):
         if not trip:
             return jsonify({'error': 'Trip not found or access denied'}), 403
         
-        # Get or create a group for this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
-        if not group:
-            # Create default group for trip
-            group = Group(
-                name=f"{trip.name} Group",
-                creator_id=current_user_id,
-                trip_id=trip_id
-            )
-            db.session.add(group)
-            
-            # Add user as member
-            member = GroupMember(group_id=group.id, user_id=current_user_id)
-            db.session.add(member)
-            db.session.commit()
+        group_id = get_or_create_trip_group(trip, current_user_id)
+        db.session.commit()
+        _close_expired_polls(group_id)
         
-        polls = Poll.query.filter_by(group_id=group.id).order_by(Poll.timestamp.desc()).all()
+        not_modified = not_modified_response(group_id, 'trip-polls')
+        if not_modified:
+            return not_modified
         
-        return jsonify({
-            'polls': [{
-                'id': poll.id,
-                'question': poll.question,
-                'options': json.loads(poll.options) if poll.options else [],
-                'votes': json.loads(poll.votes) if poll.votes else {},
-                'is_active': poll.is_active,
-                'multiple_choice': poll.multiple_choice,
-                'timestamp': poll.timestamp.isoformat() if poll.timestamp else None,
-                'expires_at': poll.expires_at.isoformat() if poll.expires_at else None
-            } for poll in polls]
-        })
+        try:
+            polls, next_cursor = _poll_page(group_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return paged_response({
+            'polls': _poll_dicts(polls)
+        }, next_cursor)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -65,21 +194,7 @@ def create_trip_poll(trip_id):
         if not trip:
             return jsonify({'error': 'Trip not found or access denied'}), 403
         
-        # Get or create a group for this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
-        if not group:
-            # Create default group for trip
-            group = Group(
-                name=f"{trip.name} Group",
-                creator_id=current_user_id,
-                trip_id=trip_id
-            )
-            db.session.add(group)
-            db.session.flush()  # Get the ID
-            
-            # Add user as member
-            member = GroupMember(group_id=group.id, user_id=current_user_id)
-            db.session.add(member)
+        group_id = get_or_create_trip_group(trip, current_user_id)
         
         # Set expiry date if provided
         expires_at = None
@@ -87,16 +202,16 @@ def create_trip_poll(trip_id):
             expires_at = datetime.utcnow() + timedelta(hours=int(data['expires_in_hours']))
         
         poll = Poll(
-            group_id=group.id,
+            group_id=group_id,
             user_id=current_user_id,
             question=data.get('question'),
             options=json.dumps(data.get('options', [])),
-            votes=json.dumps({}),
             multiple_choice=data.get('multiple_choice', False),
             expires_at=expires_at
         )
         
-        db.session.add(poll)
+        _add_poll(poll)
+        _schedule_close(poll)
         db.session.commit()
         
         return jsonify({
@@ -105,7 +220,7 @@ def create_trip_poll(trip_id):
                 'id': poll.id,
                 'question': poll.question,
                 'options': json.loads(poll.options),
-                'votes': {},
+                'tallies': [0] * len(json.loads(poll.options)),
                 'is_active': poll.is_active,
                 'multiple_choice': poll.multiple_choice
             }
@@ -122,28 +237,24 @@ def get_polls(group_id):
         current_user_id = get_jwt_identity()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
         
-        polls = Poll.query.filter_by(group_id=group_id).order_by(Poll.timestamp.desc()).all()
+        _close_expired_polls(group_id)
+        not_modified = not_modified_response(group_id, 'polls')
+        if not_modified:
+            return not_modified
         
-        return jsonify({
-            'polls': [{
-                'id': poll.id,
-                'question': poll.question,
-                'options': json.loads(poll.options) if poll.options else [],
-                'votes': json.loads(poll.votes) if poll.votes else {},
-                'is_active': poll.is_active,
-                'multiple_choice': poll.multiple_choice,
-                'timestamp': poll.timestamp.isoformat() if poll.timestamp else None,
-                'expires_at': poll.expires_at.isoformat() if poll.expires_at else None
-            } for poll in polls]
-        })
+        try:
+            polls, next_cursor = _poll_page(group_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return paged_response({
+            'polls': _poll_dicts(polls)
+        }, next_cursor)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -156,10 +267,7 @@ def create_poll(group_id):
         data = request.get_json()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -174,12 +282,12 @@ def create_poll(group_id):
             user_id=current_user_id,
             question=data.get('question'),
             options=json.dumps(data.get('options', [])),
-            votes=json.dumps({}),
             multiple_choice=data.get('multiple_choice', False),
             expires_at=expires_at
         )
         
-        db.session.add(poll)
+        _add_poll(poll)
+        _schedule_close(poll)
         db.session.commit()
         
         return jsonify({
@@ -188,7 +296,7 @@ def create_poll(group_id):
                 'id': poll.id,
                 'question': poll.question,
                 'options': json.loads(poll.options),
-                'votes': {},
+                'tallies': [0] * len(json.loads(poll.options)),
                 'is_active': poll.is_active,
                 'multiple_choice': poll.multiple_choice
             }
@@ -207,10 +315,7 @@ def vote_in_poll(poll_id):
         poll = Poll.query.get_or_404(poll_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=poll.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(poll.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
@@ -220,24 +325,25 @@ def vote_in_poll(poll_id):
             return jsonify({'error': 'Poll is not active'}), 400
         
         if poll.expires_at and datetime.utcnow() > poll.expires_at:
+            finish_poll(poll)
+            cancel(f'poll:{poll.id}')
+            db.session.commit()
             return jsonify({'error': 'Poll has expired'}), 400
         
-        # Get current votes
-        votes = json.loads(poll.votes) if poll.votes else {}
-        
-        # Update user's vote
+        # option_index is the user's whole selection: one index, or a list for multiple choice
         user_vote = data.get('option_index')
-        if poll.multiple_choice and isinstance(user_vote, list):
-            votes[str(current_user_id)] = user_vote
-        else:
-            votes[str(current_user_id)] = user_vote
+        selected = user_vote if poll.multiple_choice and isinstance(user_vote, list) else [user_vote]
+        option_count = len(json.loads(poll.options)) if poll.options else 0
+        if not all(isinstance(i, int) and not isinstance(i, bool) and 0 <= i < option_count for i in selected):
+            return jsonify({'error': 'Invalid option_index'}), 400
         
-        poll.votes = json.dumps(votes)
+        _replace_vote(poll, int(current_user_id), set(selected))
         db.session.commit()
         
         return jsonify({
             'message': 'Vote recorded successfully',
-            'votes': votes
+            'tallies': _poll_tallies([poll])[poll.id],
+            'my_vote': sorted(set(selected))
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -252,10 +358,11 @@ def close_poll(poll_id):
         poll = Poll.query.get_or_404(poll_id)
         
         # Check if user is the creator or group admin
-        if poll.user_id != current_user_id:
+        if poll.user_id != int(current_user_id):
             return jsonify({'error': 'Only poll creator can close poll'}), 403
         
-        poll.is_active = False
+        finish_poll(poll)
+        cancel(f'poll:{poll.id}')
         db.session.commit()
         
         return jsonify({'message': 'Poll closed successfully'})
@@ -270,23 +377,25 @@ def vote_on_recommendation(recommendation_id):
         current_user_id = get_jwt_identity()
         data = request.get_json()
         
-        recommendation = Recommendation.query.get_or_404(recommendation_id)
+        # Locked until commit, so concurrent votes update the counters one at a time
+        recommendation = Recommendation.query.filter_by(id=recommendation_id).with_for_update().first_or_404()
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=recommendation.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(recommendation.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
         
+        if data.get('vote') not in VOTES:
+            return jsonify({'error': f"vote must be one of {', '.join(VOTES)}"}), 400
+        
         # Check if user already voted
         existing_vote = RecommendationVote.query.filter_by(
             recommendation_id=recommendation_id,
             user_id=current_user_id
         ).first()
         
+        apply_vote_change(recommendation, existing_vote.vote if existing_vote else None, data.get('vote'))
         if existing_vote:
             # Update existing vote
             existing_vote.vote = data.get('vote')
@@ -303,7 +412,12 @@ def vote_on_recommendation(recommendation_id):
         
         db.session.commit()
         
-        return jsonify({'message': 'Vote recorded successfully'})
+        return jsonify({
+            'message': 'Vote recorded successfully',
+            'approve_count': recommendation.approve_count,
+            'reject_count': recommendation.reject_count,
+            'score': recommendation.score
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -317,10 +431,7 @@ def get_recommendation_votes(recommendation_id):
         recommendation = Recommendation.query.get_or_404(recommendation_id)
         
         # Check if user is member of group
-        membership = GroupMember.query.filter_by(
-            group_id=recommendation.group_id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(recommendation.group_id, current_user_id)
         
         if not membership:
             return jsonify({'error': 'Access denied'}), 403
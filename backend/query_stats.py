@@ -0,0 +1,154 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('tripbox.queries')
+
+# A statement shape seen this many times in one request is reported as a likely N+1
+REPEATED_SHAPE_THRESHOLD = 5
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_NAMED_PLACEHOLDER = re.compile(r'%\(\w+\)s|:\w+\b')
+
+_local = threading.local()
+
+
+def statement_shape(statement):
+    """Statement with literals and parameters collapsed, so per-row lookups compare equal"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _STRING_LITERAL.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _NAMED_PLACEHOLDER.sub('?', shape)
+    return _PLACEHOLDER_LIST.sub('(?)', shape)
+
+
+class QueryStats:
+    """Queries issued while this collector was active on the current thread"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.statements = []
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+        self.statements.append(statement)
+
+    @property
+    def milliseconds(self):
+        return round(self.seconds * 1000, 2)
+
+    def repeated(self, threshold=REPEATED_SHAPE_THRESHOLD):
+        """[(shape, count)] for shapes issued at least threshold times, most frequent first"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def _collectors():
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    return _local.collectors
+
+
+@contextmanager
+def collect_queries():
+    """Collect the queries issued on this thread inside the block"""
+    stats = QueryStats()
+    _collectors().append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors().remove(stats)
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Fail with the offending statements if the block issues more than limit queries.
+
+        with assert_max_queries(5):
+            client.get('/api/trips/overview', headers=auth)
+
+    The Flask test client dispatches on the calling thread, so queries made by
+    the request are counted.
+    """
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        listing = '\n'.join(f'  {i + 1}. {s}' for i, s in enumerate(stats.statements))
+        raise AssertionError(f'{stats.count} queries issued, budget was {limit}:\n{listing}')
+
+
+# The start time lives on the statement's execution context, which is discarded with it, so a
+# statement that raises (and never reaches after_cursor_execute) leaves nothing on the connection
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'query_start', None)
+    collectors = _collectors()
+    if collectors and started is not None:
+        elapsed = time.perf_counter() - started
+        for stats in collectors:
+            stats.record(statement, elapsed)
+
+
+def init_query_stats(app):
+    """Count queries per request; log them, and add X-Query-* headers in debug mode"""
+    logger.setLevel(app.config.get('QUERY_LOG_LEVEL', 'WARNING'))
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+
+    @app.before_request
+    def _start_request_stats():
+        g.query_stats = QueryStats()
+        _collectors().append(g.query_stats)
+
+    @app.after_request
+    def _report_request_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        _collectors().remove(stats)
+
+        repeated = stats.repeated()
+        if app.debug or app.config.get('QUERY_STATS_HEADERS'):
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = str(stats.milliseconds)
+            response.headers['X-Query-Repeated'] = str(len(repeated))
+        if stats.count:
+            logger.log(logging.WARNING if repeated else logging.INFO, json.dumps({
+                'event': 'request_queries',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'queries': stats.count,
+                'db_ms': stats.milliseconds,
+                'repeated': [{'statement': shape, 'count': n} for shape, n in repeated],
+            }))
+        return response
+
+    @app.teardown_request
+    def _discard_request_stats(exc):
+        # after_request does not run when the view raised
+        stats = g.pop('query_stats', None)
+        if stats is not None and stats in _collectors():
+            _collectors().remove(stats)
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Group, GroupMember, ChatMessage, User, EnhancedChatMessage
+from authz import is_group_member
 from datetime import datetime
 import json
 
@@ -13,7 +14,7 @@ def send_enhanced_message(group_id):
     data = request.get_json()
     
     # Check if user is a member of the group
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
@@ -80,7 +81,7 @@ def get_enhanced_messages(group_id):
     user_id = int(get_jwt_identity())
     
     # Check membership
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
@@ -137,7 +138,7 @@ def mark_message_read(group_id, message_id):
     user_id = int(get_jwt_identity())
     
     # Check membership
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
@@ -217,7 +218,7 @@ def update_typing_status(group_id):
     data = request.get_json()
     
     # Check membership
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
@@ -244,7 +245,7 @@ def get_online_members(group_id):
     user_id = int(get_jwt_identity())
     
     # Check membership
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
@@ -273,7 +274,7 @@ def search_messages(group_id):
     user_id = int(get_jwt_identity())
     
     # Check membership
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
@@ -326,7 +327,7 @@ def get_chat_events(group_id):
     user_id = int(get_jwt_identity())
     
     # Check membership
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
     
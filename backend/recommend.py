@@ -1,9 +1,50 @@
+import math
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Recommendation, GroupMember, Trip, Group
+from models import db, Recommendation, Trip
+from authz import is_group_member
+from trip_groups import get_trip_group_id, get_or_create_trip_group
+from revisions import not_modified_response
+from pagination import keyset_page, paged_response
 
 recommend_bp = Blueprint('recommend_bp', __name__)
 
+VOTES = ('approve', 'reject', 'neutral')
+# 95% confidence
+WILSON_Z = 1.96
+
+def wilson_lower_bound(approve, reject):
+    """Lower bound of the Wilson interval for the approval share, so 9 of 10 outranks 1 of 1"""
+    total = approve + reject
+    if total == 0:
+        return 0.0
+    p = approve / total
+    z2 = WILSON_Z * WILSON_Z
+    margin = WILSON_Z * math.sqrt((p * (1 - p) + z2 / (4 * total)) / total)
+    return (p + z2 / (2 * total) - margin) / (1 + z2 / total)
+
+def apply_vote_change(rec, old_vote, new_vote):
+    """Move rec's counters and score from a user's old vote (None if new) to their new one.
+    The caller must hold rec's row lock."""
+    for vote, delta in ((old_vote, -1), (new_vote, 1)):
+        if vote == 'approve':
+            rec.approve_count = (rec.approve_count or 0) + delta
+        elif vote == 'reject':
+            rec.reject_count = (rec.reject_count or 0) + delta
+    rec.score = wilson_lower_bound(rec.approve_count or 0, rec.reject_count or 0)
+
+def _recommendation_page(group_id):
+    """Newest first, or best first with ?sort=score"""
+    query = Recommendation.query.filter_by(group_id=group_id)
+    sort = request.args.get('sort')
+    if sort == 'score':
+        return keyset_page(query, [Recommendation.score, Recommendation.id], key=lambda r: [r.score, r.id],
+                           descending=True)
+    if sort:
+        raise ValueError('sort must be score')
+    return keyset_page(query, [Recommendation.timestamp, Recommendation.id], key=lambda r: [r.timestamp, r.id],
+                       descending=True)
+
 # Trip-based recommendation endpoints
 @recommend_bp.route('/api/trips/<int:trip_id>/recommendations', methods=['GET'])
 @jwt_required()
@@ -16,22 +57,31 @@ def get_trip_recommendations(trip_id):
     if not trip:
         return jsonify({'error': 'Trip not found or access denied'}), 403
 
-    # Get or create a group for this trip
-    group = Group.query.filter_by(trip_id=trip_id).first()
-    if not group:
+    group_id = get_trip_group_id(trip_id)
+    if group_id is None:
         return jsonify({'recommendations': []})  # No recommendations yet
 
-    recs = Recommendation.query.filter_by(group_id=group.id).order_by(Recommendation.timestamp.desc()).all()
+    not_modified = not_modified_response(group_id, 'trip-recommendations')
+    if not_modified:
+        return not_modified
+
+    try:
+        recs, next_cursor = _recommendation_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     result = [{
         'id': r.id,
         'title': r.title,
         'type': r.type,
         'comment': r.comment,
         'user_id': r.user_id,
-        'timestamp': r.timestamp.isoformat()
+        'timestamp': r.timestamp.isoformat(),
+        'approve_count': r.approve_count or 0,
+        'reject_count': r.reject_count or 0,
+        'score': r.score or 0.0
     } for r in recs]
 
-    return jsonify({'recommendations': result})
+    return paged_response({'recommendations': result}, next_cursor)
 
 @recommend_bp.route('/api/trips/<int:trip_id>/recommendations', methods=['POST'])
 @jwt_required()
@@ -45,24 +95,10 @@ def add_trip_recommendation(trip_id):
     if not trip:
         return jsonify({'error': 'Trip not found or access denied'}), 403
 
-    # Get or create a group for this trip
-    group = Group.query.filter_by(trip_id=trip_id).first()
-    if not group:
-        # Create default group for trip
-        group = Group(
-            name=f"{trip.name} Group",
-            creator_id=user_id,
-            trip_id=trip_id
-        )
-        db.session.add(group)
-        db.session.flush()  # Get the ID
-        
-        # Add user as member
-        member = GroupMember(group_id=group.id, user_id=user_id)
-        db.session.add(member)
+    group_id = get_or_create_trip_group(trip, user_id)
 
     rec = Recommendation(
-        group_id=group.id,
+        group_id=group_id,
         user_id=user_id,
         title=data.get('title'),
         type=data.get('type'),
@@ -91,7 +127,7 @@ def add_recommendation(group_id):
     data = request.get_json()
 
     # Check if user is a group member
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
@@ -114,17 +150,27 @@ def get_recommendations(group_id):
     user_id = int(get_jwt_identity())
 
     # Check if user is a group member
-    membership = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
+    membership = is_group_member(group_id, user_id)
     if not membership:
         return jsonify({'error': 'You are not a member of this group'}), 403
 
-    recs = Recommendation.query.filter_by(group_id=group_id).order_by(Recommendation.timestamp.desc()).all()
+    not_modified = not_modified_response(group_id, 'recommendations')
+    if not_modified:
+        return not_modified
+
+    try:
+        recs, next_cursor = _recommendation_page(group_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     result = [{
         'title': r.title,
         'type': r.type,
         'comment': r.comment,
         'user_id': r.user_id,
-        'timestamp': r.timestamp.isoformat()
+        'timestamp': r.timestamp.isoformat(),
+        'approve_count': r.approve_count or 0,
+        'reject_count': r.reject_count or 0,
+        'score': r.score or 0.0
     } for r in recs]
 
-    return jsonify(result)
+    return paged_response(result, next_cursor)
@@ -0,0 +1,172 @@
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import Response, g, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import (db, Group, GroupMember, GroupRevision, Trip, ChangeLog, ChatMessage, Recommendation,
+                    RecommendationVote, Expense, GalleryImage, ChecklistItem, BudgetItem, LocationCheckin,
+                    EnhancedChatMessage, ItineraryItem, Poll, PollVote, TripFinalization)
+
+# Writes to these models (and to votes, through VOTE_PARENTS) bump their
+# group's revision and go into the change log read by /sync, as do updates to
+# a Group itself or to the Trip it belongs to. LiveLocation
+# (written every few seconds per member) and Notification (per user) are left
+# out so they don't invalidate every cached list in the group.
+GROUP_SCOPED_MODELS = (
+    GroupMember, ChatMessage, Recommendation, Expense, GalleryImage, ChecklistItem, BudgetItem, LocationCheckin,
+    EnhancedChatMessage, ItineraryItem, Poll, TripFinalization,
+)
+
+# Votes belong to their group through the row they vote on
+VOTE_PARENTS = {
+    RecommendationVote: (Recommendation, 'recommendation_id'),
+    PollVote: (Poll, 'poll_id'),
+}
+
+
+def current_revision(group_id):
+    """The group's revision; 0 until its first write. One primary-key lookup, never cached,
+    so a write in any worker is visible to the next request in every other worker."""
+    return db.session.query(GroupRevision.revision).filter_by(group_id=group_id).scalar() or 0
+
+
+def bump_group_revision(group_id, connection=None):
+    """Add one to the group's revision and return the new value. Session writes do this
+    automatically; call it after bulk query.update()/delete() or Core statements, which
+    skip session events. The row stays locked until commit, so writers to one group queue
+    up and revisions become visible in order."""
+    connection = connection if connection is not None else db.session.connection()
+    table = GroupRevision.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (postgresql if dialect == 'postgresql' else sqlite).insert
+        stmt = insert(table).values(group_id=group_id, revision=1, updated_at=now, compacted_through=0)
+        stmt = stmt.on_conflict_do_update(index_elements=['group_id'], set_={
+            'revision': table.c.revision + 1, 'updated_at': now,
+        })
+        connection.execute(stmt)
+    else:
+        result = connection.execute(
+            update(table).where(table.c.group_id == group_id).values(revision=table.c.revision + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(group_id=group_id, revision=1, updated_at=now, compacted_through=0))
+    return connection.execute(select(table.c.revision).where(table.c.group_id == group_id)).scalar()
+
+
+def log_group_changes(group_id, changes, connection=None):
+    """Bump the group's revision once and add [(entity, entity_id, op)] to its change log.
+    Session flushes do this automatically; Core writes that /sync should see call it."""
+    connection = connection if connection is not None else db.session.connection()
+    revision = bump_group_revision(group_id, connection)
+    now = datetime.utcnow()
+    connection.execute(ChangeLog.__table__.insert(), [
+        {'group_id': group_id, 'revision': revision, 'entity': entity, 'entity_id': entity_id, 'op': op,
+         'timestamp': now}
+        for entity, entity_id, op in changes
+    ])
+    return revision
+
+
+def _group_changes(session, connection):
+    """[(group_id, entity, entity_id, op)] for everything in the flush that belongs to a group"""
+    changes = []
+    vote_groups = {}
+    touched = [(obj, 'insert') for obj in session.new] + [(obj, 'delete') for obj in session.deleted]
+    touched += [(obj, 'update') for obj in session.dirty if session.is_modified(obj)]
+    for obj, op in touched:
+        if isinstance(obj, GROUP_SCOPED_MODELS):
+            group_id = obj.group_id
+        elif isinstance(obj, Group) and op == 'update':
+            group_id = obj.id
+        elif isinstance(obj, Trip) and op == 'update':
+            # The trip's name and dates show up in its group's responses (e.g. the calendar export)
+            for group_id in connection.execute(select(Group.id).where(Group.trip_id == obj.id)).scalars():
+                changes.append((group_id, obj.__tablename__, obj.id, op))
+            continue
+        elif isinstance(obj, tuple(VOTE_PARENTS)):
+            parent, foreign_key = VOTE_PARENTS[type(obj)]
+            key = (parent, getattr(obj, foreign_key))
+            if key not in vote_groups:
+                vote_groups[key] = connection.execute(select(parent.group_id).where(parent.id == key[1])).scalar()
+            group_id = vote_groups[key]
+        else:
+            continue
+        if group_id is not None:
+            changes.append((group_id, obj.__tablename__, obj.id, op))
+    return changes
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_group_changes(session, flush_context):
+    # new/dirty/deleted still describe what was just flushed, and both the
+    # bump and the change log commit or roll back with the writes themselves
+    connection = session.connection()
+    deleted_groups = {obj.id for obj in session.deleted if isinstance(obj, Group)}
+    by_group = defaultdict(list)
+    for group_id, entity, entity_id, op in _group_changes(session, connection):
+        if group_id not in deleted_groups:
+            by_group[group_id].append((entity, entity_id, op))
+    # Sorted, so two transactions touching the same groups lock them in the same order
+    for group_id in sorted(by_group):
+        log_group_changes(group_id, by_group[group_id], connection)
+
+
+def not_modified_response(group_id, resource, last_modified=False, user_id=None):
+    """Tag this response with the group's current revision and the caller. Returns a 304
+    response if the client already holds it, else None and the view builds the payload.
+    Call after the access check and before loading any rows.
+
+    user_id defaults to the JWT identity, so a view that hasn't verified a token raises
+    instead of answering 304; views authorised some other way (e.g. a signed feed URL)
+    pass the user they serve. Two members never share a tag, so nothing one of them
+    sees can be revalidated by the other.
+
+    With last_modified the response also carries the time of the group's last
+    write (once that second is over), and If-Modified-Since is honoured from
+    clients that send no If-None-Match (some calendar apps only revalidate that way)."""
+    updated_at = None
+    if last_modified:
+        state = db.session.query(GroupRevision.revision, GroupRevision.updated_at).filter_by(group_id=group_id).first()
+        revision, updated_at = (state[0], state[1]) if state else (0, None)
+    else:
+        revision = current_revision(group_id)
+    if user_id is None:
+        user_id = get_jwt_identity()
+    etag = f'{group_id}:{revision}:{resource}:{user_id}'
+    if request.query_string:
+        # Each page, filter and limit is its own representation
+        etag += ':' + hashlib.sha1(request.query_string).hexdigest()[:12]
+    g.group_etag = etag
+    # HTTP dates have whole seconds, so a second write in the same second would carry the
+    # same Last-Modified as the first. Only advertise it once that second has passed; until
+    # then clients revalidate with the ETag.
+    if updated_at is not None and updated_at.replace(microsecond=0) < datetime.utcnow().replace(microsecond=0):
+        g.group_last_modified = updated_at.replace(microsecond=0)
+    if 'If-None-Match' in request.headers:
+        return Response(status=304) if request.if_none_match.contains_weak(etag) else None
+    since = request.if_modified_since
+    # Compared at full precision: unchanged only if the last write falls within the second the client holds
+    if updated_at is not None and since is not None and updated_at < since.replace(tzinfo=None) + timedelta(seconds=1):
+        return Response(status=304)
+    return None
+
+
+def init_revisions(app):
+    """Send ETag and Cache-Control on responses tagged by not_modified_response"""
+
+    @app.after_request
+    def _add_group_etag(response):
+        etag = g.pop('group_etag', None)
+        last_modified = g.pop('group_last_modified', None)
+        if etag is not None and response.status_code in (200, 304):
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Browsers keep the copy but revalidate it on every request
+            response.headers['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,122 @@
+"""Short visiting orders for a handful of stops: nearest neighbour, then 2-opt.
+
+Routes are open paths (no return to the start) over great-circle distances.
+With numpy the distance matrix and each 2-opt scan are vectorized; without
+it the same steps run in plain Python, which is still quick for a day's
+20-50 stops.
+"""
+import math
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+EARTH_RADIUS_KM = 6371.0
+# Ignore 2-opt gains below a metre, so rounding noise can't loop forever
+MIN_GAIN_KM = 1e-3
+
+
+def distance_matrix(points):
+    """Haversine distances in km between every pair of (latitude, longitude) points"""
+    if NUMPY_AVAILABLE:
+        coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+        lat, lng = coords[:, 0], coords[:, 1]
+        a = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2 +
+             np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lng[:, None] - lng[None, :]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    radians = [(math.radians(lat), math.radians(lng)) for lat, lng in points]
+    matrix = []
+    for lat1, lng1 in radians:
+        row = []
+        for lat2, lng2 in radians:
+            a = (math.sin((lat2 - lat1) / 2) ** 2 +
+                 math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+            row.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a))))
+        matrix.append(row)
+    return matrix
+
+
+def path_length(order, matrix):
+    return float(sum(matrix[a][b] for a, b in zip(order, order[1:])))
+
+
+def nearest_neighbor(matrix, start=0):
+    """Visit the closest unvisited stop each time, beginning at start"""
+    n = len(matrix)
+    order = [start]
+    if NUMPY_AVAILABLE:
+        visited = np.zeros(n, dtype=bool)
+        visited[start] = True
+        for _ in range(n - 1):
+            row = np.where(visited, np.inf, matrix[order[-1]])
+            nearest = int(np.argmin(row))
+            visited[nearest] = True
+            order.append(nearest)
+        return order
+
+    unvisited = set(range(n)) - {start}
+    while unvisited:
+        last = order[-1]
+        nearest = min(unvisited, key=lambda stop: (matrix[last][stop], stop))
+        unvisited.remove(nearest)
+        order.append(nearest)
+    return order
+
+
+def _best_reversal(order, matrix, i):
+    """(gain, j) of the best reversal of order[i..j] for j > i, or (0, None).
+
+    Reversing the segment swaps the edges a-b and c-d for a-c and b-d, where a
+    precedes order[i] = b and d follows order[j] = c; a missing a or d (the ends of
+    an open path) costs nothing."""
+    n = len(order)
+    a = order[i - 1] if i > 0 else None
+    b = order[i]
+    if NUMPY_AVAILABLE:
+        path = np.asarray(order)
+        c = path[i + 1:]
+        delta = np.zeros(len(c))
+        if a is not None:
+            delta += matrix[a, c] - matrix[a, b]
+        d = path[i + 2:]
+        delta[:-1] += matrix[b, d] - matrix[c[:-1], d]
+        j = int(np.argmin(delta))
+        return (-float(delta[j]), i + 1 + j) if delta[j] < -MIN_GAIN_KM else (0.0, None)
+
+    best_gain, best_j = 0.0, None
+    for j in range(i + 1, n):
+        c = order[j]
+        delta = (matrix[a][c] - matrix[a][b]) if a is not None else 0.0
+        if j + 1 < n:
+            d = order[j + 1]
+            delta += matrix[b][d] - matrix[c][d]
+        if -delta > max(best_gain, MIN_GAIN_KM):
+            best_gain, best_j = -delta, j
+    return best_gain, best_j
+
+
+def two_opt(order, matrix, fixed_start=True):
+    """Reverse segments of the path while that shortens it. With fixed_start the
+    first stop stays first."""
+    order = list(order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1 if fixed_start else 0, len(order) - 1):
+            gain, j = _best_reversal(order, matrix, i)
+            if j is not None:
+                order[i:j + 1] = order[i:j + 1][::-1]
+                improved = True
+    return order
+
+
+def plan_route(matrix, start=None):
+    """Stop indexes in a short visiting order over a distance_matrix(). start, if given,
+    is the stop to begin from; otherwise the path may begin anywhere."""
+    if len(matrix) < 2:
+        return list(range(len(matrix)))
+    order = nearest_neighbor(matrix, start if start is not None else 0)
+    return two_opt(order, matrix, fixed_start=start is not None)
@@ -0,0 +1,288 @@
+"""Time-based jobs: poll expiry, retention pruning and anything else registered here.
+
+Jobs live in the scheduled_job table, so they survive restarts and any worker
+can add one. With SCHEDULER_ENABLED every worker starts a scheduler thread, but
+only the one holding the DB lease runs jobs. The others keep retrying the
+lease and take over within LEASE_SECONDS if the holder dies. The holder keeps
+the upcoming deadlines in a min-heap and sleeps until the earliest one. It
+reloads from the table every REFRESH_SECONDS, or straight away when this
+process commits a new job.
+
+A job can run twice if the lease moves while it runs, so handlers must be
+idempotent.
+
+    python scheduler.py run      run the scheduler in the foreground (e.g. as its own process)
+    python scheduler.py once     run every job that is due now, then exit
+    python scheduler.py list     show pending jobs
+"""
+import heapq
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import event, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import db, ScheduledJob, SchedulerLease
+
+LEASE_NAME = 'scheduler'
+LEASE_SECONDS = 60
+REFRESH_SECONDS = 30
+# Delay before each retry of a failing job; after the last one it is dropped
+RETRY_DELAYS = (timedelta(minutes=1), timedelta(minutes=5), timedelta(minutes=30))
+
+_handlers = {}
+_intervals = {}
+_wakeup = threading.Event()
+_thread = {'pid': None}
+_thread_lock = threading.Lock()
+
+
+def job(kind):
+    """Register fn(**payload) as the handler for jobs of this kind. It runs in an
+    app context, and its session work commits together with the job's removal."""
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def periodic(kind, interval):
+    """Register fn() to run every interval (a timedelta), first one interval after it is set up"""
+    def decorator(fn):
+        _handlers[kind] = fn
+        _intervals[kind] = interval
+        return fn
+    return decorator
+
+
+def schedule(kind, run_at, key=None, **payload):
+    """Add the job for key (default: kind), or move it to run_at, in the current session.
+    It takes effect when the caller commits."""
+    key = key or kind
+    scheduled = ScheduledJob.query.filter_by(key=key).first()
+    if scheduled is None:
+        scheduled = ScheduledJob(key=key)
+        db.session.add(scheduled)
+    scheduled.kind = kind
+    scheduled.run_at = run_at
+    scheduled.payload = json.dumps(payload)
+    scheduled.attempts = 0
+    scheduled.last_error = None
+    db.session.info['scheduler_wakeup'] = True
+    return scheduled
+
+
+def cancel(key):
+    """Drop the pending job for key, if any, in the current session"""
+    ScheduledJob.query.filter_by(key=key).delete(synchronize_session=False)
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_scheduler(session):
+    # Only this process's scheduler hears it; others pick the job up on their next refresh
+    if session.info.pop('scheduler_wakeup', False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_wakeup(session):
+    session.info.pop('scheduler_wakeup', None)
+
+
+def _ensure_periodic_jobs():
+    now = datetime.utcnow()
+    for kind, interval in _intervals.items():
+        if ScheduledJob.query.filter_by(key=kind).first() is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(ScheduledJob(kind=kind, key=kind, run_at=now + interval, payload='{}'))
+            except IntegrityError:
+                pass  # another worker added it first
+    db.session.commit()
+
+
+def run_job(job_id):
+    """Run one job if it is still due. Returns True if it ran successfully."""
+    scheduled = db.session.get(ScheduledJob, job_id)
+    now = datetime.utcnow()
+    if scheduled is None or scheduled.run_at > now:
+        # Cancelled, already run, or moved since the heap was loaded
+        db.session.rollback()
+        return False
+    kind, run_at, attempts = scheduled.kind, scheduled.run_at, scheduled.attempts or 0
+    try:
+        handler = _handlers.get(kind)
+        if handler is None:
+            raise LookupError(f'no handler registered for {kind}')
+        handler(**json.loads(scheduled.payload or '{}'))
+        if kind in _intervals:
+            scheduled.run_at = now + _intervals[kind]
+            scheduled.attempts = 0
+            scheduled.last_error = None
+        else:
+            # Guarded on run_at, so a job rescheduled while this one ran is kept
+            ScheduledJob.query.filter_by(id=job_id, run_at=run_at).delete(synchronize_session=False)
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Scheduled job {kind} ({job_id}) failed: {e}")
+        _record_failure(job_id, kind, attempts, e)
+        return False
+
+
+def _record_failure(job_id, kind, attempts, error):
+    scheduled = db.session.get(ScheduledJob, job_id)
+    if scheduled is None:
+        return
+    if attempts < len(RETRY_DELAYS):
+        scheduled.run_at = datetime.utcnow() + RETRY_DELAYS[attempts]
+        scheduled.attempts = attempts + 1
+        scheduled.last_error = str(error)[:1000]
+    elif kind in _intervals:
+        scheduled.run_at = datetime.utcnow() + _intervals[kind]
+        scheduled.attempts = 0
+        scheduled.last_error = str(error)[:1000]
+    else:
+        print(f"❌ Giving up on scheduled job {scheduled.key} after {attempts + 1} attempts")
+        db.session.delete(scheduled)
+    db.session.commit()
+
+
+def run_due_jobs():
+    """Run every job that is due now, earliest first. Returns the number that ran."""
+    due = ScheduledJob.query.filter(ScheduledJob.run_at <= datetime.utcnow()).order_by(ScheduledJob.run_at).all()
+    job_ids = [scheduled.id for scheduled in due]
+    db.session.rollback()
+    return sum(run_job(job_id) for job_id in job_ids)
+
+
+class Scheduler:
+    def __init__(self, app):
+        self.app = app
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self.heap = []
+        self.lease_due = 0.0
+        self.refresh_due = 0.0
+
+    def acquire_lease(self):
+        """Take or renew the lease. Returns True while this scheduler holds it."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=LEASE_SECONDS)
+        taken = db.session.execute(
+            update(SchedulerLease).where(
+                SchedulerLease.name == LEASE_NAME,
+                or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now),
+            ).values(owner=self.owner, expires_at=expires_at)
+        ).rowcount
+        if not taken:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(SchedulerLease(name=LEASE_NAME, owner=self.owner, expires_at=expires_at))
+                taken = 1
+            except IntegrityError:
+                pass  # held by a live scheduler
+        db.session.commit()
+        return bool(taken)
+
+    def release_lease(self):
+        db.session.execute(
+            update(SchedulerLease).where(SchedulerLease.name == LEASE_NAME, SchedulerLease.owner == self.owner)
+            .values(expires_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+    def reload(self):
+        """Heap of (run_at, job id) for every job due before the next refresh"""
+        horizon = datetime.utcnow() + timedelta(seconds=REFRESH_SECONDS)
+        upcoming = db.session.query(ScheduledJob.run_at, ScheduledJob.id).filter(
+            ScheduledJob.run_at <= horizon
+        ).order_by(ScheduledJob.run_at).all()
+        db.session.rollback()
+        self.heap = [tuple(row) for row in upcoming]
+        heapq.heapify(self.heap)
+        self.refresh_due = time.monotonic() + REFRESH_SECONDS
+
+    def tick(self, woken=False):
+        """Renew the lease, run what is due and return how many seconds to sleep"""
+        if time.monotonic() >= self.lease_due:
+            was_leader = self.is_leader
+            self.is_leader = self.acquire_lease()
+            self.lease_due = time.monotonic() + LEASE_SECONDS / 3
+            if not self.is_leader:
+                self.heap = []
+                return LEASE_SECONDS / 3
+            if not was_leader:
+                print(f"✅ Scheduler lease taken by {self.owner}")
+                _ensure_periodic_jobs()
+                woken = True
+        if woken or time.monotonic() >= self.refresh_due:
+            self.reload()
+        while self.heap and self.heap[0][0] <= datetime.utcnow():
+            _, job_id = heapq.heappop(self.heap)
+            run_job(job_id)
+            if time.monotonic() >= self.lease_due:
+                return 0  # renew before running anything else
+        wait = min(self.lease_due, self.refresh_due) - time.monotonic()
+        if self.heap:
+            wait = min(wait, (self.heap[0][0] - datetime.utcnow()).total_seconds())
+        return max(0.0, wait)
+
+    def run_forever(self):
+        while True:
+            woken = _wakeup.is_set()
+            _wakeup.clear()
+            try:
+                with self.app.app_context():
+                    wait = self.tick(woken)
+            except Exception as e:
+                print(f"❌ Scheduler error: {e}")
+                wait = REFRESH_SECONDS
+            _wakeup.wait(wait)
+
+
+def _ensure_scheduler_thread(app):
+    # Started lazily, so each gunicorn worker (including after a preload fork) gets its own
+    if _thread['pid'] == os.getpid():
+        return
+    with _thread_lock:
+        if _thread['pid'] == os.getpid():
+            return
+        _thread['pid'] = os.getpid()
+    threading.Thread(target=Scheduler(app).run_forever, daemon=True, name='tripbox-scheduler').start()
+
+
+def init_scheduler(app):
+    """Start a scheduler thread in each worker on its first request when SCHEDULER_ENABLED is set"""
+
+    @app.before_request
+    def _start_scheduler():
+        if app.config.get('SCHEDULER_ENABLED'):
+            _ensure_scheduler_thread(app)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    with app.app_context():
+        if command == 'once':
+            print(f"✅ Ran {run_due_jobs()} scheduled jobs")
+        elif command == 'list':
+            for scheduled in ScheduledJob.query.order_by(ScheduledJob.run_at).all():
+                error = f"  (attempt {scheduled.attempts}: {scheduled.last_error})" if scheduled.attempts else ''
+                print(f"{scheduled.run_at.isoformat()}  {scheduled.key}{error}")
+        elif command == 'run':
+            scheduler = Scheduler(app)
+            try:
+                scheduler.run_forever()
+            except KeyboardInterrupt:
+                scheduler.release_lease()
+        else:
+            print(__doc__)
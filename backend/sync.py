@@ -0,0 +1,153 @@
+"""Delta sync for offline-first clients.
+
+    GET /api/groups/<id>/sync              -> {"reset": true, "token": "42"}
+    GET /api/groups/<id>/sync?since=42     -> rows inserted, updated and deleted since 42
+
+A reset means the token is missing, unknown or older than the compacted part
+of the change log: reload the full lists, then sync from the returned token.
+
+    python sync.py compact     drop change log entries older than CHANGELOG_RETENTION_DAYS
+
+With SCHEDULER_ENABLED the scheduler also compacts once a day.
+"""
+import json
+import sys
+from datetime import date, datetime, timedelta
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, update
+from models import db, ChangeLog, Group, GroupRevision, Trip
+from authz import is_group_member
+from revisions import GROUP_SCOPED_MODELS, VOTE_PARENTS
+from scheduler import periodic
+
+sync_bp = Blueprint('sync_bp', __name__)
+
+SYNC_PAGE_SIZE = 1000
+DEFAULT_RETENTION_DAYS = 30
+SYNC_MODELS = {model.__tablename__: model for model in GROUP_SCOPED_MODELS + tuple(VOTE_PARENTS) + (Group, Trip)}
+JSON_COLUMNS = {'options', 'votes', 'read_by', 'message_metadata', 'final_itinerary', 'final_recommendations'}
+
+
+def _row_dict(obj):
+    row = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif column.key in JSON_COLUMNS and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        row[column.key] = value
+    return row
+
+
+def _sync_response(token, reset=False, has_more=False, inserts=None, updates=None, deletes=None):
+    return jsonify({
+        'token': str(token),
+        'reset': reset,
+        'has_more': has_more,
+        'inserts': inserts or {},
+        'updates': updates or {},
+        'deletes': deletes or {},
+    })
+
+
+def _page(group_id, since, revision):
+    """Change log entries after since, cut at a revision boundary so a token never splits one flush"""
+    entries = ChangeLog.query.filter(
+        ChangeLog.group_id == group_id, ChangeLog.revision > since, ChangeLog.revision <= revision
+    ).order_by(ChangeLog.revision, ChangeLog.id).limit(SYNC_PAGE_SIZE + 1).all()
+    if len(entries) <= SYNC_PAGE_SIZE:
+        return entries, revision, False
+    cut = entries[SYNC_PAGE_SIZE].revision
+    entries = [e for e in entries if e.revision < cut]
+    if not entries:
+        # A single flush bigger than a page goes out whole
+        entries = ChangeLog.query.filter_by(group_id=group_id, revision=cut).order_by(ChangeLog.id).all()
+    return entries, entries[-1].revision, entries[-1].revision < revision
+
+
+@sync_bp.route('/api/groups/<int:group_id>/sync', methods=['GET'])
+@jwt_required()
+def sync_group(group_id):
+    user_id = int(get_jwt_identity())
+    if not is_group_member(group_id, user_id):
+        return jsonify({'error': 'You are not a member of this group'}), 403
+
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        return jsonify({'error': 'since must be a token returned by this endpoint'}), 400
+
+    state = db.session.get(GroupRevision, group_id)
+    revision = state.revision if state else 0
+    compacted_through = (state.compacted_through or 0) if state else 0
+    if since is None or int(since) < compacted_through or int(since) > revision:
+        return _sync_response(revision, reset=True)
+
+    entries, token, has_more = _page(group_id, int(since), revision)
+
+    # Collapse to the last operation per row; a row inserted in this window stays an insert
+    last_op, inserted = {}, set()
+    for entry in entries:
+        key = (entry.entity, entry.entity_id)
+        last_op[key] = entry.op
+        if entry.op == 'insert':
+            inserted.add(key)
+
+    deletes, wanted = {}, {}
+    for (entity, entity_id), op in last_op.items():
+        if op == 'delete':
+            deletes.setdefault(entity, []).append(entity_id)
+        else:
+            wanted.setdefault(entity, []).append(entity_id)
+
+    inserts, updates = {}, {}
+    for entity, ids in wanted.items():
+        model = SYNC_MODELS.get(entity)
+        if model is None:
+            continue
+        # Rows deleted since the log was read are missing here; their delete arrives with the next token
+        for obj in model.query.filter(model.id.in_(ids)).order_by(model.id).all():
+            target = inserts if (entity, obj.id) in inserted else updates
+            target.setdefault(entity, []).append(_row_dict(obj))
+
+    return _sync_response(token, has_more=has_more, inserts=inserts, updates=updates, deletes=deletes)
+
+
+@periodic('compact_changelog', timedelta(days=1))
+def compact_changelog(retention_days=None):
+    """Delete change log entries older than the retention window. Returns the number deleted.
+
+    Whole revisions are removed at once and the group's compacted_through moves
+    past them, so clients holding an older token are told to reset."""
+    if retention_days is None:
+        retention_days = current_app.config.get('CHANGELOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    expired = db.session.query(ChangeLog.group_id, func.max(ChangeLog.revision)).filter(
+        ChangeLog.timestamp < cutoff
+    ).group_by(ChangeLog.group_id).all()
+    deleted = 0
+    for group_id, through in expired:
+        db.session.execute(
+            update(GroupRevision).where(
+                GroupRevision.group_id == group_id, func.coalesce(GroupRevision.compacted_through, 0) < through
+            ).values(compacted_through=through)
+        )
+        deleted += ChangeLog.query.filter(
+            ChangeLog.group_id == group_id, ChangeLog.revision <= through
+        ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        if len(sys.argv) > 1 and sys.argv[1] == 'compact':
+            print(f"✅ Compacted {compact_changelog()} change log entries")
+        else:
+            print(__doc__)
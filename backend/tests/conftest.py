@@ -0,0 +1,72 @@
+"""Shared fixtures. The app is imported once, against a throwaway SQLite database
+in a temporary directory, and tests run from that directory so uploads land
+there too. instance/tripbox.db and uploads/ are never touched.
+
+    cd backend
+    python -m pytest -q
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='tripbox-tests-')
+
+# app.py reads these and creates the schema at import time
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORK_DIR, 'tripbox.db')
+os.environ['SCHEDULER_ENABLED'] = '0'
+os.environ.pop('METRICS_DIR', None)
+sys.path.insert(0, BACKEND_DIR)
+
+from app import app as flask_app  # noqa: E402
+
+_emails = itertools.count()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def work_dir():
+    previous = os.getcwd()
+    os.chdir(WORK_DIR)
+    yield WORK_DIR
+    os.chdir(previous)
+
+
+@pytest.fixture(scope='session')
+def app():
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """register() -> Authorization headers for a new user"""
+
+    def _register(name='Tester'):
+        email = f'user-{next(_emails)}@example.com'
+        client.post('/api/register', json={'email': email, 'password': 'pw', 'name': name})
+        token = client.post('/api/login', json={'email': email, 'password': 'pw'}).get_json()['token']
+        return {'Authorization': f'Bearer {token}'}
+
+    return _register
+
+
+@pytest.fixture
+def auth(register):
+    return register()
+
+
+@pytest.fixture
+def create_trip(client):
+    def _create_trip(headers, name='Trip', start_date='2026-07-01', end_date='2026-07-05'):
+        response = client.post('/api/trips', json={'name': name, 'start_date': start_date, 'end_date': end_date},
+                               headers=headers)
+        return response.get_json()['trip']['id']
+
+    return _create_trip
@@ -0,0 +1,95 @@
+from flask_jwt_extended import decode_token
+
+import ai_recommendations
+from models import db, Group, ItineraryItem, Recommendation
+from sync import compact_changelog
+from trip_groups import get_trip_group_id
+
+
+def _group(app, client, create_trip, auth):
+    """(group id, creator id) for a fresh trip group"""
+    trip_id = create_trip(auth)
+    client.post(f'/api/trips/{trip_id}/expenses', json={'amount': 1}, headers=auth)
+    with app.app_context():
+        group_id = get_trip_group_id(trip_id)
+        return group_id, db.session.get(Group, group_id).creator_id
+
+
+def _recommend(app, group_id, user_id, title, kind, comment=None, approve=0):
+    with app.app_context():
+        rec = Recommendation(group_id=group_id, user_id=user_id, title=title, type=kind, comment=comment,
+                             approve_count=approve)
+        db.session.add(rec)
+        db.session.commit()
+        return rec.id
+
+
+def _suggest(client, auth, group_id, path='', **body):
+    response = client.post(f'/api/groups/{group_id}/ai-recommendations{path}', json=body, headers=auth)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_open_recommendations_rank_by_what_the_group_agreed_on(app, client, create_trip, auth, register):
+    group_id, user_id = _group(app, client, create_trip, auth)
+    with app.app_context():
+        # /personalized leaves out the caller's own recommendations
+        other_id = int(decode_token(register()['Authorization'].split()[1])['sub'])
+    _recommend(app, group_id, user_id, 'Ramen noodle bar', 'restaurant', 'Spicy miso ramen', approve=2)
+    with app.app_context():
+        db.session.add(ItineraryItem(group_id=group_id, user_id=user_id, type='restaurant', title='Sushi dinner',
+                                     location='Tsukiji market', confirmed=True))
+        db.session.commit()
+    noodles = _recommend(app, group_id, other_id, 'Udon noodle shop', 'restaurant', 'Thick noodles in broth')
+    sushi = _recommend(app, group_id, other_id, 'Market sushi counter', 'restaurant', 'Fresh sushi by the market')
+    hike = _recommend(app, group_id, other_id, 'Mountain hiking trail', 'activity', 'Views over the valley')
+
+    suggested = _suggest(client, auth, group_id)
+    ranked = [r['id'] for r in suggested['recommendations']]
+
+    assert suggested['based_on'] == 2
+    assert sorted(ranked[:2]) == sorted([noodles, sushi]) and ranked[-1] == hike
+    assert suggested['recommendations'][-1]['similarity'] == 0
+    assert 'sushi' in next(r for r in suggested['recommendations'] if r['id'] == sushi)['matched_terms']
+    assert [r['id'] for r in _suggest(client, auth, group_id, types=['tourist_attraction'])['recommendations']] == [hike]
+    # With no votes of their own, the caller's stated preferences steer /personalized
+    personal = _suggest(client, auth, group_id, '/personalized', preferences=['hiking', 'valley views'])
+    assert personal['based_on'] == 0 and [r['id'] for r in personal['recommendations']][0] == hike
+
+
+def test_the_index_replays_only_changed_rows(app, client, create_trip, auth, monkeypatch):
+    group_id, user_id = _group(app, client, create_trip, auth)
+    kept = _recommend(app, group_id, user_id, 'Old town walking tour', 'activity')
+    edited = _recommend(app, group_id, user_id, 'Harbour cruise', 'activity')
+    deleted = _recommend(app, group_id, user_id, 'Night market', 'activity')
+    loads = []
+    original_load = ai_recommendations._load
+
+    def recording_load(index, group_id, ids=None):
+        loads.append(ids)
+        return original_load(index, group_id, ids)
+
+    monkeypatch.setattr(ai_recommendations, '_load', recording_load)
+    with app.app_context():
+        index = ai_recommendations.group_index(group_id)
+        assert loads == [None]
+        assert ('recommendation', deleted) in index.docs
+
+        db.session.get(Recommendation, edited).comment = 'Sunset sailing around the islands'
+        db.session.delete(db.session.get(Recommendation, deleted))
+        db.session.commit()
+        added = _recommend(app, group_id, user_id, 'Island ferry', 'activity', 'Ferry to the islands')
+        assert ai_recommendations.group_index(group_id) is index
+
+    assert loads[1] == {'recommendation': {edited, deleted, added}, 'itinerary_item': set()}
+    assert set(index.docs) == {('recommendation', kept), ('recommendation', edited), ('recommendation', added)}
+    assert 'sunset' in index.docs[('recommendation', edited)]
+    assert [r['id'] for r in _suggest(client, auth, group_id)['recommendations']] == sorted(
+        [kept, edited, added], reverse=True)
+
+    # Once the log is compacted past the cached revision, the group is rebuilt from scratch
+    _recommend(app, group_id, user_id, 'Castle ruins', 'activity')
+    with app.app_context():
+        compact_changelog(retention_days=-1)
+        ai_recommendations.group_index(group_id)
+    assert loads[-1] is None and len(index.docs) == 4
@@ -0,0 +1,43 @@
+import query_stats
+from metrics import local_snapshot
+
+
+def _snapshot(app):
+    with app.app_context():
+        return local_snapshot()
+
+
+def _batch_requests(snapshot):
+    return sum(count for blueprint, endpoint, method, status, count in snapshot['requests']
+               if endpoint == 'batch_bp.batch')
+
+
+def test_batch_leaves_no_request_state_behind(app, client, create_trip, auth):
+    """Sub-requests must not pop the batch's own query collector or in-flight count"""
+    trip_id = create_trip(auth)
+    before = _batch_requests(_snapshot(app))
+
+    for parallel in (False, True, False):
+        response = client.post('/api/batch', json={'parallel': parallel, 'requests': [
+            {'path': f'/api/trips/{trip_id}/itinerary'},
+            {'method': 'POST', 'path': f'/api/trips/{trip_id}/polls', 'body': {'question': 'Q', 'options': ['a', 'b']}},
+            {'path': f'/api/trips/{trip_id}/polls'},
+        ]}, headers=auth)
+        assert response.status_code == 200
+        assert [r['status'] for r in response.get_json()['responses']] == [200, 200, 200]
+
+    assert query_stats._collectors() == []
+    snapshot = _snapshot(app)
+    assert snapshot['in_flight'] == 0
+    assert _batch_requests(snapshot) == before + 3
+
+
+def test_batched_writes_are_visible_to_later_sub_requests(client, create_trip, auth):
+    trip_id = create_trip(auth)
+    response = client.post('/api/batch', json={'requests': [
+        {'method': 'POST', 'path': f'/api/trips/{trip_id}/itinerary', 'body': {'title': 'Tour', 'type': 'activity'}},
+        {'path': f'/api/trips/{trip_id}/itinerary'},
+    ]}, headers=auth)
+    created, listing = response.get_json()['responses']
+    assert created['status'] == 200
+    assert [item['title'] for item in listing['body']['itinerary']] == ['Tour']
@@ -0,0 +1,81 @@
+import os
+import random
+
+from PIL import Image
+
+import image_hashing
+from image_hashing import BKTree, find_duplicate_clusters, get_group_index, hamming
+from models import db, GalleryImage, Group, User
+from photo_metadata import backfill_image_metadata
+
+
+def _group(app):
+    with app.app_context():
+        user = User(email=f'hash-{random.random()}@example.com', password='x', name='Hasher')
+        db.session.add(user)
+        db.session.flush()
+        group = Group(name='Photos', creator_id=user.id)
+        db.session.add(group)
+        db.session.commit()
+        return user.id, group.id
+
+
+def _add_images(app, user_id, group_id, hashes):
+    with app.app_context():
+        images = [GalleryImage(group_id=group_id, user_id=user_id, filename=f'{h}.jpg', perceptual_hash=h,
+                               metadata_status='done') for h in hashes]
+        db.session.add_all(images)
+        db.session.commit()
+        return [image.id for image in images]
+
+
+def test_bk_tree_search_matches_a_linear_scan():
+    rng = random.Random(3)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    tree = BKTree()
+    for i, value in enumerate(values):
+        tree.add(value, i)
+    copy = tree.copy()
+    copy.add(values[0], 'extra')
+    for _ in range(50):
+        probe = rng.getrandbits(64)
+        expected = sorted(i for i, value in enumerate(values) if hamming(probe, value) <= 20)
+        assert sorted(i for i, _ in tree.search(probe, 20)) == expected
+    assert 'extra' not in [i for i, _ in tree.search(values[0], 0)]
+
+
+def test_refreshing_leaves_an_index_in_use_untouched(app):
+    user_id, group_id = _group(app)
+    first = _add_images(app, user_id, group_id, ['00000000000000ff', '00000000000000fe'])
+    with app.app_context():
+        before = get_group_index(group_id)
+    snapshot = dict(before.hashes)
+
+    later = _add_images(app, user_id, group_id, ['00000000000000fc', 'ffffffffffffffff'])
+    with app.app_context():
+        after = get_group_index(group_id)
+        clusters = find_duplicate_clusters(group_id, 2)
+
+    assert before.hashes == snapshot
+    assert sorted(i for i, _ in before.tree.search(0xff, 64)) == first
+    assert set(after.hashes) == set(first + later)
+    assert image_hashing._indexes[group_id] is after
+    assert clusters == [sorted(first + later[:1])]
+
+
+def test_backfill_hashes_images_uploaded_before_extraction(app, work_dir):
+    user_id, group_id = _group(app)
+    os.makedirs('uploads', exist_ok=True)
+    Image.new('RGB', (32, 32), (200, 30, 30)).save(os.path.join('uploads', 'legacy.png'))
+    with app.app_context():
+        image = GalleryImage(group_id=group_id, user_id=user_id, filename='legacy.png')
+        db.session.add(image)
+        db.session.commit()
+        image_id = image.id
+
+        backfill_image_metadata()
+
+        image = db.session.get(GalleryImage, image_id)
+        assert image.metadata_status == 'done'
+        assert image.perceptual_hash is not None
+        assert image_id in get_group_index(group_id).hashes
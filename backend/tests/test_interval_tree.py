@@ -0,0 +1,44 @@
+import random
+
+from interval_tree import IntervalTree, overlapping_pairs
+
+
+def _random_intervals(rng, count):
+    starts = (rng.randint(0, 1000) for _ in range(count))
+    return sorted((start, start + rng.randint(1, 30), i) for i, start in enumerate(starts))
+
+
+def test_overlapping_matches_a_linear_scan():
+    rng = random.Random(7)
+    intervals = _random_intervals(rng, 400)
+    tree = IntervalTree(intervals)
+    starts = {value: s for s, _, value in intervals}
+    for _ in range(300):
+        start = rng.randint(-20, 1040)
+        end = start + rng.randint(1, 60)
+        found = tree.overlapping(start, end)
+        assert sorted(found) == sorted(value for s, e, value in intervals if s < end and e > start)
+        # In start order; ties may come in any order
+        assert [starts[value] for value in found] == sorted(starts[value] for value in found)
+
+
+def test_intervals_are_half_open():
+    tree = IntervalTree([(10, 20, 'a'), (20, 30, 'b')])
+    assert tree.overlapping(20, 25) == ['b']
+    assert tree.overlapping(5, 10) == []
+    assert tree.overlapping(19, 21) == ['a', 'b']
+
+
+def test_empty_tree():
+    assert IntervalTree([]).overlapping(0, 100) == []
+    assert overlapping_pairs([]) == []
+
+
+def test_overlapping_pairs_matches_every_pair_check():
+    rng = random.Random(11)
+    intervals = _random_intervals(rng, 150)
+    expected = {
+        (a[2], b[2], max(a[0], b[0]), min(a[1], b[1]))
+        for i, a in enumerate(intervals) for b in intervals[i + 1:] if a[0] < b[1] and b[0] < a[1]
+    }
+    assert set(overlapping_pairs(intervals)) == expected
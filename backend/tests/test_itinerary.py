@@ -0,0 +1,116 @@
+import pytest
+
+
+@pytest.fixture
+def trip_items(client, create_trip, auth):
+    """(trip id, [item ids]) for three activities on one day, two hours apart"""
+    trip_id = create_trip(auth)
+    ids = [client.post(f'/api/trips/{trip_id}/itinerary', json={
+        'title': f'Stop {i}', 'type': 'activity', 'date': '2026-07-02', 'time': f'{9 + 2 * i:02d}:00'
+    }, headers=auth).get_json()['item']['id'] for i in range(3)]
+    return trip_id, ids
+
+
+def _list(client, auth, trip_id):
+    return client.get(f'/api/trips/{trip_id}/itinerary', headers=auth).get_json()
+
+
+def test_bulk_applies_every_change_as_one_revision(client, auth, trip_items):
+    trip_id, ids = trip_items
+    revision = _list(client, auth, trip_id)['revision']
+
+    response = client.post(f'/api/trips/{trip_id}/itinerary/bulk', json={
+        'revision': revision,
+        'items': [{'id': ids[2], 'position': 0}, {'id': ids[1], 'position': 1, 'title': 'Renamed'}],
+        'delete': [ids[0]],
+    }, headers=auth)
+
+    assert response.status_code == 200
+    assert response.get_json()['revision'] == revision + 1
+    titles = [item['title'] for item in _list(client, auth, trip_id)['itinerary']]
+    assert titles == ['Stop 2', 'Renamed']
+
+
+def test_bulk_with_a_stale_revision_is_refused(client, auth, trip_items):
+    trip_id, ids = trip_items
+    revision = _list(client, auth, trip_id)['revision']
+    client.put(f'/api/itinerary/{ids[0]}', json={'title': 'Changed elsewhere'}, headers=auth)
+
+    response = client.post(f'/api/trips/{trip_id}/itinerary/bulk', json={
+        'revision': revision, 'items': [{'id': ids[1], 'title': 'Mine'}]
+    }, headers=auth)
+
+    assert response.status_code == 409
+    assert response.get_json()['revision'] > revision
+    titles = [item['title'] for item in _list(client, auth, trip_id)['itinerary']]
+    assert 'Mine' not in titles
+
+
+def test_bulk_overlap_with_reject_rolls_back(client, auth, trip_items):
+    trip_id, ids = trip_items
+
+    response = client.post(f'/api/trips/{trip_id}/itinerary/bulk', json={
+        'on_conflict': 'reject', 'items': [{'id': ids[1], 'time': '09:30'}, {'id': ids[2], 'title': 'Kept?'}]
+    }, headers=auth)
+
+    assert response.status_code == 409
+    assert response.get_json()['conflicts'][0]['id'] == ids[1]
+    items = _list(client, auth, trip_id)['itinerary']
+    assert [(item['title'], item['time']) for item in items] == [
+        ('Stop 0', '09:00'), ('Stop 1', '11:00'), ('Stop 2', '13:00')
+    ]
+
+
+def test_bulk_cannot_touch_another_groups_items(client, create_trip, register, auth, trip_items):
+    trip_id, _ = trip_items
+    other = register()
+    other_trip = create_trip(other)
+    other_item = client.post(f'/api/trips/{other_trip}/itinerary', json={'title': 'Theirs', 'type': 'activity'},
+                             headers=other).get_json()['item']['id']
+
+    response = client.post(f'/api/trips/{trip_id}/itinerary/bulk', json={'delete': [other_item]}, headers=auth)
+
+    assert response.status_code == 404
+    assert response.get_json()['missing'] == [other_item]
+
+
+def test_start_at_with_utc_offset_is_refused(client, create_trip, auth):
+    trip_id = create_trip(auth)
+    response = client.post(f'/api/trips/{trip_id}/itinerary', json={
+        'title': 'Tour', 'type': 'activity', 'start_at': '2026-07-02T10:00:00+02:00'
+    }, headers=auth)
+    assert response.status_code == 400
+    assert 'UTC offset' in response.get_json()['error']
+
+
+def test_paging_walks_every_item_once_across_missing_days_and_times(client, create_trip, auth):
+    trip_id = create_trip(auth)
+    for i, (date, time) in enumerate([('2026-07-02', '10:00'), ('2026-07-02', None), (None, None), ('2026-07-01', '09:00'),
+                                      ('2026-07-02', '08:00'), (None, '12:00'), ('2026-07-01', None)]):
+        client.post(f'/api/trips/{trip_id}/itinerary', json={
+            'title': f'Item {i}', 'type': 'activity', 'date': date, 'time': time
+        }, headers=auth)
+    everything = _list(client, auth, trip_id)['itinerary']
+
+    paged, cursor = [], None
+    while True:
+        query = f'?limit=2&cursor={cursor}' if cursor else '?limit=2'
+        page = client.get(f'/api/trips/{trip_id}/itinerary{query}', headers=auth).get_json()
+        paged.extend(page['itinerary'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert len(everything) == 7
+    assert [item['id'] for item in paged] == [item['id'] for item in everything]
+
+
+def test_every_endpoint_returns_the_same_item_fields(client, auth, trip_items):
+    trip_id, ids = trip_items
+    listed = _list(client, auth, trip_id)['itinerary'][0]
+    created = client.post(f'/api/trips/{trip_id}/itinerary', json={'title': 'Extra', 'type': 'activity'},
+                          headers=auth).get_json()['item']
+    updated = client.put(f'/api/itinerary/{ids[0]}', json={'title': 'Changed'}, headers=auth).get_json()['item']
+
+    assert set(created) == set(updated) == set(listed) - {'timestamp'}
+    assert {'start_at', 'day', 'position', 'latitude'} <= set(created)
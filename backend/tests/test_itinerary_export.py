@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import revisions
+from itinerary_export import MAX_LINE_OCTETS, _escape, _fold
+
+
+def _unfold(text):
+    return text.replace('\r\n ', '')
+
+
+def test_short_lines_are_left_alone():
+    assert _fold('SUMMARY:Dinner') == 'SUMMARY:Dinner\r\n'
+
+
+def test_long_lines_fold_at_75_octets():
+    line = 'DESCRIPTION:' + 'x' * 200
+    folded = _fold(line)
+    physical = folded.split('\r\n')[:-1]
+    assert all(len(part.encode('utf-8')) <= MAX_LINE_OCTETS for part in physical)
+    assert all(part.startswith(' ') for part in physical[1:])
+    assert _unfold(folded) == line + '\r\n'
+
+
+def test_folding_never_splits_a_multibyte_character():
+    line = 'DESCRIPTION:' + 'é€😀' * 40
+    folded = _fold(line)
+    for part in folded.split('\r\n')[:-1]:
+        assert len(part.encode('utf-8')) <= MAX_LINE_OCTETS
+        part.encode('utf-8').decode('utf-8')
+    assert _unfold(folded) == line + '\r\n'
+
+
+def test_text_values_are_escaped():
+    assert _escape('a,b;c\\d\ne') == 'a\\,b\\;c\\\\d\\ne'
+
+
+def test_calendar_export(client, create_trip, auth):
+    trip_id = create_trip(auth, name='Lisbon, spring')
+    client.post(f'/api/trips/{trip_id}/itinerary', json={
+        'title': 'Flight', 'type': 'flight', 'date': '2026-07-01', 'time': '08:00'
+    }, headers=auth)
+    client.post(f'/api/trips/{trip_id}/itinerary', json={
+        'title': 'Walk', 'type': 'activity', 'date': '2026-07-02', 'description': 'é' * 100
+    }, headers=auth)
+    client.post(f'/api/trips/{trip_id}/itinerary', json={'title': 'Someday', 'type': 'activity'}, headers=auth)
+
+    response = client.get(f'/api/trips/{trip_id}/itinerary/export.ics', headers=auth)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/calendar'
+    body = response.get_data(as_text=True)
+    assert body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n')
+    assert '\n' not in body.replace('\r\n', '')
+    assert all(len(line.encode('utf-8')) <= MAX_LINE_OCTETS for line in body.split('\r\n'))
+    unfolded = _unfold(body)
+    assert 'X-WR-CALNAME:Lisbon\\, spring' in unfolded
+    assert 'DTSTART:20260701T080000' in unfolded
+    assert 'DTSTART;VALUE=DATE:20260702' in unfolded
+    assert 'Someday' not in unfolded
+
+    cached = client.get(f'/api/trips/{trip_id}/itinerary/export.ics',
+                        headers={**auth, 'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+
+
+class _Clock(datetime):
+    """datetime whose utcnow() the test sets, for revisions' write and response times"""
+    current = None
+
+    @classmethod
+    def utcnow(cls):
+        return cls.current
+
+
+def test_if_modified_since_sees_a_write_in_the_same_second(client, create_trip, auth, monkeypatch):
+    monkeypatch.setattr(revisions, 'datetime', _Clock)
+    second = datetime(2030, 1, 1, 12, 0, 0)
+    trip_id = create_trip(auth)
+    url = f'/api/trips/{trip_id}/itinerary/export.ics'
+
+    _Clock.current = second + timedelta(milliseconds=200)
+    item_id = client.post(f'/api/trips/{trip_id}/itinerary', json={
+        'title': 'Flight', 'type': 'flight', 'date': '2026-07-01', 'time': '08:00'
+    }, headers=auth).get_json()['item']['id']
+
+    # Fetched in the second of the last write: a later write could still share it, so no Last-Modified
+    _Clock.current = second + timedelta(milliseconds=500)
+    assert client.get(url, headers=auth).last_modified is None
+
+    _Clock.current = second + timedelta(milliseconds=700)
+    client.put(f'/api/itinerary/{item_id}', json={'title': 'Flight home'}, headers=auth)
+
+    _Clock.current = second + timedelta(seconds=3)
+    settled = client.get(url, headers=auth)
+    since = settled.headers['Last-Modified']
+    assert settled.last_modified.replace(tzinfo=None) == second
+    assert client.get(url, headers={**auth, 'If-Modified-Since': since}).status_code == 304
+
+    _Clock.current = second + timedelta(seconds=3, milliseconds=400)
+    client.put(f'/api/itinerary/{item_id}', json={'title': 'Flight back'}, headers=auth)
+    fresh = client.get(url, headers={**auth, 'If-Modified-Since': since})
+    assert fresh.status_code == 200
+    assert 'Flight back' in fresh.get_data(as_text=True)
+    assert fresh.last_modified is None
+
+
+def test_renaming_the_trip_changes_the_calendar_etag(client, create_trip, auth):
+    trip_id = create_trip(auth, name='Spring')
+    client.post(f'/api/trips/{trip_id}/itinerary', json={'title': 'Walk', 'type': 'activity', 'date': '2026-07-02'},
+                headers=auth)
+    url = f'/api/trips/{trip_id}/itinerary/export.ics'
+    etag = client.get(url, headers=auth).headers['ETag']
+
+    client.put(f'/api/trips/{trip_id}', json={'name': 'Summer'}, headers=auth)
+    response = client.get(url, headers={**auth, 'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert 'X-WR-CALNAME:Summer' in response.get_data(as_text=True)
@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import threading
+
+import metrics
+from metrics import LATENCY_BUCKETS, local_snapshot, render_metrics
+
+HELLO = ('app', 'hello', 'GET', 200)
+SAMPLE = re.compile(r'^([a-z_]+)(\{[^}]*\})? (\S+)$')
+
+
+def _hello_count(snapshot):
+    return sum(count for *key, count in snapshot['requests'] if tuple(key) == HELLO)
+
+
+def _local_snapshot(app):
+    with app.app_context():
+        return local_snapshot()
+
+
+def _samples(text):
+    """{(metric name, labels): value} for every sample line; fails on anything that isn't a sample or comment"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('# '):
+            assert line.split()[1] in ('HELP', 'TYPE'), line
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        samples[(match[1], match[2] or '')] = float(match[3])
+    return samples
+
+
+def test_scrape_is_prometheus_text(client):
+    for _ in range(3):
+        client.get('/api/hello')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain' and 'version=0.0.4' in response.content_type
+    text = response.get_data(as_text=True)
+    assert text.endswith('\n')
+    samples = _samples(text)
+    labels = '{blueprint="app",endpoint="hello",method="GET"'
+    assert samples[('tripbox_http_requests_total', labels + ',status="200"}')] >= 3
+    buckets = [samples[('tripbox_http_request_duration_seconds_bucket', f'{labels},le="{bound}"}}')]
+               for bound in list(LATENCY_BUCKETS) + ['+Inf']]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == samples[('tripbox_http_request_duration_seconds_count', labels + '}')]
+    # The scrape itself is in flight while it renders
+    assert samples[('tripbox_http_requests_in_flight', '')] >= 1
+
+
+def test_thread_shards_and_worker_snapshots_are_merged(app, tmp_path, monkeypatch):
+    before = _hello_count(_local_snapshot(app))
+
+    def hit():
+        thread_client = app.test_client()
+        for _ in range(5):
+            thread_client.get('/api/hello')
+
+    threads = [threading.Thread(target=hit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _hello_count(_local_snapshot(app)) == before + 20
+
+    # Another live worker and one that has exited
+    series = [0] * (len(LATENCY_BUCKETS) + 2)
+    series[0], series[-1] = 7, 0.01
+    for pid, in_flight in ((os.getppid(), 2), (2 ** 22 + 1, 9)):
+        (tmp_path / f'worker-{pid}.json').write_text(json.dumps({
+            'pid': pid, 'requests': [list(HELLO) + [7]], 'latency': [list(HELLO[:3]) + [series]],
+            'in_flight': in_flight, 'pool': {},
+        }))
+    monkeypatch.setitem(app.config, 'METRICS_DIR', str(tmp_path))
+    with app.test_request_context('/metrics'):
+        snapshots = metrics._all_snapshots()
+    samples = _samples(render_metrics(snapshots))
+
+    labels = '{blueprint="app",endpoint="hello",method="GET"'
+    local = snapshots[0]
+    assert samples[('tripbox_http_requests_total', labels + ',status="200"}')] == _hello_count(local) + 14
+    # Counters from the exited worker count; its in-flight requests and the worker itself do not
+    assert samples[('tripbox_http_requests_in_flight', '')] == local['in_flight'] + 2
+    assert samples[('tripbox_workers', '')] == 2
+
+
+def test_scrapes_need_the_token_when_one_is_set(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 's3cret')
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200 and 'tripbox_http_requests_total' in response.get_data(as_text=True)
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+import migrate
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from models import db, Expense
+from trip_groups import get_trip_group_id
+
+
+def _expenses(client, auth, trip_id, query=''):
+    return client.get(f'/api/trips/{trip_id}/expenses{query}', headers=auth)
+
+
+def _walk(client, auth, trip_id, limit):
+    ids, cursor = [], None
+    while True:
+        query = f'?limit={limit}&cursor={cursor}' if cursor else f'?limit={limit}'
+        page = _expenses(client, auth, trip_id, query).get_json()
+        ids.extend(e['id'] for e in page['expenses'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def _group_id(app, trip_id):
+    with app.app_context():
+        return get_trip_group_id(trip_id)
+
+
+def test_every_list_is_bounded_and_the_cursor_walks_the_rest(app, client, create_trip, auth):
+    trip_id = create_trip(auth)
+    client.post(f'/api/trips/{trip_id}/expenses', json={'amount': 1}, headers=auth)
+    group_id = _group_id(app, trip_id)
+    start = datetime(2026, 7, 1)
+    with app.app_context():
+        db.session.execute(Expense.__table__.insert(), [
+            {'group_id': group_id, 'user_id': 1, 'amount': 2, 'timestamp': start + timedelta(seconds=i)}
+            for i in range(600)
+        ])
+        db.session.commit()
+
+    unasked = _expenses(client, auth, trip_id)
+    oversized = _expenses(client, auth, trip_id, f'?limit={MAX_PAGE_SIZE * 10}').get_json()
+
+    assert len(unasked.get_json()['expenses']) == DEFAULT_PAGE_SIZE
+    assert unasked.headers['X-Next-Cursor'] == unasked.get_json()['next_cursor']
+    assert len(oversized['expenses']) == MAX_PAGE_SIZE and oversized['next_cursor']
+    walked = _walk(client, auth, trip_id, limit=DEFAULT_PAGE_SIZE)
+    assert len(walked) == len(set(walked)) == 601
+
+
+def test_second_precision_timestamps_page_in_order_after_the_migration(app, client, create_trip, auth):
+    trip_id = create_trip(auth)
+    client.post(f'/api/trips/{trip_id}/expenses', json={'amount': 1}, headers=auth)
+    group_id = _group_id(app, trip_id)
+    with app.app_context():
+        # As the old CURRENT_TIMESTAMP default stored them, next to values written from Python
+        for value in ('2026-07-01 10:00:00', '2026-07-01 10:00:00.500000', '2026-07-01 09:59:59.900000',
+                      '2026-07-01T09:00:00'):
+            db.session.execute(text(
+                'INSERT INTO expense (group_id, user_id, amount, timestamp) VALUES (:g, 1, 3, :t)'
+            ), {'g': group_id, 't': value})
+        db.session.commit()
+        migration = next(module for version, name, module in migrate.discover_migrations()
+                         if name == 'sqlite_timestamp_format')
+        with db.engine.begin() as conn:
+            migration.upgrade(conn)
+        expected = [e.id for e in Expense.query.filter_by(group_id=group_id).all()]
+        expected.sort(key=lambda i: (db.session.get(Expense, i).timestamp, i), reverse=True)
+
+    assert _walk(client, auth, trip_id, limit=1) == expected
+    assert [e['id'] for e in _expenses(client, auth, trip_id).get_json()['expenses']] == expected
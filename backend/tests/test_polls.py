@@ -0,0 +1,92 @@
+import pytest
+from flask_jwt_extended import decode_token
+from sqlalchemy import event, text
+
+from models import db, GroupMember
+
+
+@pytest.fixture
+def poll(client, create_trip, auth):
+    """(trip id, poll id) for a three-option poll"""
+
+    def _poll(multiple_choice=False):
+        trip_id = create_trip(auth)
+        response = client.post(f'/api/trips/{trip_id}/polls', json={
+            'question': 'Where to?', 'options': ['Lisbon', 'Porto', 'Faro'], 'multiple_choice': multiple_choice
+        }, headers=auth)
+        return trip_id, response.get_json()['poll']['id']
+
+    return _poll
+
+
+def _vote(client, auth, poll_id, option_index):
+    response = client.post(f'/api/polls/{poll_id}/vote', json={'option_index': option_index}, headers=auth)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['tallies']
+
+
+def test_changing_a_vote_moves_it_between_options(client, auth, poll):
+    _, poll_id = poll()
+    assert _vote(client, auth, poll_id, 0) == [1, 0, 0]
+    assert _vote(client, auth, poll_id, 2) == [0, 0, 1]
+    # Repeating the same vote changes nothing
+    assert _vote(client, auth, poll_id, 2) == [0, 0, 1]
+
+
+def test_tallies_count_each_member_once(app, client, create_trip, auth, register):
+    trip_id = create_trip(auth)
+    poll_id = client.post(f'/api/trips/{trip_id}/polls', json={'question': 'When?', 'options': ['am', 'pm']},
+                          headers=auth).get_json()['poll']['id']
+    group_id = client.get('/api/trips/overview', headers=auth).get_json()['trips'][0]['group_id']
+    other = register()
+    with app.app_context():
+        other_id = int(decode_token(other['Authorization'].split()[1])['sub'])
+        db.session.add(GroupMember(group_id=group_id, user_id=other_id))
+        db.session.commit()
+
+    _vote(client, auth, poll_id, 0)
+    assert _vote(client, other, poll_id, 0) == [2, 0]
+    assert _vote(client, other, poll_id, 1) == [1, 1]
+
+    polls = client.get(f'/api/trips/{trip_id}/polls', headers=auth).get_json()['polls']
+    assert polls[0]['tallies'] == [1, 1]
+
+
+def test_multiple_choice_vote_replaces_the_whole_selection(client, auth, poll):
+    _, poll_id = poll(multiple_choice=True)
+    assert _vote(client, auth, poll_id, [0, 1]) == [1, 1, 0]
+    assert _vote(client, auth, poll_id, [1, 2]) == [0, 1, 1]
+
+
+def test_invalid_option_is_rejected(client, auth, poll):
+    _, poll_id = poll()
+    response = client.post(f'/api/polls/{poll_id}/vote', json={'option_index': 3}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_racing_duplicate_vote_does_not_decrement_twice(app, client, auth, poll):
+    """A duplicate request that removes the old vote between this request's
+    read and its delete must leave the tally decremented only once."""
+    _, poll_id = poll()
+    _vote(client, auth, poll_id, 0)
+    with app.app_context():
+        engine = db.engine
+    armed = {'on': True}
+
+    def duplicate_commits_first(conn, cursor, statement, parameters, context, executemany):
+        if armed['on'] and statement.startswith('DELETE FROM poll_vote'):
+            armed['on'] = False
+            with engine.begin() as other:
+                other.execute(text('DELETE FROM poll_vote WHERE poll_id = :poll'), {'poll': poll_id})
+                other.execute(text(
+                    'UPDATE poll_option_tally SET count = count - 1 WHERE poll_id = :poll AND option_index = 0'
+                ), {'poll': poll_id})
+
+    event.listen(engine, 'before_cursor_execute', duplicate_commits_first)
+    try:
+        tallies = _vote(client, auth, poll_id, 1)
+    finally:
+        event.remove(engine, 'before_cursor_execute', duplicate_commits_first)
+
+    assert not armed['on']
+    assert tallies == [0, 1, 0]
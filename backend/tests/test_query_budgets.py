@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db, EnhancedChatMessage, User
+from query_stats import assert_max_queries, collect_queries
+from trip_groups import get_trip_group_id
+
+# Trips, groups, then one grouped query each for expenses, photos, latest photos,
+# itinerary counts and next items - independent of how many trips there are
+OVERVIEW_QUERY_BUDGET = 7
+# Trip, group, the messages and one lookup for all of their authors
+ENHANCED_CHAT_QUERY_BUDGET = 6
+
+
+def _seed_trips(client, create_trip, auth, count):
+    trip_ids = [create_trip(auth, name=f'Trip {i}') for i in range(count)]
+    for trip_id in trip_ids:
+        client.post(f'/api/trips/{trip_id}/expenses', json={'amount': 12.5, 'category': 'Food'}, headers=auth)
+        client.post(f'/api/trips/{trip_id}/itinerary', json={
+            'title': 'Museum', 'type': 'activity', 'date': '2099-01-01', 'time': '10:00'
+        }, headers=auth)
+    return trip_ids
+
+
+def test_overview_query_count_does_not_grow_with_trips(client, create_trip, auth):
+    _seed_trips(client, create_trip, auth, 8)
+
+    with assert_max_queries(OVERVIEW_QUERY_BUDGET):
+        response = client.get('/api/trips/overview', headers=auth)
+
+    assert response.status_code == 200
+    trips = response.get_json()['trips']
+    assert len(trips) == 8
+    assert all(t['expense_count'] == 1 and t['itinerary_count'] == 1 for t in trips)
+
+
+def test_batch_costs_no_more_than_its_parts(client, create_trip, auth):
+    trip_ids = _seed_trips(client, create_trip, auth, 3)
+    requests = [{'path': f'/api/trips/{trip_id}/{resource}'}
+                for trip_id in trip_ids for resource in ('itinerary', 'polls', 'expenses')]
+
+    budget = 0
+    for entry in requests:
+        with collect_queries() as stats:
+            assert client.get(entry['path'], headers=auth).status_code == 200
+        budget += stats.count
+
+    with assert_max_queries(budget):
+        response = client.post('/api/batch', json={'requests': requests}, headers=auth)
+
+    assert response.status_code == 200
+    assert [r['status'] for r in response.get_json()['responses']] == [200] * len(requests)
+
+
+def test_enhanced_chat_query_count_does_not_grow_with_messages(app, client, create_trip, register, auth):
+    trip_id = create_trip(auth)
+    client.post(f'/api/trips/{trip_id}/enhanced-chat', json={'message': 'First'}, headers=auth)
+    others = [register(name=f'Member {i}') for i in range(3)]
+    with app.app_context():
+        group_id = get_trip_group_id(trip_id)
+        author_ids = [user.id for user in User.query.order_by(User.id.desc()).limit(len(others))]
+        db.session.add_all([EnhancedChatMessage(group_id=group_id, user_id=author_ids[i % len(author_ids)],
+                                                message=f'Message {i}', read_by='[]') for i in range(30)])
+        db.session.commit()
+
+    with assert_max_queries(ENHANCED_CHAT_QUERY_BUDGET):
+        response = client.get(f'/api/trips/{trip_id}/enhanced-chat', headers=auth)
+
+    assert response.status_code == 200
+    messages = response.get_json()['messages']
+    assert len(messages) == 31
+    assert {m['user_name'] for m in messages[1:]} == {'Member 0', 'Member 1', 'Member 2'}
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection(app):
+    with app.app_context(), db.engine.connect() as conn:
+        with collect_queries() as stats:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text('SELECT * FROM no_such_table'))
+                conn.rollback()
+            conn.execute(text('SELECT 1'))
+
+        assert not conn.info.get('query_start')
+    assert stats.statements == ['SELECT 1']
@@ -0,0 +1,43 @@
+from flask_jwt_extended import decode_token
+
+from models import db, GroupMember
+
+
+def _join(app, client, auth, headers):
+    group_id = client.get('/api/trips/overview', headers=auth).get_json()['trips'][0]['group_id']
+    with app.app_context():
+        user_id = int(decode_token(headers['Authorization'].split()[1])['sub'])
+        db.session.add(GroupMember(group_id=group_id, user_id=user_id))
+        db.session.commit()
+
+
+def _recommend(client, auth, trip_id, title):
+    response = client.post(f'/api/trips/{trip_id}/recommendations', json={'title': title, 'type': 'food'},
+                           headers=auth)
+    return response.get_json()['recommendation']['id']
+
+
+def _vote(client, headers, rec_id, vote):
+    response = client.post(f'/api/recommendations/{rec_id}/vote', json={'vote': vote}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+
+
+def test_finalization_lists_approved_recommendations_by_score(app, client, create_trip, auth, register):
+    trip_id = create_trip(auth)
+    once, twice, rejected = (_recommend(client, auth, trip_id, title) for title in ('Cafe', 'Bistro', 'Diner'))
+    other = register()
+    _join(app, client, auth, other)
+    _vote(client, auth, once, 'approve')
+    _vote(client, auth, twice, 'approve')
+    _vote(client, other, twice, 'approve')
+    _vote(client, auth, rejected, 'reject')
+
+    ranked = client.get(f'/api/trips/{trip_id}/recommendations?sort=score', headers=auth).get_json()
+    preview = client.get(f'/api/trips/{trip_id}/preview-finalization', headers=auth).get_json()
+    finalized = client.post(f'/api/trips/{trip_id}/finalize', json={}, headers=auth).get_json()['finalization']
+
+    expected = [{'id': r['id'], 'votes': {'approve': r['approve_count'], 'reject': r['reject_count']}}
+                for r in ranked['recommendations'] if r['approve_count'] > r['reject_count']]
+    assert [r['id'] for r in expected] == [twice, once]
+    assert [{'id': r['id'], 'votes': r['votes']} for r in finalized['approved_recommendations']] == expected
+    assert preview['preview']['approved_recommendations'] == 2
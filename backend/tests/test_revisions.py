@@ -0,0 +1,36 @@
+import pytest
+from flask_jwt_extended import decode_token
+
+from models import db, GroupMember
+from revisions import not_modified_response
+
+
+def _shared_group(app, client, create_trip, auth, other):
+    trip_id = create_trip(auth)
+    client.post(f'/api/trips/{trip_id}/expenses', json={'amount': 5}, headers=auth)
+    group_id = client.get('/api/trips/overview', headers=auth).get_json()['trips'][0]['group_id']
+    with app.app_context():
+        other_id = int(decode_token(other['Authorization'].split()[1])['sub'])
+        db.session.add(GroupMember(group_id=group_id, user_id=other_id))
+        db.session.commit()
+    return group_id
+
+
+def test_members_do_not_share_etags(app, client, create_trip, auth, register):
+    other = register()
+    group_id = _shared_group(app, client, create_trip, auth, other)
+    url = f'/api/groups/{group_id}/expenses'
+
+    mine = client.get(url, headers=auth)
+    theirs = client.get(url, headers=other)
+
+    assert mine.headers['ETag'] != theirs.headers['ETag']
+    assert client.get(url, headers={**auth, 'If-None-Match': mine.headers['ETag']}).status_code == 304
+    revalidated = client.get(url, headers={**other, 'If-None-Match': mine.headers['ETag']})
+    assert revalidated.status_code == 200 and revalidated.get_json()
+
+
+def test_tagging_without_a_verified_caller_raises(app):
+    with app.test_request_context('/'):
+        with pytest.raises(RuntimeError):
+            not_modified_response(1, 'expenses')
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import scheduler
+from models import db, ScheduledJob, SchedulerLease
+from scheduler import RETRY_DELAYS, Scheduler, cancel, job, schedule
+
+calls = []
+
+
+@job('test_record')
+def _record(**payload):
+    calls.append(payload)
+
+
+@job('test_fail')
+def _fail():
+    calls.append('fail')
+    raise RuntimeError('boom')
+
+
+@pytest.fixture
+def jobs(app):
+    """An app context with no pending jobs and no lease holder"""
+    with app.app_context():
+        ScheduledJob.query.delete()
+        SchedulerLease.query.delete()
+        db.session.commit()
+        calls.clear()
+        yield
+
+
+def _due(kind, key=None, **payload):
+    scheduled = schedule(kind, datetime.utcnow() - timedelta(seconds=1), key=key, **payload)
+    db.session.commit()
+    return scheduled.id
+
+
+def _expire_lease_checks(*schedulers):
+    for each in schedulers:
+        each.lease_due = 0.0
+
+
+def test_only_the_lease_holder_runs_jobs_until_its_lease_lapses(app, jobs):
+    first, second = Scheduler(app), Scheduler(app)
+    _due('test_record', key='a', n=1)
+
+    first.tick()
+    second.tick()
+    assert (first.is_leader, second.is_leader) == (True, False)
+    assert calls == [{'n': 1}]
+
+    # The holder renews its own lease; nobody else can take it meanwhile
+    _expire_lease_checks(first, second)
+    assert first.acquire_lease() and not second.acquire_lease()
+
+    SchedulerLease.query.update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    _due('test_record', key='b', n=2)
+    second.tick()
+    assert second.is_leader
+    assert calls == [{'n': 1}, {'n': 2}]
+    _expire_lease_checks(first)
+    first.tick()
+    assert not first.is_leader and first.heap == []
+
+
+def test_a_failing_job_backs_off_then_is_dropped(app, jobs):
+    job_id = _due('test_fail')
+
+    for attempt, delay in enumerate(RETRY_DELAYS, start=1):
+        before = datetime.utcnow()
+        assert scheduler.run_job(job_id) is False
+        retry = db.session.get(ScheduledJob, job_id)
+        assert retry.attempts == attempt and retry.last_error == 'boom'
+        assert before + delay <= retry.run_at <= datetime.utcnow() + delay
+        # Not due yet, so nothing runs until the delay is over
+        assert scheduler.run_job(job_id) is False
+        retry.run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    assert scheduler.run_job(job_id) is False
+    assert db.session.get(ScheduledJob, job_id) is None
+    assert calls == ['fail'] * (len(RETRY_DELAYS) + 1)
+
+
+def test_cancelled_and_rescheduled_jobs_do_not_run_from_a_stale_heap(app, jobs):
+    leader = Scheduler(app)
+    leader.tick()
+    cancelled = _due('test_record', key='cancelled', n=1)
+    moved = _due('test_record', key='moved', n=2)
+    leader.reload()
+    assert {job_id for _, job_id in leader.heap} >= {cancelled, moved}
+
+    cancel('cancelled')
+    schedule('test_record', datetime.utcnow() + timedelta(hours=1), key='moved', n=3)
+    db.session.commit()
+    leader.refresh_due = float('inf')
+    leader.tick()
+
+    assert calls == []
+    assert db.session.get(ScheduledJob, moved).run_at > datetime.utcnow()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import sync
+from models import db, ChangeLog, Expense
+from trip_groups import get_trip_group_id
+
+
+def _group_id(app, client, create_trip, auth):
+    trip_id = create_trip(auth)
+    client.post(f'/api/trips/{trip_id}/expenses', json={'amount': 1}, headers=auth)
+    with app.app_context():
+        return get_trip_group_id(trip_id)
+
+
+def _add_expenses(app, group_id, count):
+    """count expenses in one flush, so one revision; returns their ids"""
+    with app.app_context():
+        expenses = [Expense(group_id=group_id, user_id=1, amount=i) for i in range(count)]
+        db.session.add_all(expenses)
+        db.session.commit()
+        return [e.id for e in expenses]
+
+
+def _sync(client, auth, group_id, since=None):
+    query = f'?since={since}' if since is not None else ''
+    response = client.get(f'/api/groups/{group_id}/sync{query}', headers=auth)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_pages_end_on_whole_revisions(app, client, create_trip, auth, monkeypatch):
+    group_id = _group_id(app, client, create_trip, auth)
+    token = _sync(client, auth, group_id)['token']
+    revisions = [_add_expenses(app, group_id, 2) for _ in range(4)]
+    oversized = _add_expenses(app, group_id, 5)
+    monkeypatch.setattr(sync, 'SYNC_PAGE_SIZE', 3)
+
+    pages = []
+    while True:
+        page = _sync(client, auth, group_id, token)
+        pages.append(sorted(row['id'] for row in page['inserts'].get('expense', [])))
+        assert int(page['token']) > int(token)
+        token = page['token']
+        if not page['has_more']:
+            break
+
+    # Two pairs would make four rows, so each page stops after one revision; the five-row flush goes
+    # out whole, and as the last revision it ends the walk
+    assert pages == [sorted(ids) for ids in revisions] + [sorted(oversized)]
+    assert _sync(client, auth, group_id, token) == {
+        'token': token, 'reset': False, 'has_more': False, 'inserts': {}, 'updates': {}, 'deletes': {},
+    }
+
+
+def test_tokens_older_than_compaction_get_a_reset(app, client, create_trip, auth):
+    group_id = _group_id(app, client, create_trip, auth)
+    old_token = _sync(client, auth, group_id)['token']
+    _add_expenses(app, group_id, 2)
+    recent_token = _sync(client, auth, group_id, old_token)['token']
+    with app.app_context():
+        ChangeLog.query.filter_by(group_id=group_id).update({'timestamp': datetime.utcnow() - timedelta(days=90)})
+        db.session.commit()
+    kept = _add_expenses(app, group_id, 1)
+    with app.app_context():
+        assert sync.compact_changelog(retention_days=30) > 0
+
+    stale = _sync(client, auth, group_id, old_token)
+    current = _sync(client, auth, group_id, recent_token)
+
+    assert stale['reset'] and stale['token'] == current['token']
+    assert not current['reset'] and [row['id'] for row in current['inserts']['expense']] == kept
+    assert _sync(client, auth, group_id, int(current['token']) + 1)['reset']
@@ -0,0 +1,37 @@
+from models import db, Trip
+
+
+def _legacy_trip(app, client, create_trip, auth):
+    """A trip whose dates predate validation, as migration 0008 left them"""
+    trip_id = create_trip(auth)
+    with app.app_context():
+        trip = db.session.get(Trip, trip_id)
+        trip.start_date, trip.end_date = 'July 1st', 'early August'
+        trip.start_on = trip.end_on = None
+        db.session.commit()
+    return trip_id
+
+
+def test_renaming_a_trip_with_legacy_dates_is_allowed(app, client, create_trip, auth):
+    trip_id = _legacy_trip(app, client, create_trip, auth)
+
+    response = client.put(f'/api/trips/{trip_id}', json={'name': 'Renamed', 'description': 'Still July'}, headers=auth)
+
+    assert response.status_code == 200
+    with app.app_context():
+        trip = db.session.get(Trip, trip_id)
+        assert trip.name == 'Renamed'
+        assert (trip.start_on, trip.end_on) == (None, None)
+
+
+def test_sent_dates_are_still_validated(app, client, create_trip, auth):
+    trip_id = _legacy_trip(app, client, create_trip, auth)
+
+    bad = client.put(f'/api/trips/{trip_id}', json={'end_date': 'soon'}, headers=auth)
+    fixed = client.put(f'/api/trips/{trip_id}', json={'start_date': '2026-07-01', 'end_date': '2026-07-09'},
+                       headers=auth)
+    backwards = client.put(f'/api/trips/{trip_id}', json={'end_date': '2026-06-01'}, headers=auth)
+
+    assert bad.status_code == 400 and 'end_date' in bad.get_json()['error']
+    assert fixed.status_code == 200
+    assert backwards.status_code == 400
@@ -1,10 +1,119 @@
+import threading
+from collections import OrderedDict
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity, jwt_required
-from models import db, TripFinalization, Trip, Group, GroupMember, ItineraryItem, Recommendation, RecommendationVote, Expense
+from sqlalchemy import func
+from models import db, TripFinalization, Trip, GroupMember, ItineraryItem, Recommendation, Expense
+from authz import is_group_member
+from trip_groups import get_trip_group
+from revisions import current_revision
 import json
 
 trip_finalization_bp = Blueprint('trip_finalization_bp', __name__)
 
+MAX_CACHED_SNAPSHOTS = 256
+_snapshots = OrderedDict()  # group id -> snapshot, tagged with the revision it was built at
+_snapshots_lock = threading.Lock()
+
+def build_snapshot(group_id):
+    """Everything finalization locks in, from a handful of aggregate queries"""
+    confirmed_itinerary = ItineraryItem.query.filter_by(
+        group_id=group_id, 
+        confirmed=True
+    ).order_by(ItineraryItem.date, ItineraryItem.time).all()
+    unconfirmed_count = db.session.query(func.count(ItineraryItem.id)).filter_by(
+        group_id=group_id,
+        confirmed=False
+    ).scalar()
+    
+    # The counters vote_on_recommendation keeps, in ?sort=score order
+    recommendations = Recommendation.query.filter_by(group_id=group_id).order_by(
+        Recommendation.score.desc(), Recommendation.id.desc()
+    ).all()
+    approved_recommendations = []
+    pending_count = 0
+    for rec in recommendations:
+        approve_count = rec.approve_count or 0
+        reject_count = rec.reject_count or 0
+        if approve_count > reject_count:
+            approved_recommendations.append({
+                'id': rec.id,
+                'title': rec.title,
+                'type': rec.type,
+                'comment': rec.comment,
+                'votes': {
+                    'approve': approve_count,
+                    'reject': reject_count
+                }
+            })
+        elif approve_count == reject_count:
+            pending_count += 1
+    
+    total_expenses = db.session.query(func.coalesce(func.sum(Expense.amount), 0)).filter_by(group_id=group_id).scalar()
+    member_count = db.session.query(func.count(GroupMember.id)).filter_by(group_id=group_id).scalar()
+    
+    return {
+        'final_itinerary': [{
+            'id': item.id,
+            'type': item.type,
+            'title': item.title,
+            'description': item.description,
+            'location': item.location,
+            'date': item.date,
+            'time': item.time,
+            'cost': item.cost,
+            'booking_reference': item.booking_reference
+        } for item in confirmed_itinerary],
+        'unconfirmed_itinerary_items': unconfirmed_count,
+        'approved_recommendations': approved_recommendations,
+        'pending_recommendations': pending_count,
+        'total_expenses': total_expenses,
+        'member_count': member_count
+    }
+
+def finalization_snapshot(group_id, revision=None):
+    """(revision, snapshot) for the group, built once per group revision and shared by every
+    worker request until the next write. Treat the snapshot as read-only."""
+    if revision is None:
+        revision = current_revision(group_id)
+    with _snapshots_lock:
+        cached = _snapshots.get(group_id)
+        if cached and cached[0] == revision:
+            _snapshots.move_to_end(group_id)
+            return cached
+    snapshot = build_snapshot(group_id)
+    with _snapshots_lock:
+        _snapshots[group_id] = (revision, snapshot)
+        _snapshots.move_to_end(group_id)
+        if len(_snapshots) > MAX_CACHED_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return revision, snapshot
+
+def _fill_finalization(finalization, trip, snapshot):
+    final_itinerary = snapshot['final_itinerary']
+    summary = f"""
+        Trip: {trip.name}
+        Duration: {trip.start_date} to {trip.end_date}
+        
+        Final Itinerary:
+        - {len(final_itinerary)} confirmed activities/bookings
+        - Total estimated cost: ${sum([item.get('cost', 0) for item in final_itinerary if item.get('cost')])}
+        
+        Approved Recommendations:
+        - {len(snapshot['approved_recommendations'])} group-approved suggestions
+        
+        Total Expenses Tracked:
+        - ${snapshot['total_expenses']}
+        
+        Group Members: {snapshot['member_count'] + 1}
+        
+        This trip has been finalized and locked. No further changes can be made to the core itinerary.
+        """
+    finalization.final_itinerary = json.dumps(final_itinerary)
+    finalization.final_budget = snapshot['total_expenses']
+    finalization.final_recommendations = json.dumps(snapshot['approved_recommendations'])
+    finalization.summary = summary.strip()
+
 @trip_finalization_bp.route('/api/trips/<int:trip_id>/finalize', methods=['POST'])
 @jwt_required()
 def finalize_trip(trip_id):
@@ -16,15 +125,12 @@ def finalize_trip(trip_id):
         trip = Trip.query.get_or_404(trip_id)
         
         # Get the group associated with this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
+        group = get_trip_group(trip_id)
         if not group:
             return jsonify({'error': 'No group found for this trip'}), 404
         
         # Check if user is group creator or member
-        membership = GroupMember.query.filter_by(
-            group_id=group.id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group.id, current_user_id)
         
         if not membership and group.creator_id != current_user_id:
             return jsonify({'error': 'Access denied'}), 403
@@ -34,86 +140,34 @@ def finalize_trip(trip_id):
         if existing_finalization:
             return jsonify({'error': 'Trip already finalized'}), 400
         
-        # Gather all final data
-        # 1. Final Itinerary (only confirmed items)
-        confirmed_itinerary = ItineraryItem.query.filter_by(
-            group_id=group.id, 
-            confirmed=True
-        ).order_by(ItineraryItem.date, ItineraryItem.time).all()
-        
-        final_itinerary = [{
-            'id': item.id,
-            'type': item.type,
-            'title': item.title,
-            'description': item.description,
-            'location': item.location,
-            'date': item.date,
-            'time': item.time,
-            'cost': item.cost,
-            'booking_reference': item.booking_reference
-        } for item in confirmed_itinerary]
-        
-        # 2. Approved Recommendations
-        approved_recommendations = []
-        recommendations = Recommendation.query.filter_by(group_id=group.id).all()
-        
-        for rec in recommendations:
-            votes = RecommendationVote.query.filter_by(recommendation_id=rec.id).all()
-            approve_count = len([v for v in votes if v.vote == 'approve'])
-            reject_count = len([v for v in votes if v.vote == 'reject'])
-            
-            if approve_count > reject_count:
-                approved_recommendations.append({
-                    'id': rec.id,
-                    'title': rec.title,
-                    'type': rec.type,
-                    'comment': rec.comment,
-                    'votes': {
-                        'approve': approve_count,
-                        'reject': reject_count
-                    }
-                })
-        
-        # 3. Final Budget
-        expenses = Expense.query.filter_by(group_id=group.id).all()
-        total_expenses = sum([exp.amount for exp in expenses])
-        
-        # 4. Create summary
-        summary = f"""
-        Trip: {trip.name}
-        Duration: {trip.start_date} to {trip.end_date}
-        
-        Final Itinerary:
-        - {len(final_itinerary)} confirmed activities/bookings
-        - Total estimated cost: ${sum([item.get('cost', 0) for item in final_itinerary if item.get('cost')])}
-        
-        Approved Recommendations:
-        - {len(approved_recommendations)} group-approved suggestions
-        
-        Total Expenses Tracked:
-        - ${total_expenses}
-        
-        Group Members: {len(GroupMember.query.filter_by(group_id=group.id).all()) + 1}
-        
-        This trip has been finalized and locked. No further changes can be made to the core itinerary.
-        """
+        # The same snapshot the preview showed; pass its revision to refuse if the plan changed since
+        revision, snapshot = finalization_snapshot(group.id)
+        expected_revision = (data or {}).get('revision')
+        if expected_revision is not None and str(expected_revision) != str(revision):
+            return jsonify({'error': 'The trip changed since the preview', 'revision': revision}), 409
         
         # Create finalization record
         finalization = TripFinalization(
             trip_id=trip_id,
             group_id=group.id,
-            finalized_by=current_user_id,
-            final_itinerary=json.dumps(final_itinerary),
-            final_budget=total_expenses,
-            final_recommendations=json.dumps(approved_recommendations),
-            summary=summary.strip()
+            finalized_by=current_user_id
         )
-        
+        _fill_finalization(finalization, trip, snapshot)
         db.session.add(finalization)
         
         # Mark trip as finalized
         trip.finalized = True
         
+        db.session.flush()
+        # The insert bumped the revision and holds the group's write lock until commit. Anything
+        # other than revision + 1 means a write landed after the snapshot, so rebuild it once here.
+        if current_revision(group.id) != revision + 1:
+            if expected_revision is not None:
+                db.session.rollback()
+                return jsonify({'error': 'The trip changed since the preview'}), 409
+            snapshot = build_snapshot(group.id)
+            _fill_finalization(finalization, trip, snapshot)
+        
         db.session.commit()
         
         return jsonify({
@@ -122,8 +176,8 @@ def finalize_trip(trip_id):
                 'id': finalization.id,
                 'summary': finalization.summary,
                 'final_budget': finalization.final_budget,
-                'final_itinerary': final_itinerary,
-                'approved_recommendations': approved_recommendations,
+                'final_itinerary': snapshot['final_itinerary'],
+                'approved_recommendations': snapshot['approved_recommendations'],
                 'timestamp': finalization.timestamp.isoformat()
             }
         })
@@ -140,15 +194,12 @@ def get_trip_finalization(trip_id):
         trip = Trip.query.get_or_404(trip_id)
         
         # Get the group associated with this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
+        group = get_trip_group(trip_id)
         if not group:
             return jsonify({'error': 'No group found for this trip'}), 404
         
         # Check if user is member
-        membership = GroupMember.query.filter_by(
-            group_id=group.id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group.id, current_user_id)
         
         if not membership and group.creator_id != current_user_id:
             return jsonify({'error': 'Access denied'}), 403
@@ -182,59 +233,31 @@ def preview_trip_finalization(trip_id):
         trip = Trip.query.get_or_404(trip_id)
         
         # Get the group associated with this trip
-        group = Group.query.filter_by(trip_id=trip_id).first()
+        group = get_trip_group(trip_id)
         if not group:
             return jsonify({'error': 'No group found for this trip'}), 404
         
         # Check if user is member
-        membership = GroupMember.query.filter_by(
-            group_id=group.id, 
-            user_id=current_user_id
-        ).first()
+        membership = is_group_member(group.id, current_user_id)
         
         if not membership and group.creator_id != current_user_id:
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get confirmed itinerary items
-        confirmed_items = ItineraryItem.query.filter_by(
-            group_id=group.id, 
-            confirmed=True
-        ).count()
-        
-        unconfirmed_items = ItineraryItem.query.filter_by(
-            group_id=group.id, 
-            confirmed=False
-        ).count()
-        
-        # Get recommendation voting status
-        recommendations = Recommendation.query.filter_by(group_id=group.id).all()
-        approved_count = 0
-        pending_count = 0
-        
-        for rec in recommendations:
-            votes = RecommendationVote.query.filter_by(recommendation_id=rec.id).all()
-            approve_count = len([v for v in votes if v.vote == 'approve'])
-            reject_count = len([v for v in votes if v.vote == 'reject'])
-            
-            if approve_count > reject_count:
-                approved_count += 1
-            elif approve_count == reject_count or (approve_count == 0 and reject_count == 0):
-                pending_count += 1
-        
-        # Get budget info
-        expenses = Expense.query.filter_by(group_id=group.id).all()
-        total_expenses = sum([exp.amount for exp in expenses])
+        revision, snapshot = finalization_snapshot(group.id)
+        confirmed_items = len(snapshot['final_itinerary'])
+        approved_count = len(snapshot['approved_recommendations'])
         
         return jsonify({
             'preview': {
                 'trip_name': trip.name,
                 'duration': f"{trip.start_date} to {trip.end_date}",
                 'confirmed_itinerary_items': confirmed_items,
-                'unconfirmed_itinerary_items': unconfirmed_items,
+                'unconfirmed_itinerary_items': snapshot['unconfirmed_itinerary_items'],
                 'approved_recommendations': approved_count,
-                'pending_recommendations': pending_count,
-                'total_expenses': total_expenses,
-                'is_ready_to_finalize': confirmed_items > 0 or approved_count > 0
+                'pending_recommendations': snapshot['pending_recommendations'],
+                'total_expenses': snapshot['total_expenses'],
+                'is_ready_to_finalize': confirmed_items > 0 or approved_count > 0,
+                'revision': revision
             }
         })
     except Exception as e:
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from models import db, Group, GroupMember, Trip
+
+# Process-local LRU of trip_id -> (group_id, cached_at). Deletes in this worker
+# invalidate entries immediately; the TTL bounds staleness from other workers.
+CACHE_SIZE = 4096
+CACHE_TTL_SECONDS = 300
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(trip_id):
+    with _cache_lock:
+        entry = _cache.get(trip_id)
+        if entry is None:
+            return None
+        group_id, cached_at = entry
+        if time.monotonic() - cached_at > CACHE_TTL_SECONDS:
+            del _cache[trip_id]
+            return None
+        _cache.move_to_end(trip_id)
+        return group_id
+
+
+def _cache_put(trip_id, group_id):
+    with _cache_lock:
+        _cache[trip_id] = (group_id, time.monotonic())
+        _cache.move_to_end(trip_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def invalidate_trip(trip_id):
+    with _cache_lock:
+        _cache.pop(trip_id, None)
+
+
+def get_trip_group_id(trip_id):
+    """Id of the group attached to a trip, or None if the trip has no group yet"""
+    group_id = _cache_get(trip_id)
+    if group_id is not None:
+        return group_id
+    group_id = db.session.query(Group.id).filter_by(trip_id=trip_id).scalar()
+    if group_id is not None:
+        _cache_put(trip_id, group_id)
+    return group_id
+
+
+def get_trip_group(trip_id):
+    """Group attached to a trip, or None"""
+    group_id = get_trip_group_id(trip_id)
+    return db.session.get(Group, group_id) if group_id is not None else None
+
+
+def get_or_create_trip_group(trip, user_id):
+    """Id of the trip's group, creating it with user_id as first member if needed.
+
+    The insert runs in a savepoint; if a concurrent request created the group
+    first, the unique index on Group.trip_id rejects ours and we select theirs.
+    The caller commits.
+    """
+    group_id = get_trip_group_id(trip.id)
+    if group_id is not None:
+        return group_id
+
+    try:
+        with db.session.begin_nested():
+            group = Group(name=f"{trip.name} Group", creator_id=user_id, trip_id=trip.id)
+            db.session.add(group)
+            db.session.flush()
+            db.session.add(GroupMember(group_id=group.id, user_id=user_id))
+        return group.id
+    except IntegrityError:
+        return get_trip_group_id(trip.id)
+
+
+@event.listens_for(Trip, 'after_delete')
+def _trip_deleted(mapper, connection, target):
+    invalidate_trip(target.id)
+
+
+@event.listens_for(Group, 'after_delete')
+def _group_deleted(mapper, connection, target):
+    if target.trip_id is not None:
+        invalidate_trip(target.trip_id)
+
+
+@event.listens_for(Group, 'after_update')
+def _group_updated(mapper, connection, target):
+    history = db.inspect(target).attrs.trip_id.history
+    for trip_id in list(history.deleted or []) + list(history.added or []):
+        if trip_id is not None:
+            invalidate_trip(trip_id)
@@ -1,9 +1,41 @@
 print("TRIPS BLUEPRINT LOADED")
+from datetime import date
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Trip
+from sqlalchemy import func
+from models import db, Trip, Group, Expense, GalleryImage, ItineraryItem
+from pagination import date_range, keyset_page, page_size, paged_response, parse_day
 
 trips_bp = Blueprint('trips_bp', __name__)
+OVERVIEW_PAGE_SIZE = 50
+OVERVIEW_MAX_PAGE_SIZE = 100
+
+def _apply_dates(trip, sent=('start_date', 'end_date')):
+    """Fill the typed start_on/end_on from the date strings; returns an error message or None.
+
+    Only the fields in sent (the ones the client supplied) are validated. A stored
+    legacy string that isn't YYYY-MM-DD leaves its typed column NULL, as migration 0008 did.
+    """
+    trip.start_on = parse_day(trip.start_date)
+    trip.end_on = parse_day(trip.end_date)
+    for name, value, day in (('start_date', trip.start_date, trip.start_on), ('end_date', trip.end_date, trip.end_on)):
+        if name in sent and value and day is None:
+            return f'{name} must be a date (YYYY-MM-DD)'
+    if sent and trip.start_on and trip.end_on and trip.end_on < trip.start_on:
+        return 'end_date must not be before start_date'
+    return None
+
+def _trips_page(user_id, limit=None):
+    """The user's trips by id, or with ?from=/?to= those overlapping the range by start date"""
+    first_day, last_day = date_range()
+    if not (first_day or last_day):
+        return keyset_page(Trip.query.filter_by(user_id=user_id), [Trip.id], key=lambda t: [t.id], limit=limit)
+    query = Trip.query.filter(Trip.user_id == user_id, Trip.start_on.isnot(None))
+    if last_day:
+        query = query.filter(Trip.start_on <= last_day)
+    if first_day:
+        query = query.filter(func.coalesce(Trip.end_on, Trip.start_on) >= first_day)
+    return keyset_page(query, [Trip.start_on, Trip.id], key=lambda t: [t.start_on, t.id], limit=limit)
 
 @trips_bp.route('/api/trips', methods=['POST'])
 @jwt_required()
@@ -17,6 +49,9 @@ def create_trip():
         end_date=data.get('end_date'),
         description=data.get('description')
     )
+    error = _apply_dates(trip)
+    if error:
+        return jsonify({'error': error}), 400
     db.session.add(trip)
     db.session.commit()
     return jsonify({
@@ -35,7 +70,10 @@ def create_trip():
 @jwt_required()
 def get_trips():
     user_id = int(get_jwt_identity())
-    trips = Trip.query.filter_by(user_id=user_id).all()
+    try:
+        trips, next_cursor = _trips_page(user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     trips_list = [{
         'id': t.id,
         'name': t.name,
@@ -43,10 +81,10 @@ def get_trips():
         'end_date': t.end_date,
         'description': t.description
     } for t in trips]
-    return jsonify({
+    return paged_response({
         'success': True,
         'trips': trips_list
-    })
+    }, next_cursor)
 
 @trips_bp.route('/api/trips/<int:trip_id>', methods=['PUT'])
 @jwt_required()
@@ -60,6 +98,10 @@ def update_trip(trip_id):
     trip.start_date = data.get('start_date', trip.start_date)
     trip.end_date = data.get('end_date', trip.end_date)
     trip.description = data.get('description', trip.description)
+    error = _apply_dates(trip, sent=[name for name in ('start_date', 'end_date') if name in data])
+    if error:
+        db.session.rollback()
+        return jsonify({'error': error}), 400
     db.session.commit()
     return jsonify({'message': 'Trip updated!'})
 
@@ -75,3 +117,105 @@ def delete_trip(trip_id):
     return jsonify({'message': 'Trip deleted!'})
 
 print("TRIPS BLUEPRINT LOADED")
+
+@trips_bp.route('/api/trips/overview', methods=['GET'])
+@jwt_required()
+def get_trips_overview():
+    """Per-trip counts, totals, latest photo and next itinerary item for the dashboard.
+
+    Replaces one expenses and one gallery request per trip with a fixed number of
+    grouped queries. Paged with ?limit= and the returned next_cursor; ?from=/?to=
+    keep only trips overlapping those days.
+    """
+    user_id = int(get_jwt_identity())
+    limit = page_size(OVERVIEW_PAGE_SIZE, OVERVIEW_MAX_PAGE_SIZE)
+    try:
+        trips, next_cursor = _trips_page(user_id, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    trip_ids = [t.id for t in trips]
+    group_by_trip = {}
+    if trip_ids:
+        group_by_trip = dict(db.session.query(Group.trip_id, Group.id).filter(Group.trip_id.in_(trip_ids)).all())
+    group_ids = list(group_by_trip.values())
+
+    expense_stats = {}
+    photo_stats = {}
+    latest_photos = {}
+    itinerary_counts = {}
+    next_items = {}
+    if group_ids:
+        expense_stats = {
+            gid: (count, total) for gid, count, total in db.session.query(
+                Expense.group_id, func.count(Expense.id), func.coalesce(func.sum(Expense.amount), 0)
+            ).filter(Expense.group_id.in_(group_ids)).group_by(Expense.group_id)
+        }
+
+        photo_stats = {
+            gid: (count, latest_id) for gid, count, latest_id in db.session.query(
+                GalleryImage.group_id, func.count(GalleryImage.id), func.max(GalleryImage.id)
+            ).filter(GalleryImage.group_id.in_(group_ids)).group_by(GalleryImage.group_id)
+        }
+        latest_ids = [latest_id for _, latest_id in photo_stats.values() if latest_id]
+        if latest_ids:
+            latest_photos = {img.group_id: img for img in GalleryImage.query.filter(GalleryImage.id.in_(latest_ids))}
+
+        itinerary_counts = dict(db.session.query(
+            ItineraryItem.group_id, func.count(ItineraryItem.id)
+        ).filter(ItineraryItem.group_id.in_(group_ids)).group_by(ItineraryItem.group_id).all())
+
+        # First upcoming item per group in a single windowed query
+        ranked = db.session.query(
+            ItineraryItem.id.label('id'),
+            func.row_number().over(
+                partition_by=ItineraryItem.group_id,
+                order_by=(ItineraryItem.day, ItineraryItem.position, ItineraryItem.time, ItineraryItem.id)
+            ).label('rank')
+        ).filter(
+            ItineraryItem.group_id.in_(group_ids),
+            ItineraryItem.day >= date.today()
+        ).subquery()
+        next_items = {
+            item.group_id: item for item in ItineraryItem.query.join(ranked, ranked.c.id == ItineraryItem.id).filter(ranked.c.rank == 1)
+        }
+
+    overview = []
+    for t in trips:
+        gid = group_by_trip.get(t.id)
+        expense_count, expense_total = expense_stats.get(gid, (0, 0))
+        photo_count, _ = photo_stats.get(gid, (0, None))
+        photo = latest_photos.get(gid)
+        item = next_items.get(gid)
+        overview.append({
+            'id': t.id,
+            'name': t.name,
+            'start_date': t.start_date,
+            'end_date': t.end_date,
+            'description': t.description,
+            'finalized': t.finalized,
+            'group_id': gid,
+            'expense_count': expense_count,
+            'expense_total': round(float(expense_total), 2),
+            'photo_count': photo_count,
+            'itinerary_count': itinerary_counts.get(gid, 0),
+            'latest_photo': {
+                'id': photo.id,
+                'filename': photo.filename,
+                'url': request.host_url + f'uploads/{photo.filename}',
+                'timestamp': photo.timestamp.isoformat() if photo.timestamp else None
+            } if photo else None,
+            'next_itinerary_item': {
+                'id': item.id,
+                'type': item.type,
+                'title': item.title,
+                'location': item.location,
+                'date': item.date,
+                'time': item.time
+            } if item else None
+        })
+
+    return paged_response({
+        'success': True,
+        'trips': overview
+    }, next_cursor)
@@ -0,0 +1,118 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from flask import current_app, request, send_file, abort, make_response
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+UPLOAD_FOLDER = 'uploads'
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# Files stored by save_upload() are named after the SHA-256 of their bytes,
+# so their URL never points at different content and can be cached forever.
+CONTENT_ADDRESSED_NAME = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]{1,10})?$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 300
+CHUNK_SIZE = 64 * 1024
+
+# ETags of legacy (non content-addressed) uploads, keyed by path, size and mtime
+_etag_cache = {}
+_etag_cache_lock = threading.Lock()
+_ETAG_CACHE_SIZE = 4096
+
+
+def save_upload(file_storage):
+    """Store an uploaded file under the SHA-256 of its content and return the filename"""
+    original = secure_filename(file_storage.filename or '')
+    ext = os.path.splitext(original)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,10}', ext):
+        ext = ''
+
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(UPLOAD_FOLDER, f'.upload-{os.getpid()}-{threading.get_ident()}.tmp')
+    with open(tmp_path, 'wb') as out:
+        while True:
+            chunk = file_storage.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+
+    filename = digest.hexdigest() + ext
+    final_path = os.path.join(UPLOAD_FOLDER, filename)
+    if os.path.exists(final_path):
+        # Same bytes already stored - keep the existing file
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+    return filename
+
+
+def upload_path(filename):
+    """Absolute path of a stored upload, or None if it is outside the store or missing"""
+    path = safe_join(os.path.abspath(UPLOAD_FOLDER), filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    return path
+
+
+def file_etag(filename, path):
+    """Strong ETag tied to the file content"""
+    match = CONTENT_ADDRESSED_NAME.match(os.path.basename(filename))
+    if match:
+        return match.group(1)
+
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _etag_cache_lock:
+        etag = _etag_cache.get(key)
+    if etag:
+        return etag
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    etag = digest.hexdigest()
+
+    with _etag_cache_lock:
+        if len(_etag_cache) >= _ETAG_CACHE_SIZE:
+            _etag_cache.clear()
+        _etag_cache[key] = etag
+    return etag
+
+
+def serve_upload(filename):
+    """Serve a stored upload with caching headers, conditional GETs and byte ranges.
+
+    With UPLOADS_ACCEL_REDIRECT set to an internal nginx location the bytes are
+    handed off via X-Accel-Redirect; with USE_X_SENDFILE Flask emits X-Sendfile.
+    """
+    path = upload_path(filename)
+    if path is None:
+        abort(404)
+
+    etag = file_etag(filename, path)
+    immutable = CONTENT_ADDRESSED_NAME.match(os.path.basename(filename)) is not None
+    max_age = IMMUTABLE_MAX_AGE if immutable else MUTABLE_MAX_AGE
+
+    accel_prefix = current_app.config.get('UPLOADS_ACCEL_REDIRECT')
+    if accel_prefix:
+        response = make_response('', 200)
+        response.set_etag(etag)
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+        else:
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + filename.lstrip('/')
+            response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    else:
+        # send_file answers If-None-Match with 304 and Range with 206 when conditional
+        response = send_file(path, etag=etag, max_age=max_age, conditional=True)
+
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
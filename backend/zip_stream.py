@@ -0,0 +1,52 @@
+import os
+import zipfile
+from datetime import datetime
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """Write-only file object without tell(), so zipfile writes data descriptors instead of seeking back"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of (arcname, path, modified) entries chunk by chunk.
+
+    Entries are stored without recompression (photos are already compressed) and
+    only one CHUNK_SIZE buffer is held at a time, whatever the archive size.
+    Missing files are skipped.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, path, modified in entries:
+            if not path or not os.path.isfile(path):
+                continue
+            modified = modified or datetime.fromtimestamp(os.path.getmtime(path))
+            info = zipfile.ZipInfo(arcname, date_time=modified.timetuple()[:6] if modified.year >= 1980 else (1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = os.path.getsize(path)
+            with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()